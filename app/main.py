@@ -1,8 +1,18 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from app.routes import rates, labels
+from app.routes import rates, labels, qr, label_files, pickups, tracking, shipments
+from utils.email_delivery import get_email_worker
+from tracking.tracking_poller import get_tracking_poller
+from tracking.tracking_push import get_tracking_push_hub
+from shipments.shipment_store import get_shipment_store
+from labels.label_prefetch import get_label_prefetcher
+from shipments.end_of_day import get_end_of_day_closer
+from utils.carrier_schemas import compile_validators
+from utils.webhook_client import close_webhook_client
+from utils.http_client import close_http_client
 from dotenv import load_dotenv
+import asyncio
 import os
 
 # Load environment variables from .env file
@@ -41,10 +51,48 @@ app.add_middleware(
 # Include routers
 app.include_router(rates.router, prefix="/api", tags=["rates"])
 app.include_router(labels.router, prefix="/api", tags=["labels"])
+app.include_router(pickups.router, prefix="/api", tags=["pickups"])
+app.include_router(tracking.router, prefix="/api", tags=["tracking"])
+app.include_router(shipments.router, prefix="/api", tags=["shipments"])
+# Lazily rendered QR codes and cached label documents; registered before the static mount so they take precedence
+app.include_router(qr.router, tags=["labels"])
+app.include_router(label_files.router, tags=["labels"])
 
 # Mount static files directory
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+@app.on_event("startup")
+async def startup():
+    # Background tracking polls for every label we create; changes go out to push subscribers
+    get_tracking_poller().add_listener(get_tracking_push_hub().publish)
+    # Off by default, like the daily close; TRACKING_POLL_ENABLED=true turns it on
+    if os.getenv('TRACKING_POLL_ENABLED', 'false').lower() == 'true':
+        await get_tracking_poller().reseed()
+        get_tracking_poller().start()
+    # Optional daily FedEx Ground close, e.g. EOD_CLOSE_TIME=18:30
+    if os.getenv('EOD_CLOSE_TIME'):
+        get_end_of_day_closer().start_daily(os.getenv('EOD_CLOSE_TIME'))
+    # Compile the carrier request schemas now rather than on the first label
+    await asyncio.to_thread(compile_validators)
+    # Finish label jobs the last shutdown couldn't
+    await labels.label_jobs.recover()
+
+@app.on_event("shutdown")
+async def shutdown():
+    # Finish queued label jobs (carrier already billed them) and stop the workers
+    await labels.label_jobs.shutdown()
+    # Bulk labels already submitted when their client disconnected
+    await labels.bulk_processor.flush()
+    await get_email_worker().shutdown()
+    await get_tracking_poller().shutdown()
+    await get_tracking_push_hub().shutdown()
+    await close_webhook_client()
+    await get_end_of_day_closer().shutdown()
+    await get_label_prefetcher().flush()
+    await get_shipment_store().flush()
+    # Last: the steps above may still call carriers
+    await close_http_client()
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to ShipVox API"}
@@ -0,0 +1,108 @@
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from pathlib import Path
+from labels.label_file_cache import get_label_file_cache
+from labels.label_prefetch import get_label_prefetcher
+from labels.label_storage import CONTENT_TYPES, get_label_storage
+from utils.conditional import not_modified
+import asyncio
+import os
+import re
+
+router = APIRouter()
+
+# Content-addressed files never change, so clients may keep them indefinitely
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Stored documents are content-addressed, so a tracking number's copy never changes
+LABEL_CACHE_CONTROL = "public, max-age=86400"
+# Files named by tracking number may be rewritten; clients revalidate (a cheap 304)
+MUTABLE_CACHE_CONTROL = "public, no-cache"
+
+# <aa>/<bb>/<sha256>.<ext>, as written by LabelStorage
+CONTENT_ADDRESSED_PATH = re.compile(r'^([0-9a-f]{2})/([0-9a-f]{2})/(\1\2[0-9a-f]{60})\.([a-z]+)$')
+# Older files stored directly under the labels directory
+LEGACY_FILE_NAME = re.compile(r'^[A-Za-z0-9-][A-Za-z0-9._-]*$')
+
+async def serve_label_file(request: Request, path: str, etag: str, content_type: str, cache_control: str, cacheable: bool) -> Response:
+    """
+    Serve a label file with conditional and Range request support.
+
+    Matching If-None-Match gets a 304 without touching the file. Whole-file
+    requests for small content-addressed files come from the hot file cache;
+    everything else is a FileResponse, which answers Range/If-Range and
+    hands the file to the server with http.response.pathsend (zero-copy
+    sendfile) when the ASGI server supports it.
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    if cacheable and "range" not in request.headers:
+        content = await get_label_file_cache().get(path)
+        if content is not None:
+            return Response(content=content, media_type=content_type, headers=headers)
+
+    if not await asyncio.to_thread(os.path.isfile, path):
+        raise HTTPException(status_code=404, detail="Label not found")
+    return FileResponse(path, media_type=content_type, headers=headers)
+
+@router.get("/static/labels/documents/{tracking_number}")
+async def get_label_document(tracking_number: str, request: Request) -> Response:
+    """
+    Serve the local copy of a carrier-hosted label document.
+
+    Waits for the background download if it hasn't finished yet.
+
+    Raises:
+        HTTPException: If the document is unknown or can't be downloaded
+    """
+    if not re.match(r'^[A-Za-z0-9-]+$', tracking_number):
+        raise HTTPException(status_code=404, detail="Label not found")
+
+    try:
+        stored = await get_label_prefetcher().get(tracking_number)
+    except ValueError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    if not stored:
+        raise HTTPException(status_code=404, detail="Label not found")
+
+    return await serve_label_file(request, stored.path, f'"{stored.sha256}"', stored.content_type, LABEL_CACHE_CONTROL, cacheable=True)
+
+@router.get("/static/labels/{file_path:path}")
+async def get_label_file(file_path: str, request: Request) -> Response:
+    """
+    Serve a stored label document or image.
+
+    Content-addressed files use their hash as a strong ETag and are marked
+    immutable. Legacy files named by tracking number get an ETag from
+    their modification time and size and must be revalidated.
+    """
+    root = get_label_storage().root
+    match = CONTENT_ADDRESSED_PATH.match(file_path)
+    if match:
+        extension = match.group(4)
+        return await serve_label_file(
+            request,
+            str(root / file_path),
+            f'"{match.group(3)}"',
+            CONTENT_TYPES.get(extension, "application/octet-stream"),
+            IMMUTABLE_CACHE_CONTROL,
+            cacheable=True
+        )
+
+    if not LEGACY_FILE_NAME.match(file_path):
+        raise HTTPException(status_code=404, detail="Label not found")
+    path = root / file_path
+    try:
+        stat = await asyncio.to_thread(path.stat)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Label not found")
+
+    return await serve_label_file(
+        request,
+        str(path),
+        f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"',
+        CONTENT_TYPES.get(Path(file_path).suffix.lstrip("."), "application/octet-stream"),
+        MUTABLE_CACHE_CONTROL,
+        cacheable=False
+    )
@@ -1,18 +1,165 @@
-
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from typing import Optional
 from models.label_request import LabelRequest
 from models.label_response import LabelResponse
+from models.bulk_label import BulkLabelRequest
+from models.label_job import LabelJob, LabelJobRequest
+from models.label_print import LabelPrintRequest
+from models.prevalidation import Prevalidation
 from labels.label_creator import LabelCreator
+from labels.idempotency import IdempotencyStore
+from labels.bulk_labels import BulkLabelProcessor
+from labels.label_jobs import LabelJobManager
+from labels.label_print import document_format, print_stream, resolve_print_documents
+from rates.quote_store import get_quote_store
+from utils.exceptions import IdempotencyError
 
 router = APIRouter()
+label_creator = LabelCreator()
+idempotency_store = IdempotencyStore()
+bulk_processor = BulkLabelProcessor(label_creator)
+label_jobs = LabelJobManager(label_creator)
 
 @router.post("/labels", response_model=LabelResponse)
 @router.post("/api/labels", response_model=LabelResponse)  # Add this route to match the tests
-async def create_label(request: LabelRequest):
+async def create_label(
+    request: LabelRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    try:
+        # A quoted request ships exactly what was rated, without validating or rating it again
+        if not idempotency_key:
+            return await label_creator.create_label(get_quote_store().apply(request))
+
+        # Retries with the same key get the original label instead of a new shipment
+        label, replayed = await idempotency_store.run(
+            idempotency_key,
+            IdempotencyStore.fingerprint(request),
+            lambda: _create_once(idempotency_key, request)
+        )
+        if replayed:
+            response.headers["Idempotent-Replayed"] = "true"
+        return label
+    except IdempotencyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Label creation failed: {str(e)}")
+
+async def _create_once(idempotency_key: str, request: LabelRequest) -> LabelResponse:
+    """
+    Create the label for a key, calling the carrier at most once.
+
+    If an earlier attempt got the shipment billed and then failed (e.g. the
+    shipment store write), this finishes that shipment. The quote is applied
+    here, not by the caller, since the first attempt used it up.
+    """
+    submitted = idempotency_store.get_submitted(idempotency_key)
+    if submitted is None:
+        applied = get_quote_store().apply(request)
+        submitted = (applied, await label_creator.submit_label(applied))
+        idempotency_store.remember_submitted(idempotency_key, *submitted)
+    return await label_creator.finish_label(*submitted)
+
+@router.post("/labels/prevalidate", response_model=Prevalidation, status_code=202)
+async def prevalidate_label(request: LabelRequest):
+    """
+    Start validating a tentative label while the caller confirms.
+
+    Returns a token immediately; the ship payload is built and checked with
+    the carrier in the background. Send the same LabelRequest with
+    prevalidation_token set to /labels to submit it without building or
+    validating it again. Poll GET /labels/prevalidate/{token} for the result.
+    """
+    try:
+        return label_creator.prevalidator.start(get_quote_store().apply(request))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/labels/prevalidate/{token}", response_model=Prevalidation)
+async def get_prevalidation(token: str):
+    prevalidation = label_creator.prevalidator.get(token)
+    if not prevalidation:
+        raise HTTPException(status_code=404, detail="Prevalidation not found or expired")
+    return prevalidation
+
+@router.post("/labels/bulk")
+async def create_labels_bulk(request: BulkLabelRequest) -> StreamingResponse:
+    """
+    Create many labels in one call.
+
+    Every label is validated before anything is submitted. Results are
+    streamed back as newline-delimited JSON BulkLabelResult objects in
+    completion order; a failed label carries an error instead of failing
+    the whole batch.
+    """
     try:
-        creator = LabelCreator()
-        return await creator.create_label(request)
+        labels = [get_quote_store().apply(label) for label in request.labels]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def results():
+        async for result in bulk_processor.stream(labels):
+            yield (result.model_dump_json() if hasattr(result, 'model_dump_json') else result.json()) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+@router.post("/labels/print")
+async def print_labels(request: LabelPrintRequest) -> StreamingResponse:
+    """
+    Merge a wave of labels into a single print job.
+
+    Labels are given by tracking number and/or async label job id and come
+    back as one PDF (or one ZPL stream for 4x6 thermal labels) in request
+    order. The merged document is assembled and streamed one label at a
+    time rather than built in memory.
+    """
+    tracking_numbers = list(request.tracking_numbers)
+    for job_id in request.job_ids:
+        job = label_jobs.get(job_id)
+        if not job or job.status != "completed":
+            raise HTTPException(status_code=404, detail=f"Label job {job_id} has no finished label")
+        tracking_numbers.append(job.tracking_number)
+
+    documents, missing = await resolve_print_documents(tracking_numbers)
+    if missing:
+        raise HTTPException(status_code=404, detail=f"No stored label for: {', '.join(missing)}")
+
+    print_format = request.format or document_format(documents[0])
+    mismatched = [document.url for document in documents if document_format(document) != print_format]
+    if mismatched:
+        raise HTTPException(status_code=400, detail=f"Labels are not {print_format.upper()}: {', '.join(mismatched)}")
+
+    return StreamingResponse(
+        print_stream(documents, print_format),
+        media_type="application/pdf" if print_format == "pdf" else "application/x-zpl",
+        headers={"Content-Disposition": f'inline; filename="labels.{print_format}"'}
+    )
+
+@router.post("/labels/jobs", response_model=LabelJob, status_code=202)
+async def create_label_job(request: LabelJobRequest):
+    """
+    Create a label asynchronously.
+
+    Returns as soon as the carrier has accepted the shipment; label
+    documents, QR code and email are handled in the background. Poll
+    GET /labels/jobs/{job_id} or pass a callback_url to learn when the
+    label is ready.
+    """
+    try:
+        request.label = get_quote_store().apply(request.label)
+        return await label_jobs.submit(request)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Label creation failed: {str(e)}")
+
+@router.get("/labels/jobs/{job_id}", response_model=LabelJob)
+async def get_label_job(job_id: str):
+    job = label_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Label job not found")
+    return job
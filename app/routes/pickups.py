@@ -0,0 +1,42 @@
+from fastapi import APIRouter, HTTPException
+from datetime import date
+from typing import List, Optional
+from models.pickup import PickupAvailability, PickupBookingRequest, PickupConfirmation, PickupResult
+from pickup.pickup_scheduler import get_pickup_scheduler
+from pickup.pickup_availability import get_pickup_availability_service
+
+router = APIRouter()
+
+@router.post("/pickups", response_model=List[PickupResult])
+async def book_pickups(request: PickupBookingRequest) -> List[PickupResult]:
+    """
+    Book one pickup per origin location for the day's shipments.
+
+    Safe to call repeatedly: locations already booked return their existing
+    confirmation, failed ones are retried.
+    """
+    return await get_pickup_scheduler().book_pickups(
+        pickup_date=request.pickup_date,
+        ready_time=request.ready_time,
+        close_time=request.close_time
+    )
+
+@router.get("/pickups", response_model=List[PickupConfirmation])
+async def get_pickups(pickup_date: Optional[date] = None) -> List[PickupConfirmation]:
+    """Pickups booked for a day (today by default)"""
+    return await get_pickup_scheduler().get_bookings(pickup_date)
+
+@router.get("/pickups/availability", response_model=PickupAvailability)
+async def get_pickup_availability(
+    carrier: str,
+    postal_code: str,
+    pickup_date: Optional[date] = None
+) -> PickupAvailability:
+    """Pickup windows and cutoffs for a postal code, served from cache when fresh"""
+    try:
+        return await get_pickup_availability_service().get_availability(carrier, postal_code, pickup_date)
+    except Exception as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, HTTPException, Request, Response
+from labels.qr_cache import get_qr_cache
+from utils.conditional import not_modified
+import re
+
+router = APIRouter()
+
+# QR codes for a tracking number never change, so let clients keep them
+QR_CACHE_CONTROL = "public, max-age=86400"
+
+@router.get("/static/labels/qr/{tracking_number}.png")
+async def get_qr_code(tracking_number: str, request: Request) -> Response:
+    """
+    Serve the fallback QR code for a label, rendering it on first request.
+
+    Args:
+        tracking_number: Tracking number of the label
+
+    Returns:
+        PNG image with a strong ETag, or 304 if the client's copy is current
+
+    Raises:
+        HTTPException: If no QR code is known for the tracking number
+    """
+    if not re.match(r'^[A-Za-z0-9-]+$', tracking_number):
+        raise HTTPException(status_code=404, detail="QR code not found")
+
+    image = await get_qr_cache().get(tracking_number)
+    if not image:
+        raise HTTPException(status_code=404, detail="QR code not found")
+
+    headers = {"ETag": image.etag, "Cache-Control": QR_CACHE_CONTROL}
+    if not_modified(request, image.etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=image.content, media_type="image/png", headers=headers)
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, HTTPException, Query
+from datetime import date
+from typing import List, Optional
+from models.close import EndOfDayReport, EndOfDayRequest
+from models.shipment import ShipmentRecord
+from shipments.end_of_day import get_end_of_day_closer
+from shipments.shipment_store import get_shipment_store
+
+router = APIRouter()
+
+@router.get("/shipments", response_model=List[ShipmentRecord])
+async def list_shipments(
+    ship_date: Optional[date] = None,
+    carrier: Optional[str] = None,
+    recipient_zip: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0)
+) -> List[ShipmentRecord]:
+    """Created shipments, newest first, filtered by date, carrier and recipient ZIP"""
+    return await get_shipment_store().find(
+        ship_date=ship_date,
+        carrier=carrier,
+        recipient_zip=recipient_zip,
+        limit=limit,
+        offset=offset
+    )
+
+@router.get("/shipments/search", response_model=List[ShipmentRecord])
+async def search_shipments(
+    q: str = Query(..., min_length=1, description="Recipient name, company, street or city words"),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    carrier: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=200)
+) -> List[ShipmentRecord]:
+    """Full-text search over shipment recipients, e.g. q=smith tampa with last week's dates"""
+    return await get_shipment_store().search(q, date_from=date_from, date_to=date_to, carrier=carrier, limit=limit)
+
+@router.post("/shipments/close", response_model=EndOfDayReport)
+async def close_shipments(request: EndOfDayRequest) -> EndOfDayReport:
+    """Close the day's open FedEx Ground shipments and build the consolidated manifest"""
+    return await get_end_of_day_closer().close(request.close_date)
+
+@router.get("/shipments/{tracking_number}", response_model=ShipmentRecord)
+async def get_shipment(tracking_number: str) -> ShipmentRecord:
+    shipment = await get_shipment_store().get(tracking_number)
+    if shipment is None:
+        raise HTTPException(status_code=404, detail="Shipment not found")
+    return shipment
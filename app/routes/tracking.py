@@ -0,0 +1,106 @@
+import asyncio
+import json
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from typing import Dict, Optional
+from models.tracking import TrackingStatus, TrackRequest, WebhookSubscription, WebhookSubscriptionRequest
+from tracking.tracking_poller import get_tracking_poller
+from tracking.tracking_push import get_tracking_push_hub
+
+router = APIRouter()
+
+POLLING_DISABLED = "Tracking polling is disabled; set TRACKING_POLL_ENABLED=true"
+
+def _require_polling():
+    """Packages added while the poller is stopped would never be polled or expired"""
+    if not get_tracking_poller().is_running():
+        raise HTTPException(status_code=503, detail=POLLING_DISABLED)
+
+@router.post("/tracking", response_model=Dict[str, bool])
+async def track_packages(request: TrackRequest) -> Dict[str, bool]:
+    """
+    Start tracking packages; labels created through this API are tracked automatically.
+
+    Needs background polling (TRACKING_POLL_ENABLED=true); answers 503 without it.
+
+    Returns:
+        Dictionary of tracking number to whether it is now tracked
+    """
+    _require_polling()
+    poller = get_tracking_poller()
+    if not poller.supports(request.carrier):
+        raise HTTPException(status_code=400, detail=f"Tracking not supported for carrier: {request.carrier}")
+    return {
+        tracking_number: poller.track(request.carrier, tracking_number)
+        for tracking_number in request.tracking_numbers
+    }
+
+@router.post("/tracking/webhooks", response_model=WebhookSubscription, status_code=201)
+async def register_tracking_webhook(request: WebhookSubscriptionRequest) -> WebhookSubscription:
+    """
+    Receive status changes for the given packages as batched POSTs to a URL.
+
+    Events come from background polling, so this answers 503 unless
+    TRACKING_POLL_ENABLED=true.
+    """
+    _require_polling()
+    poller = get_tracking_poller()
+    if not poller.supports(request.carrier):
+        raise HTTPException(status_code=400, detail=f"Tracking not supported for carrier: {request.carrier}")
+    try:
+        subscription = get_tracking_push_hub().register_webhook(request.url, request.tracking_numbers, request.secret)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    for tracking_number in request.tracking_numbers:
+        poller.track(request.carrier, tracking_number)
+    return subscription
+
+@router.delete("/tracking/webhooks/{subscription_id}", status_code=204)
+async def unregister_tracking_webhook(subscription_id: str):
+    if not get_tracking_push_hub().unregister_webhook(subscription_id):
+        raise HTTPException(status_code=404, detail="Webhook subscription not found")
+
+@router.websocket("/tracking/stream")
+async def tracking_stream(websocket: WebSocket, tracking_numbers: Optional[str] = None):
+    """
+    Stream status changes over a WebSocket.
+
+    Subscribe with ?tracking_numbers=a,b or by sending
+    {"subscribe": ["a", "b"]}; each change arrives as a TrackingEvent.
+    Only packages already being tracked produce events, and only while
+    background polling runs; otherwise the connection is refused with
+    close code 1013 (try again later).
+    """
+    if not get_tracking_poller().is_running():
+        await websocket.close(code=1013, reason=POLLING_DISABLED)
+        return
+    await websocket.accept()
+    hub = get_tracking_push_hub()
+    queue = hub.open_stream(number for number in (tracking_numbers or "").split(",") if number)
+
+    async def send():
+        while True:
+            event = await queue.get()
+            await websocket.send_json(event.model_dump(mode="json") if hasattr(event, 'model_dump') else json.loads(event.json()))
+
+    sender = asyncio.create_task(send())
+    try:
+        while True:
+            message = await websocket.receive_json()
+            if isinstance(message, dict) and isinstance(message.get("subscribe"), list):
+                hub.subscribe_stream(queue, message["subscribe"])
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        await asyncio.gather(sender, return_exceptions=True)
+        hub.close_stream(queue)
+
+@router.get("/tracking/{tracking_number}", response_model=TrackingStatus)
+async def get_tracking_status(tracking_number: str) -> TrackingStatus:
+    """Latest polled status of a tracked package"""
+    poller = get_tracking_poller()
+    status = poller.get_status(tracking_number)
+    if status is None:
+        detail = "Status not polled yet" if poller.is_tracked(tracking_number) else "Tracking number not tracked"
+        raise HTTPException(status_code=404, detail=detail)
+    return status
@@ -7,6 +7,7 @@ import httpx
 from auth.base_auth import BaseAuthProvider, TokenData
 from utils.exceptions import AuthenticationError
 from auth.token_manager import TokenManager
+from utils.http_client import get_http_client
 
 class FedExAuth(BaseAuthProvider):
     def __init__(self):
@@ -24,7 +25,7 @@ class FedExAuth(BaseAuthProvider):
         super().__init__(client_id=self._client_id, client_secret=self._client_secret)
         self._base_url = os.getenv('FEDEX_API_URL', 'https://apis-sandbox.fedex.com')
         self._token_manager = TokenManager('fedex')
-        self._client = httpx.AsyncClient()
+        self._client = get_http_client()
 
     async def get_token(self) -> str:
         """
@@ -3,6 +3,7 @@
 
 from auth.base_auth import BaseAuthProvider
 from auth.token_manager import TokenManager
+from utils.http_client import get_http_client
 import os
 import base64
 import hashlib
@@ -20,7 +21,7 @@ class UPSAuth(BaseAuthProvider):
         self._redirect_uri = os.getenv('UPS_REDIRECT_URI')
         self._base_url = os.getenv('UPS_API_URL', 'https://onlinetools.ups.com')
         self._token_manager = TokenManager('ups')
-        self._client = httpx.AsyncClient()
+        self._client = get_http_client()
 
     async def get_token(self) -> str:
         """
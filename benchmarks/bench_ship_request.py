@@ -0,0 +1,135 @@
+# Ship Request Benchmark
+# CPU time and memory allocated per FedEx ship payload: template builder vs the model-based one it replaced
+#
+#   python benchmarks/bench_ship_request.py [iterations]
+
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from labels.fedex_ship_template import get_ship_template
+from models.carriers.fedex import FedExAddress, FedExDimensions, FedExWeight
+from models.label_request import LabelRequest
+
+ACCOUNT_NUMBER = "740561073"
+
+REQUEST = LabelRequest(
+    carrier="fedex",
+    shipper={"name": "Shipper Name", "street": "123 Shipper Street", "city": "Memphis", "state": "TN", "zip_code": "38117", "phone": "9015551234"},
+    recipient={"name": "Recipient Name", "street": "456 Recipient Ave", "city": "Atlanta", "state": "GA", "zip_code": "30339"},
+    service_type="FEDEX_GROUND",
+    packages=[
+        {"weight": 5.0, "dimensions": {"length": 12, "width": 10, "height": 8}},
+        {"weight": 2.5}
+    ],
+    special_services={"signature_option": "DIRECT", "residential_delivery": True}
+)
+
+def _dump(model) -> dict:
+    return model.model_dump() if hasattr(model, 'model_dump') else model.dict()
+
+def build_with_models(request: LabelRequest) -> dict:
+    """The previous builder: carrier models dumped back to dicts, hasattr checks, services rebuilt per label"""
+    shipper = FedExAddress(streetLines=[request.shipper.street], city=request.shipper.city, stateOrProvinceCode=request.shipper.state,
+                           postalCode=request.shipper.zip_code, countryCode=request.shipper.country)
+    recipient = FedExAddress(streetLines=[request.recipient.street], city=request.recipient.city, stateOrProvinceCode=request.recipient.state,
+                             postalCode=request.recipient.zip_code, countryCode=request.recipient.country)
+    packages = request.get_packages()
+    line_items = []
+    for sequence_number, package in enumerate(packages, start=1):
+        line_item = {"sequenceNumber": sequence_number, "weight": _dump(FedExWeight(value=package.weight, units="LB")), "groupPackageCount": 1}
+        if package.dimensions:
+            line_item["dimensions"] = _dump(FedExDimensions(length=package.dimensions.length, width=package.dimensions.width,
+                                                            height=package.dimensions.height, units="IN"))
+        line_items.append(line_item)
+
+    ship_request = {
+        "accountNumber": {"value": ACCOUNT_NUMBER},
+        "labelResponseOptions": "URL_ONLY",
+        "requestedShipment": {
+            "shipper": {"address": _dump(shipper), "contact": {
+                "personName": request.shipper.name,
+                "companyName": request.shipper.company if hasattr(request.shipper, 'company') and request.shipper.company else request.shipper.name,
+                "phoneNumber": request.shipper.phone if hasattr(request.shipper, 'phone') and request.shipper.phone else "5555555555"}},
+            "recipients": [{"address": _dump(recipient), "contact": {
+                "personName": request.recipient.name,
+                "companyName": request.recipient.company if hasattr(request.recipient, 'company') and request.recipient.company else request.recipient.name,
+                "phoneNumber": request.recipient.phone if hasattr(request.recipient, 'phone') and request.recipient.phone else "5555555555"}}],
+            "shipDatestamp": datetime.now().strftime("%Y-%m-%d"),
+            "serviceType": request.service_type,
+            "packagingType": getattr(packages[0], 'packaging_type', None) or "YOUR_PACKAGING",
+            "pickupType": "USE_SCHEDULED_PICKUP" if request.pickup_requested else "DROPOFF_AT_FEDEX_LOCATION",
+            "blockInsightVisibility": False,
+            "shippingChargesPayment": {"paymentType": "SENDER"},
+            "labelSpecification": {"labelFormatType": "COMMON2D", "imageType": "PDF", "labelStockType": "PAPER_85X11_TOP_HALF_LABEL"},
+            "totalPackageCount": len(line_items),
+            "totalWeight": sum(package.weight for package in packages),
+            "requestedPackageLineItems": line_items
+        }
+    }
+    services = request.special_services
+    if services:
+        special_services = {"specialServiceTypes": []}
+        if services.signature_option:
+            special_services["signatureOptionType"] = services.signature_option
+        for flag, service_type in (("saturday_delivery", "SATURDAY_DELIVERY"), ("sunday_delivery", "SUNDAY_DELIVERY"),
+                                   ("hold_at_location", "HOLD_AT_LOCATION"), ("dry_ice", "DRY_ICE"),
+                                   ("dangerous_goods", "DANGEROUS_GOODS"), ("priority_alert", "PRIORITY_ALERT")):
+            if getattr(services, flag):
+                special_services["specialServiceTypes"].append(service_type)
+        if services.residential_delivery:
+            ship_request["requestedShipment"]["recipients"][0]["address"]["residential"] = True
+        if special_services["specialServiceTypes"] or "signatureOptionType" in special_services:
+            ship_request["requestedShipment"]["specialServicesRequested"] = special_services
+    return ship_request
+
+def build_with_template(request: LabelRequest) -> dict:
+    """The current builder, as FedExShipEngine._prepare_ship_request calls it"""
+    packages = request.get_packages()
+    template = get_ship_template(
+        ACCOUNT_NUMBER,
+        request.service_type,
+        packages[0].packaging_type or "YOUR_PACKAGING",
+        "USE_SCHEDULED_PICKUP" if request.pickup_requested else "DROPOFF_AT_FEDEX_LOCATION"
+    )
+    return template.build(request, datetime.now().strftime("%Y-%m-%d"))
+
+def cpu_per_label(build, iterations: int) -> float:
+    """Mean CPU time per payload, microseconds"""
+    build(REQUEST)
+    start = time.process_time()
+    for _ in range(iterations):
+        build(REQUEST)
+    return (time.process_time() - start) / iterations * 1e6
+
+def memory_per_label(build, iterations: int) -> float:
+    """Mean peak bytes allocated while building one payload"""
+    build(REQUEST)
+    tracemalloc.start()
+    total = 0
+    for _ in range(iterations):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        build(REQUEST)
+        total += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return total / iterations
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    assert build_with_models(REQUEST) == build_with_template(REQUEST)
+
+    results = {}
+    for name, build in (("models", build_with_models), ("template", build_with_template)):
+        results[name] = (cpu_per_label(build, iterations), memory_per_label(build, iterations // 10))
+        print(f"{name:>8}: {results[name][0]:7.2f} us/label  {results[name][1]:8.0f} bytes/label")
+
+    print(f"CPU {results['models'][0] / results['template'][0]:.1f}x less, "
+          f"memory {results['models'][1] / results['template'][1]:.1f}x less per label")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# Bulk Labels
+# Concurrent label creation for warehouse waves
+
+import asyncio
+import os
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from labels.label_creator import LabelCreator
+from models.bulk_label import BulkLabelResult
+from models.label_request import LabelRequest
+
+class BulkLabelProcessor:
+    """
+    Submits many labels at once while respecting carrier account limits.
+
+    Each (carrier, account) pair gets its own semaphore of
+    CARRIER_MAX_CONCURRENCY slots, shared by every bulk request in the
+    process, so a large wave can't exceed what the carrier allows for one
+    account. Results are yielded as soon as each label finishes.
+
+    If the client goes away mid-stream, labels still waiting for a slot are
+    dropped, but labels already submitted run through post-processing: the
+    carrier bills them, so they must be stored and recorded. flush() waits
+    for those.
+    """
+
+    def __init__(self, creator: LabelCreator, max_concurrency: Optional[int] = None):
+        self._creator = creator
+        self._max_concurrency = max_concurrency or int(os.getenv('CARRIER_MAX_CONCURRENCY', '8'))
+        self._semaphores: Dict[Tuple[str, str], asyncio.Semaphore] = {}
+        self._submitted: Set[asyncio.Task] = set()
+
+    async def stream(self, requests: List[LabelRequest]) -> AsyncIterator[BulkLabelResult]:
+        """
+        Create labels concurrently and yield results in completion order.
+
+        Args:
+            requests: Already validated label requests
+
+        Yields:
+            BulkLabelResult per request, carrying the label or the error
+        """
+        tasks = [
+            asyncio.create_task(self._create(index, request))
+            for index, request in enumerate(requests)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Stop submitting if the client went away mid-stream; submitted
+            # labels are shielded and finish anyway
+            for task in tasks:
+                task.cancel()
+
+    async def flush(self) -> None:
+        """Wait for submitted labels whose stream was abandoned"""
+        await asyncio.gather(*self._submitted, return_exceptions=True)
+
+    async def _create(self, index: int, request: LabelRequest) -> BulkLabelResult:
+        semaphore = self._semaphore_for(request)
+        # Cancelled while waiting here: nothing was sent to the carrier
+        await semaphore.acquire()
+        task = asyncio.create_task(self._submit(index, request, semaphore))
+        self._submitted.add(task)
+        task.add_done_callback(self._submitted.discard)
+        return await asyncio.shield(task)
+
+    async def _submit(self, index: int, request: LabelRequest, semaphore: asyncio.Semaphore) -> BulkLabelResult:
+        try:
+            label = await self._creator.create_label(request)
+            return BulkLabelResult(index=index, label=label)
+        except Exception as e:
+            return BulkLabelResult(index=index, error=str(e))
+        finally:
+            semaphore.release()
+
+    def _semaphore_for(self, request: LabelRequest) -> asyncio.Semaphore:
+        engine = self._creator.engines.get(request.carrier)
+        key = (request.carrier, getattr(engine, 'account_number', None) or "default")
+        if key not in self._semaphores:
+            self._semaphores[key] = asyncio.Semaphore(self._max_concurrency)
+        return self._semaphores[key]
@@ -1,28 +1,55 @@
 import os
+import asyncio
 import base64
 import httpx
 import json
 from datetime import datetime, timedelta
 from pathlib import Path
+from typing import List, Optional, Tuple
 
 from models.label_request import LabelRequest
-from models.label_response import LabelResponse
-from models.carriers.fedex import FedExAddress, FedExWeight, FedExDimensions
+from models.label_response import LabelResponse, LabelPiece, SubmittedLabel
 from auth.fedex_auth import FedExAuth
+from utils.http_client import get_http_client
+from labels.label_storage import get_label_storage, extension_for_doc_type
+from labels.fedex_ship_template import get_ship_template
+from utils.carrier_schemas import FEDEX_SHIP_REQUEST, validate_request
+from utils.exceptions import ShipmentRejectedError, ValidationError
+
+# Client errors that say nothing about the shipment itself: auth, timeout, rate limit
+RETRYABLE_CLIENT_ERRORS = {401, 403, 408, 429}
 
 class FedExShipEngine:
     def __init__(self):
         self._auth = FedExAuth()
         self._base_url = os.environ.get('FEDEX_API_URL', 'https://apis-sandbox.fedex.com')
         self._account_number = '740561073'  # Hardcoded for testing
-        self._client = httpx.AsyncClient()
+        self._client = get_http_client()
+        self._storage = get_label_storage()
 
         # Ensure static directories exist
         Path('static/labels').mkdir(parents=True, exist_ok=True)
         Path('static/labels/qr').mkdir(parents=True, exist_ok=True)
 
+    @property
+    def account_number(self) -> str:
+        """FedEx account labels are billed to"""
+        return self._account_number
+
     async def create_label(self, request: LabelRequest) -> LabelResponse:
         """Create a shipping label using FedEx Ship API"""
+        submitted = await self.submit_shipment(request)
+        return await self.build_label_response(request, submitted)
+
+    async def submit_shipment(self, request: LabelRequest, ship_request: Optional[dict] = None) -> SubmittedLabel:
+        """
+        Create the shipment with FedEx; label documents are processed separately.
+
+        Args:
+            request: Label request
+            ship_request: Payload already built (and validated) for this
+                request by validate_shipment(); built here if not given
+        """
         try:
             # Print request for debugging
             print("Label Request:")
@@ -30,12 +57,14 @@ class FedExShipEngine:
             print(f"Service Type: {request.service_type}")
             print(f"Special Services: {request.special_services}")
 
+            # Prepare the ship request, unless it was built while the caller was confirming
+            if ship_request is None or ship_request["requestedShipment"].get("shipDatestamp") != datetime.now().strftime("%Y-%m-%d"):
+                ship_request = self._prepare_ship_request(request)
+            self._validate_ship_request(ship_request)
+
             # Get authentication token
             token = await self._auth.get_token()
 
-            # Prepare the ship request
-            ship_request = self._prepare_ship_request(request)
-
             # Print ship request for debugging
             print("FedEx Ship Request:")
             print(json.dumps(ship_request, indent=2))
@@ -59,18 +88,19 @@ class FedExShipEngine:
                 # Print response status for debugging
                 print(f"FedEx API Response Status: {response.status_code}")
 
-                # Get response data
-                response_text = response.text
-                print(f"FedEx API Response Text: {response_text}")
-
                 # Handle response
                 if response.status_code == 200:
                     response_data = response.json()
 
-                    # Print response for debugging
+                    # Print response for debugging, without the (potentially
+                    # multi-megabyte) encoded label documents
                     print("FedEx API Response:")
-                    print(json.dumps(response_data, indent=2))
+                    print(json.dumps(self._summarize_response(response_data), indent=2))
                 else:
+                    # Get response data
+                    response_text = response.text
+                    print(f"FedEx API Response Text: {response_text}")
+
                     # Try to parse error response
                     try:
                         error_data = response.json()
@@ -87,9 +117,94 @@ class FedExShipEngine:
                 print(f"FedEx API request error: {str(e)}")
                 raise ValueError(f"FedEx API request error: {str(e)}")
 
-            # Extract tracking number and label data
+            # Extract tracking number
             tracking_number = self._extract_tracking_number(response_data)
-            label_data = self._extract_label_data(response_data)
+
+            return SubmittedLabel(
+                carrier="fedex",
+                tracking_number=tracking_number,
+                carrier_response=response_data
+            )
+
+        except ValueError as e:
+            # Pass through ValueError (which includes our FedEx API errors)
+            print(f"Error: {str(e)}")
+            raise
+        except Exception as e:
+            # Handle other errors
+            error_msg = f"Error creating FedEx label: {str(e)}"
+            print(error_msg)
+            import traceback
+            traceback.print_exc()
+            raise ValueError(error_msg)
+
+    async def validate_shipment(self, request: LabelRequest) -> Tuple[dict, List[str]]:
+        """
+        Build the ship payload for a request and have FedEx check it.
+
+        FedEx's package validation only covers single-piece shipments, so
+        multi-piece payloads are built but not sent.
+
+        Returns:
+            (ship request payload ready for submit_shipment, FedEx alerts)
+
+        Raises:
+            ShipmentRejectedError: If FedEx (or the local schema check)
+                rejects the shipment
+            ValueError: If FedEx can't be reached or the call fails otherwise
+        """
+        ship_request = self._prepare_ship_request(request)
+        try:
+            self._validate_ship_request(ship_request)
+        except ValueError as e:
+            raise ShipmentRejectedError(str(e))
+        if len(ship_request["requestedShipment"]["requestedPackageLineItems"]) > 1:
+            return ship_request, []
+
+        token = await self._auth.get_token()
+        validate_request = {
+            "accountNumber": ship_request["accountNumber"],
+            "requestedShipment": {
+                key: value for key, value in ship_request["requestedShipment"].items()
+                if key != "totalPackageCount"
+            }
+        }
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+            "X-locale": "en_US"
+        }
+
+        try:
+            response = await self._client.post(
+                f"{self._base_url}/ship/v1/shipments/packages/validate",
+                headers=headers,
+                json=validate_request,
+                timeout=30.0
+            )
+        except httpx.TimeoutException:
+            raise ValueError("FedEx validate request timed out")
+        except httpx.RequestError as e:
+            raise ValueError(f"FedEx validate request error: {str(e)}")
+
+        print(f"FedEx Validate Response Status: {response.status_code}")
+        if response.status_code != 200:
+            try:
+                error_message = json.dumps(response.json())
+            except Exception:
+                error_message = response.text or f"HTTP Error: {response.status_code}"
+            if 400 <= response.status_code < 500 and response.status_code not in RETRYABLE_CLIENT_ERRORS:
+                raise ShipmentRejectedError(f"FedEx API error: {error_message}")
+            raise ValueError(f"FedEx API error: {error_message}")
+
+        alerts = response.json().get("output", {}).get("alerts", [])
+        return ship_request, [alert.get("message") or alert.get("code", "") for alert in alerts]
+
+    async def build_label_response(self, request: LabelRequest, submitted: SubmittedLabel) -> LabelResponse:
+        """Save the label documents of a submitted shipment and build the response"""
+        try:
+            tracking_number = submitted.tracking_number
+            label_data = await self._extract_label_data(submitted.carrier_response)
 
             # Generate QR code for tracking
             qr_code_path = f"/static/labels/qr/{tracking_number}.png"
@@ -105,7 +220,8 @@ class FedExShipEngine:
                 service_type=request.service_type,
                 estimated_delivery=estimated_delivery,
                 native_qr_code_base64=None,  # FedEx doesn't provide a native QR code
-                fallback_qr_code_url=qr_code_path
+                fallback_qr_code_url=qr_code_path,
+                pieces=[LabelPiece(**piece) for piece in label_data["pieces"]]
             )
 
         except ValueError as e:
@@ -120,153 +236,23 @@ class FedExShipEngine:
             traceback.print_exc()
             raise ValueError(error_msg)
 
+    def _validate_ship_request(self, ship_request: dict) -> None:
+        """Reject a payload that doesn't match the Ship API schema before sending it"""
+        try:
+            validate_request(FEDEX_SHIP_REQUEST, ship_request, "FedEx ship request")
+        except ValidationError as e:
+            raise ValueError(str(e))
+
     def _prepare_ship_request(self, request: LabelRequest) -> dict:
         """Prepare the FedEx ship request payload"""
-        # Convert Address model to FedEx format
-        shipper_address = FedExAddress(
-            streetLines=[request.shipper.street],
-            city=request.shipper.city,
-            stateOrProvinceCode=request.shipper.state,
-            postalCode=request.shipper.zip_code,
-            countryCode=request.shipper.country
-        )
-
-        recipient_address = FedExAddress(
-            streetLines=[request.recipient.street],
-            city=request.recipient.city,
-            stateOrProvinceCode=request.recipient.state,
-            postalCode=request.recipient.zip_code,
-            countryCode=request.recipient.country
-        )
-
-        # Convert Package model to FedEx format
-        weight = FedExWeight(
-            value=request.package.weight,
-            units="LB"
+        packages = request.get_packages()
+        template = get_ship_template(
+            self._account_number,
+            request.service_type,
+            packages[0].packaging_type or "YOUR_PACKAGING",
+            "USE_SCHEDULED_PICKUP" if request.pickup_requested else "DROPOFF_AT_FEDEX_LOCATION"
         )
-
-        dimensions = None
-        if request.package.dimensions:
-            dimensions = FedExDimensions(
-                length=request.package.dimensions.length,
-                width=request.package.dimensions.width,
-                height=request.package.dimensions.height,
-                units="IN"
-            )
-
-        # Get packaging type
-        packaging_type = getattr(request.package, 'packaging_type', "YOUR_PACKAGING")
-
-        # Check if model_dump method exists, otherwise use dict() method
-        if hasattr(shipper_address, 'model_dump'):
-            shipper_address_dict = shipper_address.model_dump()
-            recipient_address_dict = recipient_address.model_dump()
-            weight_dict = weight.model_dump()
-        else:
-            # For older versions of Pydantic
-            shipper_address_dict = shipper_address.dict()
-            recipient_address_dict = recipient_address.dict()
-            weight_dict = weight.dict()
-
-        # Build the request payload
-        ship_request = {
-            "accountNumber": {
-                "value": self._account_number
-            },
-            "labelResponseOptions": "URL_ONLY",
-            "requestedShipment": {
-                "shipper": {
-                    "address": shipper_address_dict,
-                    "contact": {
-                        "personName": request.shipper.name,
-                        "companyName": request.shipper.company if hasattr(request.shipper, 'company') and request.shipper.company else request.shipper.name,
-                        "phoneNumber": request.shipper.phone if hasattr(request.shipper, 'phone') and request.shipper.phone else "5555555555"
-                    }
-                },
-                "recipients": [{
-                    "address": recipient_address_dict,
-                    "contact": {
-                        "personName": request.recipient.name,
-                        "companyName": request.recipient.company if hasattr(request.recipient, 'company') and request.recipient.company else request.recipient.name,
-                        "phoneNumber": request.recipient.phone if hasattr(request.recipient, 'phone') and request.recipient.phone else "5555555555"
-                    }
-                }],
-                "shipDatestamp": datetime.now().strftime("%Y-%m-%d"),
-                "serviceType": request.service_type,
-                "packagingType": packaging_type,
-                "pickupType": "DROPOFF_AT_FEDEX_LOCATION",
-                "blockInsightVisibility": False,
-                "shippingChargesPayment": {
-                    "paymentType": "SENDER"
-                },
-                "labelSpecification": {
-                    "labelFormatType": "COMMON2D",
-                    "imageType": "PDF",
-                    "labelStockType": "PAPER_85X11_TOP_HALF_LABEL"
-                },
-                "requestedPackageLineItems": [{
-                    "weight": weight_dict,
-                    "groupPackageCount": 1
-                }]
-            }
-        }
-
-        # Add dimensions if available
-        if dimensions:
-            if hasattr(dimensions, 'model_dump'):
-                dimensions_dict = dimensions.model_dump()
-            else:
-                dimensions_dict = dimensions.dict()
-            ship_request["requestedShipment"]["requestedPackageLineItems"][0]["dimensions"] = dimensions_dict
-
-        # Add special services if available
-        if request.special_services:
-            special_services = {
-                "specialServiceTypes": []
-            }
-
-            # Add signature option if specified
-            if request.special_services.signature_option:
-                special_services["signatureOptionType"] = request.special_services.signature_option
-
-            # Add Saturday delivery if requested
-            if request.special_services.saturday_delivery:
-                special_services["specialServiceTypes"].append("SATURDAY_DELIVERY")
-
-            # Add Sunday delivery if requested
-            if request.special_services.sunday_delivery:
-                special_services["specialServiceTypes"].append("SUNDAY_DELIVERY")
-
-            # Add residential delivery if requested
-            if request.special_services.residential_delivery:
-                # Make a copy of the address dictionary
-                address_dict = ship_request["requestedShipment"]["recipients"][0]["address"]
-                # Add the residential flag
-                address_dict["residential"] = True
-                # Update the address in the ship_request
-                ship_request["requestedShipment"]["recipients"][0]["address"] = address_dict
-
-            # Add hold at location if requested
-            if request.special_services.hold_at_location:
-                special_services["specialServiceTypes"].append("HOLD_AT_LOCATION")
-
-            # Add dry ice if requested
-            if request.special_services.dry_ice:
-                special_services["specialServiceTypes"].append("DRY_ICE")
-
-            # Add dangerous goods if requested
-            if request.special_services.dangerous_goods:
-                special_services["specialServiceTypes"].append("DANGEROUS_GOODS")
-
-            # Add priority alert if requested
-            if request.special_services.priority_alert:
-                special_services["specialServiceTypes"].append("PRIORITY_ALERT")
-
-            # Only add special services if there are any
-            if special_services["specialServiceTypes"] or "signatureOptionType" in special_services:
-                ship_request["requestedShipment"]["specialServicesRequested"] = special_services
-
-        return ship_request
+        return template.build(request, datetime.now().strftime("%Y-%m-%d"))
 
     def _extract_tracking_number(self, response_data: dict) -> str:
         """Extract tracking number from FedEx response"""
@@ -284,35 +270,24 @@ class FedExShipEngine:
         except (IndexError, KeyError, AttributeError) as e:
             raise ValueError(f"Error extracting tracking number: {str(e)}")
 
-    def _extract_label_data(self, response_data: dict) -> dict:
-        """Extract label data from FedEx response"""
+    async def _extract_label_data(self, response_data: dict) -> dict:
+        """Extract label data for every piece from FedEx response"""
         try:
-            # For URL_ONLY response, we get a URL to the label
-            documents = response_data.get("output", {}).get("transactionShipments", [{}])[0].get("pieceResponses", [{}])[0].get("packageDocuments", [])
+            shipment = response_data.get("output", {}).get("transactionShipments", [{}])[0]
+            master_tracking_number = shipment.get("masterTrackingNumber")
 
-            for doc in documents:
-                if doc.get("url"):
-                    # Return the URL directly
-                    return {"url": doc.get("url")}
-                elif doc.get("encodedLabel"):
-                    # For encoded labels, save to a file and return the file path
-                    tracking_number = response_data.get("output", {}).get("transactionShipments", [{}])[0].get("masterTrackingNumber")
-                    if not tracking_number:
-                        tracking_number = response_data.get("output", {}).get("transactionShipments", [{}])[0].get("pieceResponses", [{}])[0].get("trackingNumber")
-
-                    if not tracking_number:
-                        raise ValueError("Tracking number not found in response")
-
-                    # Save the encoded label to a file
-                    label_path = f"static/labels/{tracking_number}.pdf"
-                    with open(label_path, "wb") as f:
-                        f.write(base64.b64decode(doc.get("encodedLabel")))
-
-                    # Return the file path
-                    return {"url": f"/static/labels/{tracking_number}.pdf"}
-
-            # If we get here, we didn't find a label URL or encoded label
-            raise ValueError("Label data not found in response")
+            # Per-piece documents are saved concurrently
+            pieces = await asyncio.gather(*[
+                self._extract_piece_label(piece, master_tracking_number)
+                for piece in shipment.get("pieceResponses", [])
+            ])
+            pieces = [piece for piece in pieces if piece]
+
+            if not pieces:
+                # If we get here, we didn't find a label URL or encoded label
+                raise ValueError("Label data not found in response")
+
+            return {"url": pieces[0]["url"], "pieces": pieces}
         except (IndexError, KeyError, AttributeError) as e:
             raise ValueError(f"Error extracting label data: {str(e)}")
         except httpx.HTTPError as e:
@@ -320,6 +295,39 @@ class FedExShipEngine:
         except Exception as e:
             raise ValueError(f"Error processing label data: {str(e)}")
 
+    async def _extract_piece_label(self, piece: dict, master_tracking_number: str) -> dict:
+        """Extract the label for one piece, saving encoded labels to storage"""
+        tracking_number = piece.get("trackingNumber") or master_tracking_number
+        if not tracking_number:
+            raise ValueError("Tracking number not found in response")
+
+        for doc in piece.get("packageDocuments", []):
+            if doc.get("url"):
+                # For URL_ONLY response, we get a URL to the label
+                return {"tracking_number": tracking_number, "url": doc.get("url")}
+            elif doc.get("encodedLabel"):
+                # Decode the label in chunks straight to storage, off the event loop
+                stored = await self._storage.save_base64(
+                    doc.get("encodedLabel"),
+                    extension_for_doc_type(doc.get("docType")),
+                    tracking_number
+                )
+                return {"tracking_number": tracking_number, "url": stored.url}
+
+        return None
+
+    def _summarize_response(self, data):
+        """Copy of a FedEx response with encoded documents replaced by their size"""
+        if isinstance(data, dict):
+            return {
+                key: f"<{len(value)} base64 chars>" if key == "encodedLabel" and isinstance(value, str)
+                else self._summarize_response(value)
+                for key, value in data.items()
+            }
+        if isinstance(data, list):
+            return [self._summarize_response(item) for item in data]
+        return data
+
     def _extract_qr_code(self, response_data: dict) -> str:
         """Extract QR code from FedEx response if available"""
         try:
@@ -0,0 +1,141 @@
+# FedEx Ship Template
+# Ship API payloads built from templates precompiled per account and service
+
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from models.label_request import LabelRequest
+from models.shipping import Address
+
+# Contact phone FedEx requires when the caller didn't give one
+DEFAULT_PHONE = "5555555555"
+
+# Boolean special services and the FedEx type each one requests, in payload order
+SPECIAL_SERVICE_TYPES: Tuple[Tuple[str, str], ...] = (
+    ("saturday_delivery", "SATURDAY_DELIVERY"),
+    ("sunday_delivery", "SUNDAY_DELIVERY"),
+    ("hold_at_location", "HOLD_AT_LOCATION"),
+    ("dry_ice", "DRY_ICE"),
+    ("dangerous_goods", "DANGEROUS_GOODS"),
+    ("priority_alert", "PRIORITY_ALERT"),
+)
+
+_SHIPPING_CHARGES_PAYMENT = {"paymentType": "SENDER"}
+_LABEL_SPECIFICATION = {
+    "labelFormatType": "COMMON2D",
+    "imageType": "PDF",
+    "labelStockType": "PAPER_85X11_TOP_HALF_LABEL"
+}
+
+class FedExShipTemplate:
+    """
+    Ship request payload with everything but the shipment filled in.
+
+    The account, service, packaging, pickup, payment and label
+    specification parts are built once per template and shared by every
+    payload it produces; build() only creates the addresses, contacts and
+    package line items. Payloads are therefore read-only: copy a shared
+    part before changing it.
+    """
+
+    __slots__ = ("_account", "_service_type", "_packaging_type", "_pickup_type")
+
+    def __init__(self, account_number: str, service_type: str, packaging_type: str, pickup_type: str):
+        self._account = {"value": account_number}
+        self._service_type = service_type
+        self._packaging_type = packaging_type
+        self._pickup_type = pickup_type
+
+    def build(self, request: LabelRequest, ship_date: str) -> dict:
+        """
+        Ship request payload for a label request.
+
+        Args:
+            request: Label request for this template's service
+            ship_date: shipDatestamp, YYYY-MM-DD
+        """
+        packages = request.get_packages()
+        special_services = request.special_services
+        line_items = []
+        total_weight = 0
+        for sequence_number, package in enumerate(packages, start=1):
+            line_item = {
+                "sequenceNumber": sequence_number,
+                "weight": {"value": package.weight, "units": "LB"},
+                "groupPackageCount": 1
+            }
+            dimensions = package.dimensions
+            if dimensions:
+                line_item["dimensions"] = {
+                    "length": dimensions.length,
+                    "width": dimensions.width,
+                    "height": dimensions.height,
+                    "units": "IN"
+                }
+            line_items.append(line_item)
+            total_weight += package.weight
+
+        requested_shipment = {
+            "shipper": _party(request.shipper, False),
+            "recipients": [_party(request.recipient, bool(special_services and special_services.residential_delivery))],
+            "shipDatestamp": ship_date,
+            "serviceType": self._service_type,
+            "packagingType": self._packaging_type,
+            "pickupType": self._pickup_type,
+            "blockInsightVisibility": False,
+            "shippingChargesPayment": _SHIPPING_CHARGES_PAYMENT,
+            "labelSpecification": _LABEL_SPECIFICATION,
+            # All pieces go in one multi-piece shipment under a master tracking number
+            "totalPackageCount": len(line_items),
+            "totalWeight": total_weight,
+            "requestedPackageLineItems": line_items
+        }
+        if special_services:
+            requested = _special_services_requested(
+                special_services.signature_option,
+                *(getattr(special_services, flag) for flag, _ in SPECIAL_SERVICE_TYPES)
+            )
+            if requested:
+                requested_shipment["specialServicesRequested"] = requested
+
+        return {
+            "accountNumber": self._account,
+            "labelResponseOptions": "URL_ONLY",
+            "requestedShipment": requested_shipment
+        }
+
+def _party(address: Address, residential: bool) -> dict:
+    fedex_address = {
+        "streetLines": [address.street],
+        "city": address.city,
+        "stateOrProvinceCode": address.state,
+        "postalCode": address.zip_code,
+        "countryCode": address.country
+    }
+    if residential:
+        fedex_address["residential"] = True
+    return {
+        "address": fedex_address,
+        "contact": {
+            "personName": address.name,
+            "companyName": address.company or address.name,
+            "phoneNumber": address.phone or DEFAULT_PHONE
+        }
+    }
+
+@lru_cache(maxsize=256)
+def _special_services_requested(signature_option: Optional[str], *flags: bool) -> Optional[dict]:
+    """Shared specialServicesRequested for a combination of services, None if there are none"""
+    requested = {
+        "specialServiceTypes": [service_type for (_, service_type), flag in zip(SPECIAL_SERVICE_TYPES, flags) if flag]
+    }
+    if signature_option:
+        requested["signatureOptionType"] = signature_option
+    if not requested["specialServiceTypes"] and not signature_option:
+        return None
+    return requested
+
+@lru_cache(maxsize=256)
+def get_ship_template(account_number: str, service_type: str, packaging_type: str, pickup_type: str) -> FedExShipTemplate:
+    """Get the template for an account, service, packaging and pickup type"""
+    return FedExShipTemplate(account_number, service_type, packaging_type, pickup_type)
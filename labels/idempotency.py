@@ -0,0 +1,137 @@
+# Idempotency
+# Replays label responses for retried requests carrying the same Idempotency-Key
+
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from pydantic import BaseModel
+
+from models.label_request import LabelRequest
+from models.label_response import LabelResponse, SubmittedLabel
+from utils.exceptions import IdempotencyError
+from utils.single_flight import SingleFlight
+
+class IdempotencyStore:
+    """
+    Remembers the LabelResponse produced for each idempotency key.
+
+    A repeat of a completed key returns the stored response without calling
+    the carrier again; a repeat that arrives while the first call is still in
+    flight waits for it instead of creating (and billing) a second shipment.
+    The carrier call isn't abandoned when the first client disconnects: it
+    completes, and waiting duplicates and later retries get its response.
+    Failed calls are not stored, so the client may retry them. A shipment the
+    carrier accepted before the failure is kept with remember_submitted(),
+    and the retry finishes it instead of creating and billing another.
+    Entries expire after IDEMPOTENCY_TTL_HOURS and the store keeps at most
+    IDEMPOTENCY_MAX_KEYS of them.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_keys: Optional[int] = None):
+        self._ttl = ttl_seconds or float(os.getenv('IDEMPOTENCY_TTL_HOURS', '24')) * 3600
+        self._max_keys = max_keys or int(os.getenv('IDEMPOTENCY_MAX_KEYS', '100000'))
+        # key -> (fingerprint, response, expires_at)
+        self._completed: "OrderedDict[str, Tuple[str, LabelResponse, float]]" = OrderedDict()
+        # key -> fingerprint of the request being created
+        self._in_flight: Dict[str, str] = {}
+        # key -> (fingerprint, (request, submitted shipment), expires_at) for calls that failed after the carrier call
+        self._submitted: "OrderedDict[str, Tuple[str, Tuple[LabelRequest, SubmittedLabel], float]]" = OrderedDict()
+        self._calls = SingleFlight()
+
+    @staticmethod
+    def fingerprint(request: BaseModel) -> str:
+        """Hash of a request body, used to detect a key reused for a different request"""
+        if hasattr(request, 'model_dump_json'):
+            body = request.model_dump_json()
+        else:
+            body = request.json()
+        return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+    async def run(
+        self,
+        key: str,
+        fingerprint: str,
+        create: Callable[[], Awaitable[LabelResponse]]
+    ) -> Tuple[LabelResponse, bool]:
+        """
+        Run create() once per key.
+
+        Args:
+            key: Client supplied idempotency key
+            fingerprint: Fingerprint of the request body
+            create: Coroutine factory that performs the carrier call
+
+        Returns:
+            Tuple of (response, replayed) where replayed is True if the
+            response came from an earlier request with the same key
+
+        Raises:
+            IdempotencyError: If the key was used for a different request
+        """
+        self._expire()
+
+        completed = self._completed.get(key)
+        if completed:
+            self._check_fingerprint(key, completed[0], fingerprint)
+            return self._copy(completed[1]), True
+
+        submitted = self._submitted.get(key)
+        if submitted:
+            self._check_fingerprint(key, submitted[0], fingerprint)
+
+        in_flight = self._in_flight.get(key)
+        if in_flight:
+            self._check_fingerprint(key, in_flight, fingerprint)
+            response = await self._calls.run(key, create)
+            return self._copy(response), True
+
+        self._in_flight[key] = fingerprint
+        response = await self._calls.run(key, lambda: self._create(key, fingerprint, create))
+        return response, False
+
+    async def _create(self, key: str, fingerprint: str, create: Callable[[], Awaitable[LabelResponse]]) -> LabelResponse:
+        try:
+            response = await create()
+        finally:
+            del self._in_flight[key]
+
+        self._submitted.pop(key, None)
+        self._completed[key] = (fingerprint, response, time.time() + self._ttl)
+        while len(self._completed) > self._max_keys:
+            self._completed.popitem(last=False)
+        return response
+
+    def remember_submitted(self, key: str, request: LabelRequest, submitted: SubmittedLabel) -> None:
+        """Keep a shipment the carrier accepted for key, in case finishing it fails"""
+        fingerprint = self._in_flight[key]
+        self._submitted[key] = (fingerprint, (request, submitted), time.time() + self._ttl)
+        while len(self._submitted) > self._max_keys:
+            self._submitted.popitem(last=False)
+
+    def get_submitted(self, key: str) -> Optional[Tuple[LabelRequest, SubmittedLabel]]:
+        """The request and shipment an earlier, failed call for key already created"""
+        submitted = self._submitted.get(key)
+        return submitted[1] if submitted else None
+
+    def _copy(self, response: LabelResponse) -> LabelResponse:
+        """Copy a stored response so callers can't mutate the stored one"""
+        if hasattr(response, 'model_copy'):
+            return response.model_copy(deep=True)
+        return response.copy(deep=True)
+
+    def _check_fingerprint(self, key: str, stored: str, fingerprint: str) -> None:
+        if stored != fingerprint:
+            raise IdempotencyError(f"Idempotency key {key} was already used with a different request")
+
+    def _expire(self) -> None:
+        """Drop expired keys (oldest first, since entries are kept in insertion order)"""
+        now = time.time()
+        for entries in (self._completed, self._submitted):
+            while entries:
+                key, (_, _, expires_at) = next(iter(entries.items()))
+                if expires_at > now:
+                    break
+                entries.popitem(last=False)
@@ -1,10 +1,14 @@
-
 from labels.fedex_ship import FedExShipEngine
 from labels.ups_ship import UPSShipEngine
-from labels.qr_generator import generate_qr_code
+from labels.qr_cache import get_qr_cache, public_url
+from labels.label_prefetch import get_label_prefetcher
+from labels.prevalidation import LabelPrevalidator
 from models.label_request import LabelRequest
-from models.label_response import LabelResponse
-import os
+from models.label_response import LabelResponse, SubmittedLabel
+from pickup.pickup_scheduler import get_pickup_scheduler
+from tracking.tracking_poller import get_tracking_poller
+from shipments.shipment_store import get_shipment_store
+from rates.quote_store import get_quote_store
 
 class LabelCreator:
     def __init__(self):
@@ -12,19 +16,86 @@ class LabelCreator:
             "fedex": FedExShipEngine(),
             "ups": UPSShipEngine(),
         }
+        self._qr_cache = get_qr_cache()
+        self.prevalidator = LabelPrevalidator(self.engines)
 
     async def create_label(self, request: LabelRequest) -> LabelResponse:
+        submitted = await self.submit_label(request)
+        return await self.finish_label(request, submitted)
+
+    async def submit_label(self, request: LabelRequest) -> SubmittedLabel:
+        """
+        Carrier round trip only: create the shipment and get its tracking number.
+
+        A quoted request uses up its quote once the carrier accepts the shipment.
+
+        Raises:
+            ValueError: If the carrier rejects the shipment or the quote was
+                already used
+        """
         engine = self.engines.get(request.carrier)
         if not engine:
             raise ValueError("Unsupported carrier")
 
-        label = await engine.create_label(request)
+        quotes = get_quote_store()
+        if request.quote_id:
+            quotes.reserve(request.quote_id)
+        try:
+            submitted = await self._submit(engine, request)
+        except BaseException:
+            if request.quote_id:
+                quotes.release(request.quote_id)
+            raise
+        if request.quote_id:
+            quotes.consume(request.quote_id)
+        return submitted
+
+    async def _submit(self, engine, request: LabelRequest) -> SubmittedLabel:
+        # Payload built and validated while the caller was confirming
+        if request.prevalidation_token:
+            ship_request = await self.prevalidator.take(request.prevalidation_token, request)
+            if ship_request is not None:
+                return await engine.submit_shipment(request, ship_request)
+
+        return await engine.submit_shipment(request)
+
+    async def finish_label(self, request: LabelRequest, submitted: SubmittedLabel) -> LabelResponse:
+        """
+        Post-process a submitted shipment: label documents, QR code, tracking, storage and pickup.
 
-        # Fallback QR code generation
+        Raises:
+            RuntimeError: If the shipment couldn't be recorded in the shipment store
+        """
+        engine = self.engines.get(submitted.carrier)
+        label = await engine.build_label_response(request, submitted)
+
+        if request.quote:
+            label.quote_id = request.quote.quote_id
+            label.quoted_cost = request.quote.option.cost
+
+        # Carrier-hosted (URL_ONLY) documents are downloaded now and served locally;
+        # the QR code keeps the carrier URL, since the local one is relative
+        qr_data = public_url(label.label_url)
+        label = get_label_prefetcher().register(label)
+
+        # Fallback QR code, rendered on first request to its URL
         if not label.native_qr_code_base64:
-            label_url = label.label_url
-            qr_output_path = f"static/labels/qr/{label.tracking_number}.png"
-            generate_qr_code(label_url, qr_output_path)
-            label.fallback_qr_code_url = f"/static/labels/qr/{label.tracking_number}.png"
+            label.fallback_qr_code_url = self._qr_cache.register(label.tracking_number, qr_data)
+
+        # Only while polling is on; otherwise nothing would ever expire it
+        poller = get_tracking_poller()
+        if poller.is_running():
+            poller.track(label.carrier, label.tracking_number)
+
+        # Committed with the next batch. Waited for: the end-of-day close only
+        # sees shipments in the store, so a lost record would never be closed
+        try:
+            await get_shipment_store().add(request, label, account_number=getattr(engine, 'account_number', None))
+        except Exception as e:
+            raise RuntimeError(f"Label {label.tracking_number} was created but could not be recorded: {str(e)}")
+
+        # Booked later together with the rest of the day's shipments from this location
+        if request.pickup_requested:
+            get_pickup_scheduler().add_shipment(request, label)
 
         return label
@@ -0,0 +1,69 @@
+# Label File Cache
+# Small in-memory LRU of hot label files, bounded by total bytes
+
+import asyncio
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+class LabelFileCache:
+    """
+    Keeps the contents of recently served label files in memory.
+
+    Only content-addressed files are cached: their name is their hash, so
+    a cached copy can never go stale. Files larger than
+    LABEL_HOT_CACHE_MAX_FILE_BYTES are always streamed from disk, and the
+    cache as a whole holds at most LABEL_HOT_CACHE_BYTES, evicting the
+    least recently served files first.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, max_file_bytes: Optional[int] = None):
+        self._max_bytes = max_bytes if max_bytes is not None else int(os.getenv('LABEL_HOT_CACHE_BYTES', str(32 * 1024 * 1024)))
+        self._max_file_bytes = max_file_bytes if max_file_bytes is not None else int(os.getenv('LABEL_HOT_CACHE_MAX_FILE_BYTES', str(512 * 1024)))
+        self._files: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+
+    async def get(self, path: str) -> Optional[bytes]:
+        """
+        Contents of a file, from memory if it is hot.
+
+        Returns:
+            File contents, or None if the file is too large to cache (or
+            missing) and should be streamed instead
+        """
+        content = self._files.get(path)
+        if content is not None:
+            self._files.move_to_end(path)
+            return content
+
+        content = await asyncio.to_thread(self._read_small, path)
+        if content is not None:
+            self._remember(path, content)
+        return content
+
+    def _read_small(self, path: str) -> Optional[bytes]:
+        try:
+            if os.path.getsize(path) > self._max_file_bytes:
+                return None
+            return Path(path).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def _remember(self, path: str, content: bytes) -> None:
+        if len(content) > self._max_bytes or path in self._files:
+            return
+        self._files[path] = content
+        self._size += len(content)
+        while self._size > self._max_bytes:
+            _, evicted = self._files.popitem(last=False)
+            self._size -= len(evicted)
+
+_file_cache: Optional[LabelFileCache] = None
+
+def get_label_file_cache() -> LabelFileCache:
+    """Get the process-wide hot label file cache"""
+    global _file_cache
+    if _file_cache is None:
+        _file_cache = LabelFileCache()
+    return _file_cache
@@ -0,0 +1,259 @@
+# Label Jobs
+# Asynchronous label creation: respond after the carrier call, post-process in the background
+
+import asyncio
+import json
+import os
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from labels.label_creator import LabelCreator
+from labels.qr_cache import get_qr_cache
+from models.label_job import LabelJob, LabelJobRequest
+from models.label_response import SubmittedLabel
+from utils.email_delivery import send_label_email
+from utils.webhook_client import check_webhook_url, get_webhook_client
+
+# A post-processing step receives the job (with its finished label) and the original request
+PostProcessingStep = Callable[[LabelJob, LabelJobRequest], Awaitable[None]]
+QueuedJob = Tuple[LabelJob, LabelJobRequest, SubmittedLabel]
+
+def _dump(model) -> dict:
+    return model.model_dump(mode="json") if hasattr(model, 'model_dump') else json.loads(model.json())
+
+class LabelJobManager:
+    """
+    Runs label post-processing on a bounded background worker pool.
+
+    submit() only waits for the carrier to accept the shipment. Saving label
+    documents, rendering the QR code, emailing the label and any extra
+    registered steps then run on LABEL_JOB_WORKERS workers fed from a queue
+    of at most LABEL_JOB_QUEUE_SIZE jobs (submit() waits for room when it is
+    full). Callers poll get() or pass a callback_url that receives the
+    finished job.
+
+    Queued jobs are shipments the carrier has already accepted, so
+    shutdown() stops taking new jobs and drains the queue for up to
+    LABEL_JOB_SHUTDOWN_SECONDS. Jobs still unfinished after that are marked
+    failed and their carrier responses written to LABEL_JOB_RECOVERY_PATH,
+    from which recover() finishes them on the next start.
+    """
+
+    def __init__(self, creator: LabelCreator, workers: Optional[int] = None, queue_size: Optional[int] = None):
+        self._creator = creator
+        self._worker_count = workers or int(os.getenv('LABEL_JOB_WORKERS', '4'))
+        self._queue_size = queue_size or int(os.getenv('LABEL_JOB_QUEUE_SIZE', '1000'))
+        self._max_jobs = int(os.getenv('LABEL_JOB_MAX_RETAINED', '10000'))
+        self._callback_retries = int(os.getenv('LABEL_JOB_CALLBACK_RETRIES', '3'))
+        self._shutdown_timeout = float(os.getenv('LABEL_JOB_SHUTDOWN_SECONDS', '30'))
+        self._recovery_path = Path(os.getenv('LABEL_JOB_RECOVERY_PATH', 'data/label_jobs_recovery.jsonl'))
+        self._accepting = True
+        # Jobs a worker has taken off the queue but not finished
+        self._active: Dict[str, QueuedJob] = {}
+        self._jobs: "OrderedDict[str, LabelJob]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._steps: List[PostProcessingStep] = [self._render_qr_code, self._send_email]
+
+    def add_step(self, step: PostProcessingStep) -> None:
+        """Register an extra post-processing step, run after the built-in ones"""
+        self._steps.append(step)
+
+    async def submit(self, job_request: LabelJobRequest) -> LabelJob:
+        """
+        Create the shipment and queue its post-processing.
+
+        Args:
+            job_request: Label request plus optional callback URL and email
+
+        Returns:
+            LabelJob in "processing" state carrying the tracking number
+
+        Raises:
+            ValueError: If the carrier rejects the shipment, the callback URL
+                isn't allowed, or the service is shutting down
+        """
+        if not self._accepting:
+            raise ValueError("Label jobs are shutting down; try again shortly")
+        if job_request.callback_url:
+            check_webhook_url(job_request.callback_url)
+        submitted = await self._creator.submit_label(job_request.label)
+
+        job = LabelJob(
+            job_id=uuid.uuid4().hex,
+            status="processing",
+            carrier=submitted.carrier,
+            tracking_number=submitted.tracking_number,
+            created_at=datetime.now()
+        )
+        self._remember(job)
+
+        if not self._accepting:
+            # Shutdown started during the carrier call
+            await self._abandon([(job, job_request, submitted)])
+            return job
+        self._start_workers()
+        await self._queue.put((job, job_request, submitted))
+        return job
+
+    def get(self, job_id: str) -> Optional[LabelJob]:
+        """Current state of a job"""
+        return self._jobs.get(job_id)
+
+    async def join(self) -> None:
+        """Wait until every queued job has been processed"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def shutdown(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop taking jobs, finish the queued ones and stop the workers.
+
+        Args:
+            timeout: Seconds to wait for the queue to drain, defaults to
+                LABEL_JOB_SHUTDOWN_SECONDS
+        """
+        self._accepting = False
+        if self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout if timeout is not None else self._shutdown_timeout)
+            except asyncio.TimeoutError:
+                print("LabelJobManager: Queue not drained before shutdown timeout")
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+        leftover = list(self._active.values())
+        while self._queue is not None and not self._queue.empty():
+            leftover.append(self._queue.get_nowait())
+        await self._abandon(leftover)
+
+        self._active = {}
+        self._workers = []
+        self._queue = None
+
+    async def recover(self) -> int:
+        """
+        Queue the jobs an earlier shutdown couldn't finish.
+
+        Returns:
+            Number of jobs recovered
+        """
+        self._accepting = True
+        lines = await asyncio.to_thread(self._take_recovery_file)
+        for line in lines:
+            saved = json.loads(line)
+            job = LabelJob(**{**saved["job"], "status": "processing", "error": None, "completed_at": None})
+            self._remember(job)
+            self._start_workers()
+            await self._queue.put((job, LabelJobRequest(**saved["request"]), SubmittedLabel(**saved["submitted"])))
+        if lines:
+            print(f"LabelJobManager: Recovered {len(lines)} unfinished label jobs")
+        return len(lines)
+
+    async def _abandon(self, items: List[QueuedJob]) -> None:
+        """Mark unfinished jobs failed and save what's needed to finish them later"""
+        if not items:
+            return
+        lines = []
+        for job, job_request, submitted in items:
+            job.status = "failed"
+            job.error = "Interrupted by a restart before the label was processed; it will be finished on startup"
+            job.completed_at = datetime.now()
+            lines.append(json.dumps({
+                "job": _dump(job),
+                "request": _dump(job_request),
+                "submitted": _dump(submitted)
+            }))
+        await asyncio.to_thread(self._append_recovery_file, lines)
+        print(f"LabelJobManager: Saved {len(lines)} unfinished label jobs to {self._recovery_path}")
+
+    def _append_recovery_file(self, lines: List[str]) -> None:
+        self._recovery_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._recovery_path.open("a", encoding="utf-8") as f:
+            f.write("".join(f"{line}\n" for line in lines))
+
+    def _take_recovery_file(self) -> List[str]:
+        try:
+            lines = self._recovery_path.read_text(encoding="utf-8").splitlines()
+        except FileNotFoundError:
+            return []
+        self._recovery_path.unlink()
+        return [line for line in lines if line.strip()]
+
+    def _start_workers(self) -> None:
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self._queue_size)
+        self._workers = [
+            asyncio.create_task(self._worker())
+            for _ in range(self._worker_count)
+        ]
+
+    async def _worker(self) -> None:
+        while True:
+            item = await self._queue.get()
+            job, job_request, submitted = item
+            self._active[job.job_id] = item
+            try:
+                await self._process(job, job_request, submitted)
+            finally:
+                self._queue.task_done()
+            # Still listed if the worker was cancelled mid-job, so shutdown can save it
+            del self._active[job.job_id]
+
+    async def _process(self, job: LabelJob, job_request: LabelJobRequest, submitted: SubmittedLabel) -> None:
+        try:
+            job.label = await self._creator.finish_label(job_request.label, submitted)
+            for step in self._steps:
+                await step(job, job_request)
+            job.status = "completed"
+        except Exception as e:
+            print(f"LabelJobManager: Job {job.job_id} failed: {str(e)}")
+            job.status = "failed"
+            job.error = str(e)
+        job.completed_at = datetime.now()
+
+        if job_request.callback_url:
+            await self._notify_callback(job, job_request.callback_url)
+
+    async def _render_qr_code(self, job: LabelJob, job_request: LabelJobRequest) -> None:
+        """Render the fallback QR code now so the first fetch is a cache hit"""
+        if job.label and not job.label.native_qr_code_base64:
+            await get_qr_cache().get(job.label.tracking_number)
+
+    async def _send_email(self, job: LabelJob, job_request: LabelJobRequest) -> None:
+        if job_request.notify_email and job.label:
+            # Only queues the message; the email worker delivers it in batches
+            await send_label_email(
+                job_request.notify_email,
+                job.label.tracking_number,
+                job.label.label_url,
+                job.label.fallback_qr_code_url
+            )
+
+    async def _notify_callback(self, job: LabelJob, callback_url: str) -> None:
+        """POST the finished job to the caller, retrying with backoff"""
+        payload = _dump(job)
+        for attempt in range(self._callback_retries):
+            try:
+                response = await get_webhook_client().post(callback_url, json=payload, timeout=10.0)
+                if response.status_code < 500:
+                    return
+                print(f"LabelJobManager: Callback for job {job.job_id} returned {response.status_code}")
+            except ValueError as e:
+                print(f"LabelJobManager: Callback for job {job.job_id} refused: {str(e)}")
+                return
+            except Exception as e:
+                print(f"LabelJobManager: Callback for job {job.job_id} failed: {str(e)}")
+            if attempt < self._callback_retries - 1:
+                await asyncio.sleep(2 ** attempt)
+
+    def _remember(self, job: LabelJob) -> None:
+        self._jobs[job.job_id] = job
+        while len(self._jobs) > self._max_jobs:
+            self._jobs.popitem(last=False)
@@ -0,0 +1,148 @@
+# Label Prefetch
+# Downloads carrier-hosted (URL_ONLY) label documents into local storage right after creation
+
+import asyncio
+import os
+from collections import OrderedDict
+from typing import Optional, Set
+
+import httpx
+
+from labels.label_storage import CONTENT_TYPES, LabelStorage, StoredLabel, get_label_storage
+from models.label_response import LabelResponse
+from utils.http_client import get_http_client
+from utils.single_flight import SingleFlight
+
+# Content type -> file extension for downloaded documents
+EXTENSIONS = {content_type: extension for extension, content_type in CONTENT_TYPES.items()}
+
+def is_remote_url(url: Optional[str]) -> bool:
+    return bool(url) and url.startswith(("http://", "https://"))
+
+class LabelPrefetcher:
+    """
+    Keeps local copies of label documents the carrier only links to.
+
+    With labelResponseOptions URL_ONLY, FedEx returns a URL to the label
+    instead of its contents, and that URL can expire. register() starts a
+    background download of every such document as soon as the label is
+    created and rewrites the label's URLs to our own document route, so
+    the response, the shipment store and every reprint point at the local
+    copy. A request that arrives before the download has finished waits for
+    it instead of starting another one. Downloads run at most
+    LABEL_PREFETCH_CONCURRENCY at a time and are retried
+    LABEL_PREFETCH_RETRIES times. The carrier URL is saved in the label
+    index, so a failed download is retried from it on the next request,
+    even after a restart.
+    """
+
+    def __init__(self, storage: Optional[LabelStorage] = None, concurrency: Optional[int] = None, max_registered: Optional[int] = None):
+        self._storage = storage or get_label_storage()
+        self._client = get_http_client()
+        self._semaphore = asyncio.Semaphore(concurrency or int(os.getenv('LABEL_PREFETCH_CONCURRENCY', '8')))
+        self._retries = int(os.getenv('LABEL_PREFETCH_RETRIES', '3'))
+        self._backoff = float(os.getenv('LABEL_PREFETCH_BACKOFF_SECONDS', '1.0'))
+        self._max_registered = max_registered or int(os.getenv('LABEL_PREFETCH_REGISTRY_SIZE', '100000'))
+        self._remote: "OrderedDict[str, str]" = OrderedDict()
+        self._downloads = SingleFlight()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def register(self, label: LabelResponse) -> LabelResponse:
+        """
+        Start downloading a label's carrier-hosted documents.
+
+        Returns:
+            The label, with carrier URLs replaced by local document URLs
+        """
+        for piece in label.pieces:
+            if is_remote_url(piece.label_url):
+                if piece.label_url == label.label_url:
+                    label.label_url = self.local_url(piece.tracking_number)
+                piece.label_url = self._prefetch(piece.tracking_number, piece.label_url)
+        if is_remote_url(label.label_url):
+            label.label_url = self._prefetch(label.tracking_number, label.label_url)
+        return label
+
+    def local_url(self, tracking_number: str) -> str:
+        """URL a tracking number's cached label document is served from"""
+        return f"/static/labels/documents/{tracking_number}"
+
+    async def get(self, tracking_number: str) -> Optional[StoredLabel]:
+        """
+        Local copy of a label document, waiting for or retrying its download.
+
+        Returns:
+            StoredLabel, or None if the document is unknown
+
+        Raises:
+            ValueError: If the carrier document can't be downloaded
+        """
+        pending = self._downloads.get(tracking_number)
+        if pending:
+            return await asyncio.shield(pending)
+
+        stored = await self._storage.lookup(tracking_number)
+        if stored:
+            return stored
+        url = self._remote.get(tracking_number) or await self._storage.lookup_source(tracking_number)
+        if not url:
+            return None
+
+        # An earlier download failed or was lost with a restart; try again for this request
+        return await self._downloads.run(tracking_number, lambda: self._run(tracking_number, url))
+
+    async def flush(self) -> None:
+        """Wait for every download in progress"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _prefetch(self, tracking_number: str, url: str) -> str:
+        self._remote[tracking_number] = url
+        self._remote.move_to_end(tracking_number)
+        while len(self._remote) > self._max_registered:
+            self._remote.popitem(last=False)
+
+        # Failures are logged and retried on the next get()
+        task = self._downloads.start(tracking_number, lambda: self._run(tracking_number, url))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return self.local_url(tracking_number)
+
+    async def _run(self, tracking_number: str, url: str) -> StoredLabel:
+        try:
+            # Kept with the index so the local URL still resolves after a restart or a failed download
+            await self._storage.save_source(tracking_number, url)
+            return await self._download(tracking_number, url)
+        except Exception as e:
+            print(f"LabelPrefetcher: Downloading label for {tracking_number} failed: {str(e)}")
+            raise
+
+    async def _download(self, tracking_number: str, url: str) -> StoredLabel:
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    response = await self._client.get(url, timeout=30.0)
+                if response.status_code == 200:
+                    content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+                    extension = EXTENSIONS.get(content_type, "pdf")
+                    return await self._storage.save(response.content, extension, tracking_number)
+                error = ValueError(f"Label download error: HTTP {response.status_code}")
+                retryable = response.status_code >= 500 or response.status_code == 429
+            except httpx.RequestError as e:
+                error = ValueError(f"Label download error: {str(e)}")
+                retryable = True
+
+            attempt += 1
+            if not retryable or attempt > self._retries:
+                raise error
+            await asyncio.sleep(self._backoff * 2 ** (attempt - 1))
+
+_prefetcher: Optional[LabelPrefetcher] = None
+
+def get_label_prefetcher() -> LabelPrefetcher:
+    """Get the process-wide label prefetcher"""
+    global _prefetcher
+    if _prefetcher is None:
+        _prefetcher = LabelPrefetcher()
+    return _prefetcher
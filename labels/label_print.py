@@ -0,0 +1,257 @@
+# Label Print
+# Merged print streams (one PDF or one ZPL stream) for a wave of stored labels
+
+import io
+import zlib
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pypdf import PdfReader
+from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, StreamObject
+
+from labels.label_prefetch import LabelPrefetcher, get_label_prefetcher
+from labels.label_storage import StoredLabel
+from shipments.shipment_store import get_shipment_store
+
+# Bytes read from disk per step when copying ZPL files
+PRINT_CHUNK_SIZE = 64 * 1024
+
+# Page attributes a page may inherit from its page tree
+INHERITED_PAGE_KEYS = ("/Resources", "/MediaBox", "/CropBox", "/Rotate")
+
+# Image filters pypdf's get_data() leaves encoded; their streams keep the filter
+PASSTHROUGH_FILTERS = ("/DCTDecode", "/DCT", "/JPXDecode")
+
+async def resolve_print_documents(
+    tracking_numbers: List[str],
+    prefetcher: Optional[LabelPrefetcher] = None,
+    store=None
+) -> Tuple[List[StoredLabel], List[str]]:
+    """
+    Find the stored label documents for a wave of shipments, in order.
+
+    Multi-piece shipments are expanded to one document per piece using the
+    shipment store; the same document is never printed twice. Carrier-hosted
+    documents still downloading (or whose download failed) are waited for
+    or fetched again through the prefetcher.
+
+    Returns:
+        (documents, tracking numbers with no stored label)
+    """
+    prefetcher = prefetcher or get_label_prefetcher()
+    store = store or get_shipment_store()
+    documents, missing, seen = [], [], set()
+
+    for tracking_number in tracking_numbers:
+        shipment = await store.get(tracking_number)
+        pieces = [piece.tracking_number for piece in shipment.label.pieces] if shipment and shipment.label.pieces else [tracking_number]
+        for piece in pieces:
+            try:
+                stored = await prefetcher.get(piece)
+            except ValueError as e:
+                print(f"resolve_print_documents: No document for {piece}: {str(e)}")
+                stored = None
+            if stored is None:
+                missing.append(piece)
+            elif stored.sha256 not in seen:
+                seen.add(stored.sha256)
+                documents.append(stored)
+
+    return documents, missing
+
+def iter_zpl_stream(paths: Iterable[str], chunk_size: int = PRINT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Concatenate ZPL label files, reading one chunk at a time"""
+    for path in paths:
+        last = b""
+        with open(path, "rb") as f:
+            while chunk := f.read(chunk_size):
+                last = chunk
+                yield chunk
+        if last and not last.endswith(b"\n"):
+            # Keep each label's ^XZ on its own line for the printer
+            yield b"\n"
+
+def iter_merged_pdf(paths: Iterable[str]) -> Iterator[bytes]:
+    """
+    Merge PDF label files into one PDF, yielding it as it is written.
+
+    Each source document is opened on its own and its pages' objects are
+    written out as soon as they are reached, so only one document is parsed
+    at a time and nothing is kept afterwards except object offsets; the page
+    tree and cross-reference table go at the end.
+    """
+    writer = _PdfStreamWriter()
+    yield writer.header()
+    for path in paths:
+        with open(path, "rb") as f:
+            yield from writer.add_document(PdfReader(f))
+    yield writer.trailer()
+
+class _PdfStreamWriter:
+    """Writes a PDF sequentially: objects first, page tree and xref last"""
+
+    CATALOG = 1
+    PAGES = 2
+
+    def __init__(self):
+        self._offsets: Dict[int, int] = {}
+        self._position = 0
+        self._next_number = 3
+        self._kids: List[int] = []
+
+    def header(self) -> bytes:
+        return self._advance(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+
+    def add_document(self, reader: PdfReader) -> Iterator[bytes]:
+        # Source (object number, generation) -> output object number
+        numbers: Dict[Tuple[int, int], int] = {}
+        pending: deque = deque()
+
+        pages = list(reader.pages)
+        for page in pages:
+            numbers[self._key(page.indirect_reference)] = self._allocate()
+
+        for page in pages:
+            number = numbers[self._key(page.indirect_reference)]
+            self._kids.append(number)
+            entries = {key: value for key, value in dict.items(page) if key != "/Parent"}
+            for key in INHERITED_PAGE_KEYS:
+                if key not in entries:
+                    inherited = self._inherited(page, key)
+                    if inherited is not None:
+                        entries[key] = inherited
+
+            body = io.BytesIO()
+            body.write(b"<<")
+            for key, value in entries.items():
+                body.write(b" ")
+                NameObject(key).write_to_stream(body)
+                body.write(b" ")
+                self._write_value(value, body, numbers, pending)
+            body.write(f" /Parent {self.PAGES} 0 R >>".encode())
+            yield self._object(number, body.getvalue())
+
+            # Everything this page refers to that hasn't been written yet
+            while pending:
+                source, number = pending.popleft()
+                body = io.BytesIO()
+                self._write_value(source.get_object(), body, numbers, pending)
+                yield self._object(number, body.getvalue())
+
+    def trailer(self) -> bytes:
+        data = self._object(self.CATALOG, f"<< /Type /Catalog /Pages {self.PAGES} 0 R >>".encode())
+        kids = " ".join(f"{number} 0 R" for number in self._kids)
+        data += self._object(self.PAGES, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._kids)} >>".encode())
+
+        xref_position = self._position
+        xref = [f"xref\n0 {self._next_number}\n", "0000000000 65535 f \n"]
+        for number in range(1, self._next_number):
+            xref.append(f"{self._offsets.get(number, 0):010d} 00000 n \n")
+        xref.append(f"trailer\n<< /Size {self._next_number} /Root {self.CATALOG} 0 R >>\nstartxref\n{xref_position}\n%%EOF\n")
+        return data + self._advance("".join(xref).encode())
+
+    def _write_value(self, value, out: io.BytesIO, numbers: Dict[Tuple[int, int], int], pending: deque) -> None:
+        if isinstance(value, IndirectObject):
+            key = self._key(value)
+            if key not in numbers:
+                target = value.get_object()
+                if isinstance(target, DictionaryObject) and target.get("/Type") == "/Pages":
+                    # The source page tree is replaced by ours
+                    out.write(b"null")
+                    return
+                numbers[key] = self._allocate()
+                pending.append((value, numbers[key]))
+            out.write(f"{numbers[key]} 0 R".encode())
+        elif isinstance(value, DictionaryObject):
+            is_stream = isinstance(value, StreamObject)
+            out.write(b"<<")
+            for key, item in dict.items(value):
+                if is_stream and key in ("/Length", "/Filter", "/DecodeParms"):
+                    continue
+                out.write(b" ")
+                NameObject(key).write_to_stream(out)
+                out.write(b" ")
+                self._write_value(item, out, numbers, pending)
+            if is_stream:
+                data, stream_filter, decode_parms = _stream_data(value)
+                if stream_filter:
+                    out.write(f" /Filter {stream_filter}".encode())
+                if decode_parms is not None:
+                    out.write(b" /DecodeParms ")
+                    self._write_value(decode_parms, out, numbers, pending)
+                out.write(f" /Length {len(data)} >>\nstream\n".encode())
+                out.write(data)
+                out.write(b"\nendstream")
+            else:
+                out.write(b" >>")
+        elif isinstance(value, ArrayObject):
+            out.write(b"[")
+            for item in value:
+                out.write(b" ")
+                self._write_value(item, out, numbers, pending)
+            out.write(b" ]")
+        else:
+            value.write_to_stream(out)
+
+    @staticmethod
+    def _inherited(page: DictionaryObject, key: str) -> Optional[object]:
+        node = dict.get(page, "/Parent")
+        while node is not None:
+            node = node.get_object()
+            value = dict.get(node, key)
+            if value is not None:
+                return value
+            node = dict.get(node, "/Parent")
+        return None
+
+    @staticmethod
+    def _key(reference: IndirectObject) -> Tuple[int, int]:
+        return (reference.idnum, reference.generation)
+
+    def _allocate(self) -> int:
+        number = self._next_number
+        self._next_number += 1
+        return number
+
+    def _object(self, number: int, body: bytes) -> bytes:
+        self._offsets[number] = self._position
+        return self._advance(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+
+    def _advance(self, data: bytes) -> bytes:
+        self._position += len(data)
+        return data
+
+def _stream_data(stream: StreamObject) -> Tuple[bytes, Optional[str], Optional[object]]:
+    """
+    A stream's data for writing, through pypdf's public get_data().
+
+    Returns:
+        (data, filter, decode parameters). Decoded data is deflated again;
+        JPEG and JPEG 2000 images come back from get_data() still encoded
+        and keep their filter.
+    """
+    filters = stream.get("/Filter")
+    if filters is None:
+        return stream.get_data(), None, None
+    filters = filters.get_object()
+    filters = list(filters) if isinstance(filters, ArrayObject) else [filters]
+
+    data = stream.get_data()
+    if filters[-1] in PASSTHROUGH_FILTERS:
+        decode_parms = stream.get("/DecodeParms")
+        if isinstance(decode_parms, ArrayObject):
+            decode_parms = decode_parms[-1]
+        return data, str(filters[-1]), decode_parms
+    return zlib.compress(data), "/FlateDecode", None
+
+def print_stream(documents: List[StoredLabel], print_format: str) -> Iterator[bytes]:
+    """Merged print stream for stored documents in the given format (pdf or zpl)"""
+    paths = [document.path for document in documents]
+    if print_format == "zpl":
+        return iter_zpl_stream(paths)
+    return iter_merged_pdf(paths)
+
+def document_format(document: StoredLabel) -> str:
+    """pdf or zpl, from a stored document's file extension"""
+    return Path(document.path).suffix.lstrip(".")
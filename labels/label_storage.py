@@ -0,0 +1,322 @@
+# Label Storage
+# Content-addressed, sharded storage for label documents and QR images
+
+import asyncio
+import base64
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from pydantic import BaseModel
+
+class StoredLabel(BaseModel):
+    """A label document or image written to local storage"""
+    sha256: str
+    path: str
+    url: str
+    size: int
+    content_type: str
+    created_at: float
+
+# Base64 characters decoded per step; a multiple of 4 so chunks decode independently
+BASE64_CHUNK_SIZE = 64 * 1024
+
+CONTENT_TYPES = {
+    "pdf": "application/pdf",
+    "png": "image/png",
+    "zpl": "application/x-zpl",
+    "csv": "text/csv",
+}
+
+def extension_for_doc_type(doc_type: Optional[str]) -> str:
+    """Map a carrier docType (PDF, PNG, ZPLII, ...) to a file extension"""
+    doc_type = (doc_type or "PDF").lower()
+    if doc_type.startswith("zpl"):
+        return "zpl"
+    return doc_type
+
+def iter_base64_chunks(encoded: str, chunk_size: int = BASE64_CHUNK_SIZE) -> Iterator[bytes]:
+    """Decode a base64 string incrementally, yielding decoded chunks"""
+    if any(c in encoded for c in "\r\n "):
+        # Line-wrapped input would break chunk alignment
+        encoded = "".join(encoded.split())
+    for start in range(0, len(encoded), chunk_size):
+        yield base64.b64decode(encoded[start:start + chunk_size])
+
+class LabelStorage:
+    """
+    Stores label files by content hash under sharded directories.
+
+    Files are named <sha256>.<ext> and placed under <root>/<aa>/<bb>/ (the
+    first two byte pairs of the hash), so no directory grows past a few
+    thousand entries even at millions of labels, and identical documents are
+    stored once. All disk and index I/O runs in worker threads so the event
+    loop never blocks on it. A SQLite index maps tracking numbers to files and
+    drives retention: files not referenced within LABEL_RETENTION_DAYS are
+    removed by gc().
+    """
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        url_prefix: Optional[str] = None,
+        index_path: Optional[str] = None,
+        retention_days: Optional[int] = None
+    ):
+        self._root = Path(root or os.getenv('LABEL_STORAGE_DIR', 'static/labels'))
+        self._url_prefix = (url_prefix or os.getenv('LABEL_STORAGE_URL', '/static/labels')).rstrip('/')
+        # Kept outside the static directory so it is never served
+        self._index_path = Path(index_path or os.getenv('LABEL_INDEX_PATH', 'data/label_index.sqlite3'))
+        self._retention_days = retention_days if retention_days is not None else int(os.getenv('LABEL_RETENTION_DAYS', '90'))
+        self._gc_interval = float(os.getenv('LABEL_GC_INTERVAL_HOURS', '24')) * 3600
+        self._last_gc = time.time()
+        self._gc_task: Optional[asyncio.Task] = None
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+    async def save(self, data: bytes, extension: str, tracking_number: Optional[str] = None, kind: str = "label") -> StoredLabel:
+        """
+        Store file contents and index them under a tracking number.
+
+        Args:
+            data: Raw file contents
+            extension: File extension without the dot (pdf, png, zpl)
+            tracking_number: Tracking number the file belongs to
+            kind: What the file is for this tracking number ("label", "qr", ...)
+
+        Returns:
+            StoredLabel describing where the file lives and how it is served
+        """
+        stored = await asyncio.to_thread(self._write_bytes, data, extension, tracking_number, kind)
+        self._maybe_schedule_gc()
+        return stored
+
+    async def save_base64(self, encoded: str, extension: str, tracking_number: Optional[str] = None, kind: str = "label") -> StoredLabel:
+        """
+        Decode a base64 document in chunks straight to storage.
+
+        Only one chunk of decoded bytes is held in memory at a time, so large
+        multi-piece or ZPL batch labels don't cost several full copies.
+
+        Args:
+            encoded: Base64 encoded file contents (e.g. FedEx encodedLabel)
+            extension: File extension without the dot (pdf, png, zpl)
+            tracking_number: Tracking number the file belongs to
+            kind: What the file is for this tracking number ("label", "qr", ...)
+
+        Returns:
+            StoredLabel describing where the file lives and how it is served
+        """
+        stored = await asyncio.to_thread(self._write_chunks, iter_base64_chunks(encoded), extension, tracking_number, kind)
+        self._maybe_schedule_gc()
+        return stored
+
+    async def lookup(self, tracking_number: str, kind: str = "label") -> Optional[StoredLabel]:
+        """Find the stored file for a tracking number, if any"""
+        return await asyncio.to_thread(self._lookup, tracking_number, kind)
+
+    async def save_source(self, tracking_number: str, url: str) -> None:
+        """Remember the carrier URL a tracking number's label can be downloaded from"""
+        await asyncio.to_thread(self._save_source, tracking_number, url)
+
+    async def lookup_source(self, tracking_number: str) -> Optional[str]:
+        """Carrier URL of a tracking number's label, if one was saved"""
+        return await asyncio.to_thread(self._lookup_source, tracking_number)
+
+    async def gc(self, now: Optional[float] = None) -> int:
+        """
+        Apply the retention policy.
+
+        Returns:
+            Number of files removed
+        """
+        self._last_gc = time.time()
+        return await asyncio.to_thread(self._gc, now or time.time())
+
+    @property
+    def root(self) -> Path:
+        """Directory label files are stored under"""
+        return self._root
+
+    def url_for(self, sha256: str, extension: str) -> str:
+        """Public URL for a stored file"""
+        return f"{self._url_prefix}/{sha256[:2]}/{sha256[2:4]}/{sha256}.{extension}"
+
+    def _path_for(self, sha256: str, extension: str) -> Path:
+        return self._root / sha256[:2] / sha256[2:4] / f"{sha256}.{extension}"
+
+    def _write_bytes(self, data: bytes, extension: str, tracking_number: Optional[str] = None, kind: str = "label") -> StoredLabel:
+        """Write data to its content-addressed location (runs in a worker thread)"""
+        return self._write_chunks([data], extension, tracking_number, kind)
+
+    def _write_chunks(
+        self,
+        chunks: Iterable[bytes],
+        extension: str,
+        tracking_number: Optional[str] = None,
+        kind: str = "label"
+    ) -> StoredLabel:
+        """
+        Stream chunks to a temp file while hashing, then move the file to its
+        content-addressed location and index it (runs in a worker thread).
+
+        Placing and indexing happen under _db_lock, so gc() can't delete an
+        identical file between finding it and referencing it.
+        """
+        self._root.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self._root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+
+            sha256 = digest.hexdigest()
+            path = self._path_for(sha256, extension)
+            stored = StoredLabel(
+                sha256=sha256,
+                path=str(path),
+                url=self.url_for(sha256, extension),
+                size=size,
+                content_type=CONTENT_TYPES.get(extension, "application/octet-stream"),
+                created_at=time.time()
+            )
+            with self._db_lock:
+                db = self._connect()
+                if path.exists():
+                    # Identical document already stored; reused now, so not expired
+                    Path(tmp_path).unlink()
+                    with db:
+                        db.execute("UPDATE label_files SET created_at = ? WHERE sha256 = ?", (stored.created_at, sha256))
+                else:
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    # Rename so readers never see a partial label
+                    os.replace(tmp_path, path)
+                if tracking_number:
+                    self._index(db, stored, tracking_number, kind)
+        except Exception:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+        return stored
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the index database on first use (caller holds _db_lock)"""
+        if self._db is None:
+            self._index_path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self._index_path), check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS label_files (
+                    sha256 TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    content_type TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS label_refs (
+                    tracking_number TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (tracking_number, kind)
+                );
+                CREATE TABLE IF NOT EXISTS label_sources (
+                    tracking_number TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_label_refs_created ON label_refs (created_at);
+                CREATE INDEX IF NOT EXISTS idx_label_refs_sha ON label_refs (sha256);
+            """)
+            self._db = db
+        return self._db
+
+    def _index(self, db: sqlite3.Connection, stored: StoredLabel, tracking_number: str, kind: str) -> None:
+        """Reference a stored file from a tracking number (caller holds _db_lock)"""
+        with db:
+            db.execute(
+                "INSERT OR IGNORE INTO label_files (sha256, path, url, size, content_type, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (stored.sha256, stored.path, stored.url, stored.size, stored.content_type, stored.created_at)
+            )
+            db.execute(
+                "INSERT OR REPLACE INTO label_refs (tracking_number, kind, sha256, created_at) VALUES (?, ?, ?, ?)",
+                (tracking_number, kind, stored.sha256, stored.created_at)
+            )
+
+    def _lookup(self, tracking_number: str, kind: str) -> Optional[StoredLabel]:
+        with self._db_lock:
+            row = self._connect().execute(
+                "SELECT f.sha256, f.path, f.url, f.size, f.content_type, r.created_at "
+                "FROM label_refs r JOIN label_files f ON f.sha256 = r.sha256 "
+                "WHERE r.tracking_number = ? AND r.kind = ?",
+                (tracking_number, kind)
+            ).fetchone()
+        if not row:
+            return None
+        return StoredLabel(sha256=row[0], path=row[1], url=row[2], size=row[3], content_type=row[4], created_at=row[5])
+
+    def _save_source(self, tracking_number: str, url: str) -> None:
+        with self._db_lock:
+            db = self._connect()
+            with db:
+                db.execute(
+                    "INSERT OR REPLACE INTO label_sources (tracking_number, url, created_at) VALUES (?, ?, ?)",
+                    (tracking_number, url, time.time())
+                )
+
+    def _lookup_source(self, tracking_number: str) -> Optional[str]:
+        with self._db_lock:
+            row = self._connect().execute(
+                "SELECT url FROM label_sources WHERE tracking_number = ?", (tracking_number,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _gc(self, now: float) -> int:
+        """Drop expired references and delete files nothing refers to any more"""
+        if self._retention_days <= 0:
+            return 0
+        cutoff = now - self._retention_days * 86400
+
+        with self._db_lock:
+            db = self._connect()
+            with db:
+                db.execute("DELETE FROM label_refs WHERE created_at < ?", (cutoff,))
+                db.execute("DELETE FROM label_sources WHERE created_at < ?", (cutoff,))
+                orphans = db.execute(
+                    "SELECT sha256, path FROM label_files "
+                    "WHERE created_at < ? AND sha256 NOT IN (SELECT sha256 FROM label_refs)",
+                    (cutoff,)
+                ).fetchall()
+                for sha256, path in orphans:
+                    Path(path).unlink(missing_ok=True)
+                    db.execute("DELETE FROM label_files WHERE sha256 = ?", (sha256,))
+
+        if orphans:
+            print(f"LabelStorage: Removed {len(orphans)} expired label files")
+        return len(orphans)
+
+    def _maybe_schedule_gc(self) -> None:
+        """Run retention in the background once per LABEL_GC_INTERVAL_HOURS"""
+        if time.time() - self._last_gc < self._gc_interval:
+            return
+        if self._gc_task is None or self._gc_task.done():
+            self._gc_task = asyncio.create_task(self.gc())
+
+_storage: Optional[LabelStorage] = None
+
+def get_label_storage() -> LabelStorage:
+    """Get the process-wide label storage"""
+    global _storage
+    if _storage is None:
+        _storage = LabelStorage()
+    return _storage
@@ -0,0 +1,132 @@
+# Prevalidation
+# Speculative label validation while the caller is still confirming the shipment
+
+import asyncio
+import os
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Set
+
+from labels.idempotency import IdempotencyStore
+from models.label_request import LabelRequest
+from models.prevalidation import Prevalidation
+from utils.exceptions import ShipmentRejectedError
+
+class _Entry:
+    def __init__(self, fingerprint: str, status: Prevalidation, done: asyncio.Event):
+        self.fingerprint = fingerprint
+        self.status = status
+        self.done = done
+        self.ship_request: Optional[dict] = None
+
+class LabelPrevalidator:
+    """
+    Builds and validates a ship payload ahead of the real label call.
+
+    In the voice flow there are several seconds between quoting a rate and
+    the caller saying "ship it". start() returns a token at once and, in
+    the background, has the carrier engine build the ship payload and
+    validate it (FedEx's package validate operation). The label call that
+    carries the token and the same request then submits the stored payload
+    directly; one still being validated is waited for rather than redone.
+    A request that differs from the validated one falls back to the normal
+    path, as does one whose validation couldn't reach the carrier: only a
+    definitive rejection fails the label call. Tokens live for
+    PREVALIDATION_TTL_SECONDS.
+    """
+
+    def __init__(self, engines: Dict[str, object], ttl_seconds: Optional[float] = None, max_entries: Optional[int] = None):
+        self._engines = engines
+        self._ttl = ttl_seconds if ttl_seconds is not None else float(os.getenv('PREVALIDATION_TTL_SECONDS', '600'))
+        self._max_entries = max_entries or int(os.getenv('PREVALIDATION_MAX_ENTRIES', '10000'))
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._tasks: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def fingerprint(request: LabelRequest) -> str:
+        """Fingerprint of a request, ignoring the token it carries"""
+        update = {"prevalidation_token": None}
+        bare = request.model_copy(update=update) if hasattr(request, 'model_copy') else request.copy(update=update)
+        return IdempotencyStore.fingerprint(bare)
+
+    def start(self, request: LabelRequest) -> Prevalidation:
+        """
+        Start validating a tentative label request.
+
+        Returns:
+            Prevalidation in "pending" state (or "unsupported" when the
+            carrier has no validate step) carrying the token
+        """
+        engine = self._engines.get(request.carrier)
+        if not engine:
+            raise ValueError("Unsupported carrier")
+
+        status = Prevalidation(
+            token=uuid.uuid4().hex,
+            status="pending" if hasattr(engine, "validate_shipment") else "unsupported",
+            carrier=request.carrier,
+            expires_at=datetime.now() + timedelta(seconds=self._ttl)
+        )
+        entry = _Entry(self.fingerprint(request), status, asyncio.Event())
+        self._entries[status.token] = entry
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+        if status.status == "pending":
+            task = asyncio.create_task(self._validate(engine, request, entry))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            entry.done.set()
+        return status
+
+    def get(self, token: str) -> Optional[Prevalidation]:
+        """Current state of a prevalidation, if it exists and hasn't expired"""
+        entry = self._entry(token)
+        return entry.status if entry else None
+
+    async def take(self, token: str, request: LabelRequest) -> Optional[dict]:
+        """
+        Validated ship payload for a label request, waiting if still pending.
+
+        Returns:
+            Payload to submit as is, or None if the token is unknown, expired,
+            unsupported, couldn't be validated or was issued for a different
+            request
+
+        Raises:
+            ValueError: If the carrier already rejected this exact request
+        """
+        entry = self._entry(token)
+        if not entry or entry.fingerprint != self.fingerprint(request):
+            return None
+
+        await entry.done.wait()
+        if entry.status.status == "invalid":
+            raise ValueError(entry.status.error)
+        return entry.ship_request
+
+    async def _validate(self, engine, request: LabelRequest, entry: _Entry) -> None:
+        try:
+            entry.ship_request, entry.status.alerts = await engine.validate_shipment(request)
+            entry.status.status = "valid"
+        except ShipmentRejectedError as e:
+            print(f"LabelPrevalidator: Shipment rejected: {str(e)}")
+            entry.status.status = "invalid"
+            entry.status.error = str(e)
+        except Exception as e:
+            # Timeouts, connection and auth errors say nothing about the
+            # shipment; the label call takes the normal path instead
+            print(f"LabelPrevalidator: Validation unavailable: {str(e)}")
+            entry.status.status = "unavailable"
+            entry.status.error = str(e)
+        finally:
+            entry.done.set()
+
+    def _entry(self, token: str) -> Optional[_Entry]:
+        entry = self._entries.get(token)
+        if entry and entry.status.expires_at <= datetime.now():
+            del self._entries[token]
+            return None
+        return entry
@@ -0,0 +1,147 @@
+# QR Cache
+# Lazily rendered QR codes kept in a bounded in-memory LRU
+
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from pydantic import BaseModel
+
+from labels.label_storage import LabelStorage, get_label_storage
+from labels.qr_generator import render_qr_code
+from shipments.shipment_store import ShipmentStore, get_shipment_store
+from utils.single_flight import SingleFlight
+
+def public_url(url: str) -> str:
+    """
+    Absolute form of a label URL, for encoding in a QR code a phone can open.
+
+    Relative URLs are joined to LABEL_PUBLIC_BASE_URL when it is set.
+    """
+    base = os.getenv('LABEL_PUBLIC_BASE_URL')
+    if base and url.startswith("/"):
+        return base.rstrip("/") + url
+    return url
+
+class QRImage(BaseModel):
+    """A rendered QR code PNG and its strong ETag"""
+    content: bytes
+    etag: str
+
+class QRCodeCache:
+    """
+    Renders fallback QR codes on first request instead of at label creation.
+
+    Label creation only registers what a tracking number's QR code should
+    encode. The PNG is rendered in a worker thread the first time someone asks
+    for it, concurrent requests for the same code share a single render, and
+    results are kept in an LRU bounded by QR_CACHE_SIZE entries. The
+    registry itself holds QR_REGISTRY_SIZE entries; older codes are rebuilt
+    from the shipment store or label storage.
+    """
+
+    def __init__(
+        self,
+        storage: Optional[LabelStorage] = None,
+        max_entries: Optional[int] = None,
+        max_registered: Optional[int] = None,
+        store: Optional[ShipmentStore] = None
+    ):
+        self._storage = storage or get_label_storage()
+        self._store = store or get_shipment_store()
+        self._max_entries = max_entries or int(os.getenv('QR_CACHE_SIZE', '1024'))
+        self._max_registered = max_registered or int(os.getenv('QR_REGISTRY_SIZE', '100000'))
+        self._images: "OrderedDict[str, QRImage]" = OrderedDict()
+        self._registered: "OrderedDict[str, str]" = OrderedDict()
+        self._renders = SingleFlight()
+
+    def register(self, tracking_number: str, data: str) -> str:
+        """
+        Record what the QR code for a tracking number encodes.
+
+        Returns:
+            URL the QR code will be served from
+        """
+        self._registered[tracking_number] = data
+        self._registered.move_to_end(tracking_number)
+        while len(self._registered) > self._max_registered:
+            self._registered.popitem(last=False)
+        return f"/static/labels/qr/{tracking_number}.png"
+
+    async def get(self, tracking_number: str) -> Optional[QRImage]:
+        """
+        Get the QR code for a tracking number, rendering it if needed.
+
+        Returns:
+            QRImage, or None if nothing is known about the tracking number
+        """
+        image = self._images.get(tracking_number)
+        if image:
+            self._images.move_to_end(tracking_number)
+            return image
+
+        # Concurrent requests wait on the first one's render
+        return await self._renders.run(tracking_number, lambda: self._render(tracking_number))
+
+    async def _render(self, tracking_number: str) -> Optional[QRImage]:
+        image = await self._load(tracking_number)
+        if image:
+            self._remember(tracking_number, image)
+        return image
+
+    async def _load(self, tracking_number: str) -> Optional[QRImage]:
+        """
+        Render a code from what it encodes, or fall back to a previously stored PNG.
+
+        Codes registered before a restart (or evicted from the registry) are
+        rebuilt from the carrier URL saved in label storage, or else from the
+        label URL kept in the shipment store or the stored label document.
+        """
+        data = self._registered.get(tracking_number) or await self._recover_data(tracking_number)
+        if data:
+            content = await asyncio.to_thread(render_qr_code, data)
+            return self._image(content)
+
+        stored = await self._storage.lookup(tracking_number, kind="qr")
+        path = Path(stored.path) if stored else Path(f"static/labels/qr/{tracking_number}.png")
+        if path.is_file():
+            content = await asyncio.to_thread(path.read_bytes)
+            return self._image(content)
+
+        return None
+
+    async def _recover_data(self, tracking_number: str) -> Optional[str]:
+        # The stored label_url is our relative document URL when the carrier hosts the label
+        data = await self._storage.lookup_source(tracking_number)
+        if not data:
+            record = await self._store.get(tracking_number)
+            if record and record.label.fallback_qr_code_url and record.label.label_url:
+                data = public_url(record.label.label_url)
+            else:
+                stored = await self._storage.lookup(tracking_number)
+                if not stored:
+                    return None
+                data = public_url(stored.url)
+        self.register(tracking_number, data)
+        return data
+
+    def _image(self, content: bytes) -> QRImage:
+        return QRImage(content=content, etag=f'"{hashlib.sha256(content).hexdigest()[:32]}"')
+
+    def _remember(self, tracking_number: str, image: QRImage) -> None:
+        self._images[tracking_number] = image
+        self._images.move_to_end(tracking_number)
+        while len(self._images) > self._max_entries:
+            self._images.popitem(last=False)
+
+_qr_cache: Optional[QRCodeCache] = None
+
+def get_qr_cache() -> QRCodeCache:
+    """Get the process-wide QR code cache"""
+    global _qr_cache
+    if _qr_cache is None:
+        _qr_cache = QRCodeCache()
+    return _qr_cache
@@ -1,4 +1,4 @@
-
+import io
 import qrcode
 from pathlib import Path
 
@@ -8,3 +8,10 @@ def generate_qr_code(data: str, output_path: str) -> str:
     Path(output_path).parent.mkdir(parents=True, exist_ok=True)
     img.save(output_path)
     return output_path
+
+def render_qr_code(data: str) -> bytes:
+    """Render a QR code for string data as PNG bytes"""
+    img = qrcode.make(data)
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
@@ -1,6 +1,6 @@
 
 from models.label_request import LabelRequest
-from models.label_response import LabelResponse
+from models.label_response import LabelResponse, SubmittedLabel
 
 class UPSShipEngine:
     async def create_label(self, request: LabelRequest) -> LabelResponse:
@@ -10,3 +10,10 @@ class UPSShipEngine:
             label_url="/static/labels/TEST-UPS-987654.pdf",
             carrier="ups"
         )
+
+    async def submit_shipment(self, request: LabelRequest) -> SubmittedLabel:
+        label = await self.create_label(request)
+        return SubmittedLabel(carrier="ups", tracking_number=label.tracking_number, label=label)
+
+    async def build_label_response(self, request: LabelRequest, submitted: SubmittedLabel) -> LabelResponse:
+        return submitted.label
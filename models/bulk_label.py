@@ -0,0 +1,22 @@
+from pydantic import BaseModel, validator
+from typing import List, Optional
+from models.label_request import LabelRequest
+from models.label_response import LabelResponse
+
+MAX_BULK_LABELS = 1000
+
+class BulkLabelRequest(BaseModel):
+    labels: List[LabelRequest]
+
+    @validator('labels')
+    def validate_labels(cls, v):
+        if not v:
+            raise ValueError('At least one label is required')
+        if len(v) > MAX_BULK_LABELS:
+            raise ValueError(f'At most {MAX_BULK_LABELS} labels per request')
+        return v
+
+class BulkLabelResult(BaseModel):
+    index: int  # Position of the request in BulkLabelRequest.labels
+    label: Optional[LabelResponse] = None
+    error: Optional[str] = None
@@ -0,0 +1,23 @@
+from datetime import date, datetime
+from typing import Dict, List, Optional
+from pydantic import BaseModel
+
+class CloseResult(BaseModel):
+    """End-of-day close of one carrier account"""
+    carrier: str
+    account_number: str
+    close_date: date
+    shipment_count: int
+    tracking_numbers: List[str] = []
+    document_urls: List[str] = []  # Carrier close documents (e.g. FedEx Ground manifest)
+    closed_at: datetime
+    replayed: bool = False  # Already closed by an earlier run; no carrier call was made
+
+class EndOfDayReport(BaseModel):
+    close_date: date
+    closes: List[CloseResult] = []
+    errors: Dict[str, str] = {}  # Account number -> error
+    manifest_url: Optional[str] = None  # Consolidated manifest of every closed shipment
+
+class EndOfDayRequest(BaseModel):
+    close_date: Optional[date] = None  # Defaults to today
@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+from typing import Literal, Optional
+from datetime import datetime
+from models.label_request import LabelRequest
+from models.label_response import LabelResponse
+
+class LabelJobRequest(BaseModel):
+    label: LabelRequest
+    callback_url: Optional[str] = None  # POSTed the finished LabelJob
+    notify_email: Optional[str] = None  # Emailed the label once it's ready
+
+class LabelJob(BaseModel):
+    job_id: str
+    status: Literal["processing", "completed", "failed"]
+    carrier: str
+    tracking_number: str
+    label: Optional[LabelResponse] = None
+    error: Optional[str] = None
+    created_at: datetime
+    completed_at: Optional[datetime] = None
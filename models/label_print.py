@@ -0,0 +1,19 @@
+from pydantic import BaseModel, validator
+from typing import List, Literal, Optional
+
+MAX_PRINT_LABELS = 2000
+
+class LabelPrintRequest(BaseModel):
+    """A print wave: labels to merge into one print job"""
+    tracking_numbers: List[str] = []
+    job_ids: List[str] = []  # Labels of finished async label jobs
+    format: Optional[Literal["pdf", "zpl"]] = None  # Defaults to the labels' own format
+
+    @validator('job_ids', always=True)
+    def validate_labels(cls, v, values):
+        count = len(v) + len(values.get('tracking_numbers', []))
+        if not count:
+            raise ValueError('At least one tracking number or job id is required')
+        if count > MAX_PRINT_LABELS:
+            raise ValueError(f'At most {MAX_PRINT_LABELS} labels per print job')
+        return v
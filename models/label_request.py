@@ -1,12 +1,46 @@
-
-from pydantic import BaseModel
-from typing import Literal, Optional
+from pydantic import BaseModel, PrivateAttr, validator
+from typing import List, Literal, Optional
+from models.rate_response import RateQuote
 from models.shipping import Address, Package, SpecialServices
 
+# FedEx accepts at most 30 package line items per shipment
+MAX_PACKAGES = 30
+
 class LabelRequest(BaseModel):
-    carrier: Literal["fedex", "ups"]
+    quote_id: Optional[str] = None  # From /get-rates; supplies carrier, service and packages
+    carrier: Optional[Literal["fedex", "ups"]] = None
     shipper: Address
     recipient: Address
-    package: Package
-    service_type: str  # e.g., FEDEX_GROUND, FEDEX_2_DAY_AM
+    package: Optional[Package] = None
+    packages: Optional[List[Package]] = None  # Multi-piece shipment, one label per package
+    service_type: Optional[str] = None  # e.g., FEDEX_GROUND, FEDEX_2_DAY_AM
     special_services: Optional[SpecialServices] = None
+    pickup_requested: bool = False  # Book a carrier pickup instead of dropping off
+    prevalidation_token: Optional[str] = None  # From /labels/prevalidate; reuses the checked ship payload
+    # Quote the request was completed from, set by QuoteStore.apply()
+    _quote: Optional[RateQuote] = PrivateAttr(default=None)
+
+    @validator('packages', always=True)
+    def validate_packages(cls, v, values):
+        if not v and not values.get('package') and not values.get('quote_id'):
+            raise ValueError('Either package or packages is required')
+        if v and len(v) > MAX_PACKAGES:
+            raise ValueError(f'At most {MAX_PACKAGES} packages per shipment')
+        return v
+
+    @validator('service_type', always=True)
+    def validate_service(cls, v, values):
+        if not values.get('quote_id') and not (v and values.get('carrier')):
+            raise ValueError('Either quote_id or carrier and service_type is required')
+        return v
+
+    @property
+    def quote(self) -> Optional[RateQuote]:
+        """Quote applied to this request, kept even if it has since expired"""
+        return self._quote
+
+    def get_packages(self) -> List[Package]:
+        """All packages in the shipment, whichever field they were sent in"""
+        if self.packages:
+            return self.packages
+        return [self.package]
@@ -1,12 +1,26 @@
-
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
-class LabelResponse(BaseModel):
+class LabelPiece(BaseModel):
+    """Label for one package of a multi-piece shipment"""
     tracking_number: str
     label_url: str
+
+class LabelResponse(BaseModel):
+    tracking_number: str  # Master tracking number for multi-piece shipments
+    label_url: str
     native_qr_code_base64: Optional[str] = None
     fallback_qr_code_url: Optional[str] = None
     carrier: str
     estimated_delivery: Optional[datetime]
+    pieces: List[LabelPiece] = []
+    quote_id: Optional[str] = None  # Rate quote the label was created from
+    quoted_cost: Optional[float] = None  # Price quoted for it, in USD
+
+class SubmittedLabel(BaseModel):
+    """A shipment the carrier has accepted, before its label documents are processed"""
+    carrier: str
+    tracking_number: str
+    carrier_response: dict = {}
+    label: Optional[LabelResponse] = None  # Set by engines that finish in one step
@@ -0,0 +1,56 @@
+from datetime import date, datetime
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+from models.shipping import Address
+
+class PickupRequest(BaseModel):
+    """One pickup covering every package waiting at a location"""
+    carrier: str
+    address: Address
+    pickup_date: date
+    ready_time: str = "09:00"  # Local time packages are ready, HH:MM
+    close_time: str = "17:00"  # Latest local time the driver can get in, HH:MM
+    package_count: int = Field(..., gt=0)
+    total_weight: float = Field(..., gt=0, description="Weight in pounds")
+    tracking_numbers: List[str] = []
+    service_counts: Dict[str, int] = {}  # Packages per carrier service type
+
+class PickupConfirmation(BaseModel):
+    carrier: str
+    confirmation_number: str
+    location: Optional[str] = None
+    pickup_date: date
+    package_count: int
+    tracking_numbers: List[str] = []
+    booked_at: datetime
+
+class PickupResult(BaseModel):
+    """Booking outcome for one location; either confirmation or error is set"""
+    carrier: str
+    location: str
+    confirmation: Optional[PickupConfirmation] = None
+    error: Optional[str] = None
+
+class PickupBookingRequest(BaseModel):
+    pickup_date: Optional[date] = None  # Defaults to today
+    ready_time: str = "09:00"
+    close_time: str = "17:00"
+
+class PickupWindow(BaseModel):
+    """Pickup schedule offered by one carrier operating company"""
+    service: str  # e.g. FDXE, FDXG
+    available: bool
+    pickup_date: date
+    cutoff_time: Optional[str] = None  # Latest local time to book the pickup, HH:MM:SS
+    ready_time: Optional[str] = None  # Default time packages should be ready, HH:MM:SS
+    latest_time: Optional[str] = None  # Latest local time the driver will come, HH:MM:SS
+    residential_available: Optional[bool] = None
+
+class PickupAvailability(BaseModel):
+    carrier: str
+    postal_code: str
+    pickup_date: date
+    supported: bool = True  # False if the carrier has no availability lookup
+    windows: List[PickupWindow] = []
+    checked_at: datetime
+    can_book_now: bool = False  # Some window is available and its cutoff hasn't passed
@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from typing import List, Literal, Optional
+from datetime import datetime
+
+class Prevalidation(BaseModel):
+    """A label request checked ahead of time, while the caller confirms"""
+    token: str  # Send back as LabelRequest.prevalidation_token
+    status: Literal["pending", "valid", "invalid", "unavailable", "unsupported"]
+    carrier: str
+    alerts: List[str] = []  # Carrier warnings that don't block the shipment
+    error: Optional[str] = None  # Rejection, or why the carrier couldn't be asked
+    expires_at: datetime
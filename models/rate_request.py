@@ -1,17 +1,31 @@
 from pydantic import BaseModel, Field, validator
-from typing import Optional
+from typing import List, Optional
 import re
 
+# Most packages a single rate request may carry
+MAX_RATE_PACKAGES = 30
+
 class Dimensions(BaseModel):
     length: float = Field(..., gt=0, description="Length in inches")
     width: float = Field(..., gt=0, description="Width in inches")
     height: float = Field(..., gt=0, description="Height in inches")
 
+class RatePackage(BaseModel):
+    weight: float = Field(..., gt=0, description="Weight in pounds")
+    dimensions: Optional[Dimensions] = Field(None, description="Package dimensions in inches")
+
+    @validator('weight')
+    def validate_weight(cls, v):
+        if v > 150:  # Maximum weight limit in pounds
+            raise ValueError('Weight exceeds maximum limit of 150 pounds')
+        return v
+
 class RateRequest(BaseModel):
     origin_zip: str = Field(..., description="Origin ZIP code")
     destination_zip: str = Field(..., description="Destination ZIP code")
-    weight: float = Field(..., gt=0, description="Weight in pounds")
-    dimensions: Optional[Dimensions] = Field(None, description="Package dimensions in inches")
+    weight: Optional[float] = Field(None, gt=0, description="Weight in pounds (single package)")
+    dimensions: Optional[Dimensions] = Field(None, description="Package dimensions in inches (single package)")
+    packages: Optional[List[RatePackage]] = Field(None, description="Packages rated together as one shipment")
     pickup_requested: Optional[bool] = Field(None, description="Whether pickup is requested")
 
     @validator('origin_zip', 'destination_zip')
@@ -22,6 +36,24 @@ class RateRequest(BaseModel):
 
     @validator('weight')
     def validate_weight(cls, v):
-        if v > 150:  # Maximum weight limit in pounds
+        if v is not None and v > 150:  # Maximum weight limit in pounds
             raise ValueError('Weight exceeds maximum limit of 150 pounds')
-        return v 
\ No newline at end of file
+        return v
+
+    @validator('packages', always=True)
+    def validate_packages(cls, v, values):
+        if not v and values.get('weight') is None:
+            raise ValueError('Either weight or packages is required')
+        if v and len(v) > MAX_RATE_PACKAGES:
+            raise ValueError(f'At most {MAX_RATE_PACKAGES} packages per rate request')
+        return v
+
+    def get_packages(self) -> List[RatePackage]:
+        """All packages in the shipment, whichever fields they were sent in"""
+        if self.packages:
+            return self.packages
+        return [RatePackage(weight=self.weight, dimensions=self.dimensions)]
+
+    @property
+    def total_weight(self) -> float:
+        return sum(package.weight for package in self.get_packages())
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
+from models.rate_request import RateRequest
 from utils.service_normalizer import ServiceTier
 
 class RateOption(BaseModel):
@@ -10,8 +11,17 @@ class RateOption(BaseModel):
     cost: float = Field(..., gt=0, description="Shipping cost in USD")
     estimated_delivery: datetime = Field(..., description="Estimated delivery date and time")
     transit_days: int = Field(..., ge=1, description="Number of transit days")
+    service_code: Optional[str] = Field(None, description="Carrier service code to ship with (e.g., 'FEDEX_GROUND')")
+    quote_id: Optional[str] = Field(None, description="Pass to /api/labels to ship this option at this price")
 
 class RateResponse(BaseModel):
     cheapest_option: RateOption = Field(..., description="Cheapest available shipping option")
     fastest_option: Optional[RateOption] = Field(None, description="Fastest reasonably priced option")
-    all_options: list[RateOption] = Field(default_factory=list, description="All available shipping options") 
\ No newline at end of file
+    all_options: list[RateOption] = Field(default_factory=list, description="All available shipping options") 
+
+class RateQuote(BaseModel):
+    """A rate option held for label creation, with the shipment it was quoted for"""
+    quote_id: str
+    request: RateRequest
+    option: RateOption
+    expires_at: datetime
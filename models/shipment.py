@@ -0,0 +1,26 @@
+from datetime import date, datetime
+from typing import Optional
+from pydantic import BaseModel
+from models.label_response import LabelResponse
+from models.shipping import Address
+
+class ShipmentRecord(BaseModel):
+    """A created label as kept in the shipment store"""
+    tracking_number: str
+    carrier: str
+    service_type: str
+    ship_date: date
+    created_at: datetime
+    shipper_zip: str
+    recipient_name: str
+    recipient_company: Optional[str] = None
+    recipient_street: str
+    recipient_city: str
+    recipient_state: str
+    recipient_zip: str
+    package_count: int
+    total_weight: float
+    label: LabelResponse
+    account_number: Optional[str] = None  # Carrier account billed for the shipment
+    closed_at: Optional[datetime] = None  # Set by the end-of-day close
+    pickup_address: Optional[Address] = None  # Shipper address when a carrier pickup was requested
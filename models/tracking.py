@@ -0,0 +1,42 @@
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel
+
+class TrackingStatus(BaseModel):
+    """Latest carrier status of a tracked package"""
+    tracking_number: str
+    carrier: str
+    status_code: Optional[str] = None  # Carrier status code, e.g. FedEx IT, OD, DL
+    status: Optional[str] = None  # e.g. "In transit"
+    description: Optional[str] = None
+    location: Optional[str] = None  # "City, ST" of the latest scan
+    event_time: Optional[datetime] = None  # Time of the latest scan
+    delivered: bool = False
+    checked_at: datetime
+
+    def signature(self) -> tuple:
+        """What counts as a change; checked_at alone doesn't"""
+        return (self.status_code, self.status, self.description, self.location, self.event_time, self.delivered)
+
+class TrackingEvent(BaseModel):
+    """A status change detected by the tracking poller"""
+    tracking_number: str
+    carrier: str
+    previous_status_code: Optional[str] = None
+    status: TrackingStatus
+
+class TrackRequest(BaseModel):
+    tracking_numbers: List[str]
+    carrier: str = "fedex"
+
+class WebhookSubscriptionRequest(BaseModel):
+    url: str  # POSTed {"events": [TrackingEvent, ...]}
+    tracking_numbers: List[str]
+    carrier: str = "fedex"
+    secret: Optional[str] = None  # Signs deliveries with HMAC-SHA256 (X-ShipVox-Signature)
+
+class WebhookSubscription(BaseModel):
+    subscription_id: str
+    url: str
+    tracking_numbers: List[str]
+    created_at: datetime
@@ -1,2 +1,184 @@
 # Fedex Pickup
-# TODO: Implement this module
+# Books FedEx courier pickups through the Pickup API (/pickup/v1/pickups)
+
+import os
+import json
+import httpx
+from datetime import date, datetime
+from typing import List, Optional
+
+from models.pickup import PickupRequest, PickupConfirmation, PickupWindow
+from auth.fedex_auth import FedExAuth
+from utils.http_client import get_http_client
+
+# Ground services are picked up by FedEx Ground (FDXG), everything else by FedEx Express (FDXE)
+GROUND_SERVICES = {"FEDEX_GROUND", "GROUND_HOME_DELIVERY"}
+
+class FedExPickupEngine:
+    def __init__(self):
+        self._auth = FedExAuth()
+        self._base_url = os.environ.get('FEDEX_API_URL', 'https://apis-sandbox.fedex.com')
+        self._account_number = os.getenv('FEDEX_ACCOUNT_NUMBER', '740561073')
+        self._client = get_http_client()
+
+    @staticmethod
+    def operating_company(service_type: Optional[str]) -> str:
+        """FedEx operating company that picks up packages of a service"""
+        return "FDXG" if service_type in GROUND_SERVICES else "FDXE"
+
+    def pickup_group(self, service_type: Optional[str]) -> str:
+        """Packages sharing a group can be collected by the same pickup"""
+        return self.operating_company(service_type)
+
+    async def schedule_pickup(self, request: PickupRequest) -> PickupConfirmation:
+        """
+        Book one pickup for every package waiting at an address.
+
+        Args:
+            request: Location, window and package totals for the pickup
+
+        Returns:
+            PickupConfirmation with the FedEx confirmation code
+
+        Raises:
+            ValueError: If FedEx rejects the pickup or can't be reached
+        """
+        token = await self._auth.get_token()
+        pickup_request = self._prepare_pickup_request(request)
+
+        print("FedEx Pickup Request:")
+        print(json.dumps(pickup_request, indent=2))
+
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+            "X-locale": "en_US"
+        }
+
+        try:
+            response = await self._client.post(
+                f"{self._base_url}/pickup/v1/pickups",
+                headers=headers,
+                json=pickup_request,
+                timeout=30.0
+            )
+        except httpx.TimeoutException:
+            raise ValueError("FedEx Pickup API request timed out")
+        except httpx.RequestError as e:
+            raise ValueError(f"FedEx Pickup API request error: {str(e)}")
+
+        print(f"FedEx Pickup API Response Status: {response.status_code}")
+        if response.status_code != 200:
+            try:
+                error_message = json.dumps(response.json())
+            except Exception:
+                error_message = response.text or f"HTTP Error: {response.status_code}"
+            raise ValueError(f"FedEx Pickup API error: {error_message}")
+
+        output = response.json().get("output", {})
+        confirmation_code = output.get("pickupConfirmationCode")
+        if not confirmation_code:
+            raise ValueError("FedEx Pickup API returned no confirmation code")
+
+        return PickupConfirmation(
+            carrier="fedex",
+            confirmation_number=confirmation_code,
+            location=output.get("location"),
+            pickup_date=request.pickup_date,
+            package_count=request.package_count,
+            tracking_numbers=request.tracking_numbers,
+            booked_at=datetime.now()
+        )
+
+    async def get_availability(self, postal_code: str, pickup_date: date, country: str = "US") -> List[PickupWindow]:
+        """
+        Pickup windows and cutoff times for a postal code on a day.
+
+        Express and Ground are checked in the same call.
+
+        Raises:
+            ValueError: If FedEx rejects the request or can't be reached
+        """
+        token = await self._auth.get_token()
+        availability_request = {
+            "pickupAddress": {
+                "postalCode": postal_code,
+                "countryCode": country
+            },
+            "dispatchDate": pickup_date.isoformat(),
+            "pickupRequestType": ["SAME_DAY" if pickup_date == date.today() else "FUTURE_DAY"],
+            "carriers": ["FDXE", "FDXG"],
+            "countryRelationship": "DOMESTIC"
+        }
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+            "X-locale": "en_US"
+        }
+
+        try:
+            response = await self._client.post(
+                f"{self._base_url}/pickup/v1/pickups/availabilities",
+                headers=headers,
+                json=availability_request,
+                timeout=30.0
+            )
+        except httpx.TimeoutException:
+            raise ValueError("FedEx Pickup API request timed out")
+        except httpx.RequestError as e:
+            raise ValueError(f"FedEx Pickup API request error: {str(e)}")
+
+        if response.status_code != 200:
+            raise ValueError(f"FedEx Pickup API error: {response.text or response.status_code}")
+
+        windows = []
+        for option in response.json().get("output", {}).get("options", []):
+            latest = option.get("defaultLatestTimeOptions")
+            windows.append(PickupWindow(
+                service=option.get("carrier", ""),
+                available=bool(option.get("available")),
+                pickup_date=option.get("pickupDate") or pickup_date,
+                cutoff_time=option.get("cutOffTime"),
+                ready_time=option.get("defaultReadyTime"),
+                latest_time=latest[0] if isinstance(latest, list) and latest else latest,
+                residential_available=option.get("residentialAvailable")
+            ))
+        return windows
+
+    def _prepare_pickup_request(self, request: PickupRequest) -> dict:
+        """Prepare FedEx Create Pickup request payload"""
+        address = request.address
+        ready_timestamp = f"{request.pickup_date.isoformat()}T{request.ready_time}:00"
+
+        return {
+            "associatedAccountNumber": {
+                "value": self._account_number
+            },
+            "originDetail": {
+                "pickupLocation": {
+                    "contact": {
+                        "personName": address.name,
+                        "companyName": address.company or address.name,
+                        "phoneNumber": address.phone or "5555555555"
+                    },
+                    "address": {
+                        "streetLines": [address.street],
+                        "city": address.city,
+                        "stateOrProvinceCode": address.state,
+                        "postalCode": address.zip_code,
+                        "countryCode": address.country
+                    }
+                },
+                "packageLocation": "FRONT",
+                "readyDateTimestamp": ready_timestamp,
+                "customerCloseTime": f"{request.close_time}:00"
+            },
+            # The scheduler only groups services of one operating company together
+            "carrierCode": self.operating_company(next(iter(request.service_counts), None)),
+            "pickupType": "ON_CALL",
+            "packageCount": request.package_count,
+            "totalWeight": {
+                "units": "LB",
+                "value": round(request.total_weight, 1)
+            }
+        }
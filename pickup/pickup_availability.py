@@ -0,0 +1,138 @@
+# Pickup Availability
+# Cached pickup windows and cutoff times per carrier, postal code and day
+
+import os
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from models.pickup import PickupAvailability, PickupWindow
+from pickup.fedex_pickup import FedExPickupEngine
+from pickup.ups_pickup import UPSPickupEngine
+from pickup.zip_timezones import local_now
+from utils.single_flight import SingleFlight
+
+# (carrier, postal code, date)
+AvailabilityKey = Tuple[str, str, date]
+
+class PickupAvailabilityService:
+    """
+    Answers "can you pick it up today?" without a carrier call per question.
+
+    Windows are cached per (carrier, postal code, date): same-day answers for
+    PICKUP_AVAILABILITY_TTL_SECONDS, since carriers close out routes during
+    the day, and future days for PICKUP_AVAILABILITY_FUTURE_TTL_SECONDS.
+    Whether the cutoff has passed is worked out on every read, so a cached
+    answer never offers a pickup after its cutoff. Concurrent lookups for
+    the same key share one carrier call and failures aren't cached. Carriers
+    without an availability endpoint (UPS) are reported as unsupported.
+    """
+
+    def __init__(
+        self,
+        engines: Optional[Dict] = None,
+        same_day_ttl: Optional[float] = None,
+        future_ttl: Optional[float] = None,
+        max_entries: Optional[int] = None
+    ):
+        self.engines = engines if engines is not None else {
+            "fedex": FedExPickupEngine(),
+            "ups": UPSPickupEngine(),
+        }
+        self._same_day_ttl = same_day_ttl if same_day_ttl is not None else float(os.getenv('PICKUP_AVAILABILITY_TTL_SECONDS', '900'))
+        self._future_ttl = future_ttl if future_ttl is not None else float(os.getenv('PICKUP_AVAILABILITY_FUTURE_TTL_SECONDS', '21600'))
+        self._max_entries = max_entries or int(os.getenv('PICKUP_AVAILABILITY_MAX_ENTRIES', '10000'))
+        self._entries: "OrderedDict[AvailabilityKey, Tuple[float, datetime, List[PickupWindow], bool]]" = OrderedDict()
+        self._lookups = SingleFlight()
+
+    async def get_availability(
+        self,
+        carrier: str,
+        postal_code: str,
+        pickup_date: Optional[date] = None,
+        now: Optional[datetime] = None
+    ) -> PickupAvailability:
+        """
+        Pickup windows for a postal code on a day.
+
+        Args:
+            carrier: Carrier name
+            postal_code: Pickup postal code
+            pickup_date: Day of the pickup, defaults to today
+            now: Current time, used to check cutoffs; defaults to the clock
+                at the pickup ZIP, and naive values are taken as local to it
+
+        Returns:
+            PickupAvailability with windows and whether a pickup can be booked now
+
+        Raises:
+            ValueError: If the carrier is unsupported or the lookup fails
+        """
+        # Carrier cutoffs are in the pickup location's time, not the server's
+        now = local_now(postal_code, now)
+        pickup_date = pickup_date or now.date()
+        engine = self.engines.get(carrier)
+        if not engine:
+            raise ValueError("Unsupported carrier")
+
+        key = (carrier, postal_code[:5], pickup_date)
+        checked_at, windows, supported = await self._get_or_fetch(key, engine)
+
+        return PickupAvailability(
+            carrier=carrier,
+            postal_code=key[1],
+            pickup_date=pickup_date,
+            supported=supported,
+            windows=windows,
+            checked_at=checked_at,
+            can_book_now=any(self._bookable(window, now) for window in windows)
+        )
+
+    async def _get_or_fetch(self, key: AvailabilityKey, engine) -> Tuple[datetime, List[PickupWindow], bool]:
+        entry = self._entries.get(key)
+        if entry:
+            expires_at, checked_at, windows, supported = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                return checked_at, windows, supported
+            del self._entries[key]
+
+        return await self._lookups.run(key, lambda: self._fetch(key, engine))
+
+    async def _fetch(self, key: AvailabilityKey, engine) -> Tuple[datetime, List[PickupWindow], bool]:
+        carrier, postal_code, pickup_date = key
+        supported = hasattr(engine, 'get_availability')
+        windows = await engine.get_availability(postal_code, pickup_date) if supported else []
+        result = (datetime.now(), windows, supported)
+        self._store(key, result)
+        return result
+
+    def _store(self, key: AvailabilityKey, result: Tuple[datetime, List[PickupWindow], bool]) -> None:
+        ttl = self._same_day_ttl if key[2] <= date.today() else self._future_ttl
+        if ttl <= 0:
+            return
+        self._entries[key] = (time.time() + ttl, *result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def _bookable(window: PickupWindow, now: datetime) -> bool:
+        if not window.available:
+            return False
+        if window.pickup_date > now.date():
+            return True
+        if window.pickup_date < now.date():
+            return False
+        # now and cutoffs are both HH:MM:SS at the pickup location, so they compare as strings
+        return not window.cutoff_time or now.strftime("%H:%M:%S") < window.cutoff_time
+
+_availability_service: Optional[PickupAvailabilityService] = None
+
+def get_pickup_availability_service() -> PickupAvailabilityService:
+    """Get the process-wide pickup availability service"""
+    global _availability_service
+    if _availability_service is None:
+        _availability_service = PickupAvailabilityService()
+    return _availability_service
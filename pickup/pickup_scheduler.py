@@ -1,2 +1,223 @@
 # Pickup Scheduler
-# TODO: Implement this module
+# Books one carrier pickup per origin location and day instead of one per label
+
+import asyncio
+import os
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, List, Optional, Set, Tuple
+
+from models.label_request import LabelRequest
+from models.label_response import LabelResponse
+from models.pickup import PickupConfirmation, PickupRequest, PickupResult
+from models.shipping import Address
+from pickup.fedex_pickup import FedExPickupEngine
+from pickup.ups_pickup import UPSPickupEngine
+from shipments.shipment_store import ShipmentStore, get_shipment_store
+from utils.single_flight import SingleFlight
+
+# (carrier, pickup group, normalized origin address)
+LocationKey = Tuple[str, str, str]
+
+class _PendingPickup:
+    """Packages waiting at one location for one carrier"""
+    def __init__(self, address: Address):
+        self.address = address
+        self.tracking_numbers: "OrderedDict[str, None]" = OrderedDict()
+        self.package_count = 0
+        self.total_weight = 0.0
+        self.service_counts: Dict[str, int] = {}
+
+class PickupScheduler:
+    """
+    Groups the day's shipments by carrier and origin and books their pickups.
+
+    Shipments are recorded with add_shipment() as labels are created.
+    book_pickups() then makes one carrier call per location (and, for FedEx,
+    per operating company, since Express and Ground send different drivers).
+    A location booked once is not booked again that day: repeated or
+    concurrent book_pickups() calls return the stored confirmation, and
+    packages added after booking ride on the existing pickup. Failed bookings
+    are not stored, so calling book_pickups() again retries them. Days older
+    than PICKUP_RETENTION_DAYS are forgotten.
+
+    Confirmations are saved in the shipment store, and the first booking or
+    lookup for a day reloads that day's booked pickups and pickup shipments
+    from it, so a restart neither loses the day's packages nor books a
+    location twice.
+    """
+
+    def __init__(self, engines: Optional[Dict] = None, store: Optional[ShipmentStore] = None):
+        self.engines = engines if engines is not None else {
+            "fedex": FedExPickupEngine(),
+            "ups": UPSPickupEngine(),
+        }
+        self._retention_days = int(os.getenv('PICKUP_RETENTION_DAYS', '7'))
+        self._pending: Dict[date, Dict[LocationKey, _PendingPickup]] = {}
+        self._booked: Dict[date, Dict[LocationKey, PickupConfirmation]] = {}
+        self._bookings = SingleFlight()
+        self._store = store or get_shipment_store()
+        self._loaded: Set[date] = set()
+        self._loads = SingleFlight()
+
+    def add_shipment(self, request: LabelRequest, label: LabelResponse, pickup_date: Optional[date] = None) -> None:
+        """Record a created shipment as waiting for pickup at its shipper address"""
+        pickup_date = pickup_date or date.today()
+        engine = self.engines.get(label.carrier)
+        if not engine:
+            raise ValueError("Unsupported carrier")
+
+        packages = request.get_packages()
+        self._add(
+            pickup_date, label.carrier, engine, request.shipper, label.tracking_number,
+            request.service_type, len(packages), sum(package.weight for package in packages)
+        )
+        self._expire(pickup_date)
+
+    def _add(
+        self,
+        pickup_date: date,
+        carrier: str,
+        engine,
+        address: Address,
+        tracking_number: str,
+        service_type: str,
+        package_count: int,
+        total_weight: float
+    ) -> None:
+        key = (carrier, engine.pickup_group(service_type), self._address_key(address))
+        pending = self._pending.setdefault(pickup_date, {}).setdefault(key, _PendingPickup(address))
+        if tracking_number in pending.tracking_numbers:
+            return
+
+        pending.tracking_numbers[tracking_number] = None
+        pending.package_count += package_count
+        pending.total_weight += total_weight
+        pending.service_counts[service_type] = pending.service_counts.get(service_type, 0) + package_count
+
+    async def book_pickups(
+        self,
+        pickup_date: Optional[date] = None,
+        ready_time: str = "09:00",
+        close_time: str = "17:00"
+    ) -> List[PickupResult]:
+        """
+        Book a pickup for every location with shipments on a day.
+
+        Args:
+            pickup_date: Day to book, defaults to today
+            ready_time: Local time packages are ready (HH:MM)
+            close_time: Latest local pickup time (HH:MM)
+
+        Returns:
+            One PickupResult per location, with a confirmation or an error
+        """
+        pickup_date = pickup_date or date.today()
+        await self._load(pickup_date)
+        pending = self._pending.get(pickup_date, {})
+
+        async def book(key: LocationKey) -> PickupResult:
+            carrier, _, location = key
+            try:
+                confirmation = await self._book_once(pickup_date, key, pending[key], ready_time, close_time)
+                return PickupResult(carrier=carrier, location=location, confirmation=confirmation)
+            except Exception as e:
+                print(f"PickupScheduler: Booking {carrier} pickup at {location} failed: {str(e)}")
+                return PickupResult(carrier=carrier, location=location, error=str(e))
+
+        return list(await asyncio.gather(*[book(key) for key in list(pending)]))
+
+    async def get_bookings(self, pickup_date: Optional[date] = None) -> List[PickupConfirmation]:
+        """Pickups already booked for a day"""
+        pickup_date = pickup_date or date.today()
+        await self._load(pickup_date)
+        return list(self._booked.get(pickup_date, {}).values())
+
+    async def _load(self, pickup_date: date) -> None:
+        """Merge a day's stored bookings and pickup shipments into memory, once per day"""
+        if pickup_date in self._loaded:
+            return
+        await self._loads.run(pickup_date, lambda: self._load_day(pickup_date))
+
+    async def _load_day(self, pickup_date: date) -> None:
+        if pickup_date in self._loaded:
+            return
+        bookings = await self._store.list_pickups(pickup_date)
+        records = await self._store.find(ship_date=pickup_date, limit=None)
+
+        booked = self._booked.setdefault(pickup_date, {})
+        for key, confirmation in bookings:
+            booked.setdefault(key, confirmation)
+        for record in records:
+            engine = self.engines.get(record.carrier)
+            if record.pickup_address and engine:
+                self._add(
+                    pickup_date, record.carrier, engine, record.pickup_address, record.tracking_number,
+                    record.service_type, record.package_count, record.total_weight
+                )
+        self._loaded.add(pickup_date)
+
+    async def _book_once(
+        self,
+        pickup_date: date,
+        key: LocationKey,
+        pending: _PendingPickup,
+        ready_time: str,
+        close_time: str
+    ) -> PickupConfirmation:
+        booked = self._booked.get(pickup_date, {}).get(key)
+        if booked:
+            return booked
+
+        return await self._bookings.run(
+            (pickup_date, key),
+            lambda: self._book(pickup_date, key, pending, ready_time, close_time)
+        )
+
+    async def _book(
+        self,
+        pickup_date: date,
+        key: LocationKey,
+        pending: _PendingPickup,
+        ready_time: str,
+        close_time: str
+    ) -> PickupConfirmation:
+        confirmation = await self.engines[key[0]].schedule_pickup(PickupRequest(
+            carrier=key[0],
+            address=pending.address,
+            pickup_date=pickup_date,
+            ready_time=ready_time,
+            close_time=close_time,
+            package_count=pending.package_count,
+            total_weight=pending.total_weight,
+            tracking_numbers=list(pending.tracking_numbers),
+            service_counts=dict(pending.service_counts)
+        ))
+        self._booked.setdefault(pickup_date, {})[key] = confirmation
+        try:
+            await self._store.save_pickup(key, confirmation)
+        except Exception as e:
+            # Booked either way; only a restart today could book this location again
+            print(f"PickupScheduler: Failed to save {key[0]} pickup {confirmation.confirmation_number}: {str(e)}")
+        return confirmation
+
+    def _expire(self, today: date) -> None:
+        for day in [d for d in set(self._pending) | set(self._booked) if (today - d).days > self._retention_days]:
+            self._pending.pop(day, None)
+            self._booked.pop(day, None)
+            self._loaded.discard(day)
+
+    @staticmethod
+    def _address_key(address: Address) -> str:
+        """Same dock written slightly differently still maps to one location"""
+        street = " ".join(address.street.upper().replace(".", "").replace(",", "").split())
+        return f"{street}|{address.zip_code[:5]}|{address.country.upper()}"
+
+_pickup_scheduler: Optional[PickupScheduler] = None
+
+def get_pickup_scheduler() -> PickupScheduler:
+    """Get the process-wide pickup scheduler"""
+    global _pickup_scheduler
+    if _pickup_scheduler is None:
+        _pickup_scheduler = PickupScheduler()
+    return _pickup_scheduler
@@ -1,2 +1,154 @@
 # Ups Pickup
-# TODO: Implement this module
+# Books UPS on-demand pickups through the Pickup API (/pickupcreation/{version}/pickup)
+
+import os
+import json
+import uuid
+import httpx
+from datetime import datetime
+from typing import Optional
+
+from models.pickup import PickupRequest, PickupConfirmation
+from auth.ups_auth import UPSAuth
+from utils.http_client import get_http_client
+
+# UPS shipping service codes and the three-digit codes the Pickup API expects
+PICKUP_SERVICE_CODES = {
+    "01": "001",  # Next Day Air
+    "02": "002",  # 2nd Day Air
+    "03": "003",  # Ground
+    "12": "012",  # 3 Day Select
+    "13": "013",  # Next Day Air Saver
+    "14": "014",  # Next Day Air Early
+    "59": "059",  # 2nd Day Air A.M.
+}
+
+class UPSPickupEngine:
+    def __init__(self):
+        self._auth = UPSAuth()
+        self._base_url = os.getenv('UPS_API_URL', 'https://onlinetools.ups.com')
+        self._account_number = os.getenv('UPS_ACCOUNT_NUMBER')
+        self._version = os.getenv('UPS_PICKUP_API_VERSION', 'v2409')
+        self._client = get_http_client()
+
+    def pickup_group(self, service_type: Optional[str]) -> str:
+        """One UPS pickup collects every service, so all packages share a group"""
+        return ""
+
+    async def schedule_pickup(self, request: PickupRequest) -> PickupConfirmation:
+        """
+        Book one pickup for every package waiting at an address.
+
+        UPS returns the existing PRN if a pickup is already scheduled for the
+        address, so a repeated booking doesn't dispatch a second driver.
+
+        Args:
+            request: Location, window and package totals for the pickup
+
+        Returns:
+            PickupConfirmation carrying the UPS pickup request number (PRN)
+
+        Raises:
+            ValueError: If UPS rejects the pickup or can't be reached
+        """
+        token = await self._auth.get_token()
+        pickup_request = self._prepare_pickup_request(request)
+
+        print("UPS Pickup Request:")
+        print(json.dumps(pickup_request, indent=2))
+
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+            "transId": uuid.uuid4().hex,
+            "transactionSrc": "shipvox"
+        }
+
+        try:
+            response = await self._client.post(
+                f"{self._base_url}/api/pickupcreation/{self._version}/pickup",
+                headers=headers,
+                json=pickup_request,
+                timeout=30.0
+            )
+        except httpx.TimeoutException:
+            raise ValueError("UPS Pickup API request timed out")
+        except httpx.RequestError as e:
+            raise ValueError(f"UPS Pickup API request error: {str(e)}")
+
+        print(f"UPS Pickup API Response Status: {response.status_code}")
+        if response.status_code != 200:
+            try:
+                error_message = json.dumps(response.json())
+            except Exception:
+                error_message = response.text or f"HTTP Error: {response.status_code}"
+            raise ValueError(f"UPS Pickup API error: {error_message}")
+
+        prn = response.json().get("PickupCreationResponse", {}).get("PRN")
+        if not prn:
+            raise ValueError("UPS Pickup API returned no pickup request number")
+
+        return PickupConfirmation(
+            carrier="ups",
+            confirmation_number=prn,
+            pickup_date=request.pickup_date,
+            package_count=request.package_count,
+            tracking_numbers=request.tracking_numbers,
+            booked_at=datetime.now()
+        )
+
+    def _prepare_pickup_request(self, request: PickupRequest) -> dict:
+        """Prepare UPS Pickup Creation request payload"""
+        address = request.address
+        service_counts = request.service_counts or {"03": request.package_count}
+
+        return {
+            "PickupCreationRequest": {
+                "Request": {
+                    "TransactionReference": {
+                        "CustomerContext": "Pickup Request"
+                    }
+                },
+                "RatePickupIndicator": "N",
+                "Shipper": {
+                    "Account": {
+                        "AccountNumber": self._account_number,
+                        "AccountCountryCode": address.country
+                    }
+                },
+                "PickupDateInfo": {
+                    "CloseTime": request.close_time.replace(":", ""),
+                    "ReadyTime": request.ready_time.replace(":", ""),
+                    "PickupDate": request.pickup_date.strftime("%Y%m%d")
+                },
+                "PickupAddress": {
+                    "CompanyName": address.company or address.name,
+                    "ContactName": address.name,
+                    "AddressLine": address.street,
+                    "City": address.city,
+                    "StateProvince": address.state,
+                    "PostalCode": address.zip_code,
+                    "CountryCode": address.country,
+                    "ResidentialIndicator": "N",
+                    "Phone": {
+                        "Number": address.phone or "5555555555"
+                    }
+                },
+                "AlternateAddressIndicator": "Y",
+                "PickupPiece": [
+                    {
+                        "ServiceCode": PICKUP_SERVICE_CODES.get(service_type, "003"),
+                        "Quantity": str(count),
+                        "DestinationCountryCode": "US",
+                        "ContainerCode": "01"  # Package
+                    }
+                    for service_type, count in service_counts.items()
+                ],
+                "TotalWeight": {
+                    "Weight": f"{request.total_weight:.1f}",
+                    "UnitOfMeasurement": "LBS"
+                },
+                "OverweightIndicator": "N",
+                "PaymentMethod": "01"  # Shipper account
+            }
+        }
@@ -0,0 +1,70 @@
+# Zip Timezones
+# Local time zone of a US pickup location from its ZIP code
+
+import os
+from datetime import datetime, tzinfo
+from typing import Optional, Tuple
+from zoneinfo import ZoneInfo
+
+# (first 3-digit prefix, last 3-digit prefix, IANA zone), checked in order.
+# Where a prefix straddles a zone line it goes with the area's main city.
+ZIP3_TIMEZONES: Tuple[Tuple[int, int, str], ...] = (
+    (6, 9, "America/Puerto_Rico"),
+    (324, 325, "America/Chicago"),      # Florida panhandle
+    (320, 349, "America/New_York"),
+    (350, 369, "America/Chicago"),      # Alabama
+    (373, 374, "America/New_York"),     # Chattanooga
+    (376, 379, "America/New_York"),     # East Tennessee
+    (370, 397, "America/Chicago"),      # Tennessee, Mississippi
+    (420, 427, "America/Chicago"),      # Western Kentucky
+    (463, 464, "America/Chicago"),      # Gary
+    (476, 477, "America/Chicago"),      # Evansville
+    (400, 499, "America/New_York"),     # Kentucky, Ohio, Indiana, Michigan
+    (577, 577, "America/Denver"),       # Western South Dakota
+    (500, 589, "America/Chicago"),      # Iowa, Wisconsin, Minnesota, Dakotas
+    (590, 599, "America/Denver"),       # Montana
+    (693, 693, "America/Denver"),       # Western Nebraska
+    (600, 797, "America/Chicago"),      # Illinois through Texas
+    (798, 799, "America/Denver"),       # El Paso
+    (850, 865, "America/Phoenix"),      # Arizona
+    (835, 835, "America/Los_Angeles"),  # Lewiston
+    (838, 838, "America/Los_Angeles"),  # North Idaho
+    (800, 888, "America/Denver"),       # Colorado, Wyoming, Idaho, Utah, New Mexico
+    (889, 961, "America/Los_Angeles"),  # Nevada, California
+    (967, 968, "Pacific/Honolulu"),
+    (969, 969, "Pacific/Guam"),
+    (970, 994, "America/Los_Angeles"),  # Oregon, Washington
+    (995, 999, "America/Anchorage"),
+    (0, 299, "America/New_York"),       # Northeast through Georgia
+)
+
+def zip_timezone(postal_code: str) -> Optional[tzinfo]:
+    """
+    Time zone of a US ZIP code.
+
+    Returns:
+        The zone, PICKUP_DEFAULT_TIMEZONE if the ZIP isn't covered, or None
+        (server local time) if that isn't set either
+    """
+    if len(postal_code) >= 3 and postal_code[:3].isdigit():
+        prefix = int(postal_code[:3])
+        for first, last, zone in ZIP3_TIMEZONES:
+            if first <= prefix <= last:
+                return ZoneInfo(zone)
+    default = os.getenv('PICKUP_DEFAULT_TIMEZONE')
+    return ZoneInfo(default) if default else None
+
+def local_now(postal_code: str, now: Optional[datetime] = None) -> datetime:
+    """
+    Wall-clock time at a ZIP code, as a naive datetime.
+
+    Args:
+        postal_code: US ZIP code
+        now: Current time; naive values are taken as already local to the ZIP
+    """
+    if now is not None and now.tzinfo is None:
+        return now
+    zone = zip_timezone(postal_code)
+    if zone is None:
+        return (now.astimezone() if now else datetime.now()).replace(tzinfo=None)
+    return (now or datetime.now(zone)).astimezone(zone).replace(tzinfo=None)
@@ -9,6 +9,8 @@ from rates.base_rate_engine import BaseRateEngine
 from utils.service_normalizer import ServiceTier, ServiceNormalizer
 from auth.fedex_auth import FedExAuth
 from utils.exceptions import RateError
+from utils.http_client import get_http_client
+from utils.carrier_schemas import FEDEX_RATE_REQUEST, validate_request
 import httpx
 import os
 import json
@@ -24,7 +26,7 @@ class FedExRateEngine(BaseRateEngine):
         self._base_url = os.getenv('FEDEX_API_URL', 'https://apis-sandbox.fedex.com')
         self._account_number = os.getenv('FEDEX_ACCOUNT_NUMBER')
         print(f"FedExRateEngine: Initialized with account number: {self._account_number}")
-        self._client = httpx.AsyncClient()
+        self._client = get_http_client()
         self._normalizer = ServiceNormalizer()
 
     async def validate_credentials(self) -> bool:
@@ -51,22 +53,15 @@ class FedExRateEngine(BaseRateEngine):
         print("FedExRateEngine: Using real FedEx API for rates")
 
         try:
+            print("FedExRateEngine: Preparing rate request")
+            request_data = self._prepare_rate_request(self._shipment_from_request(request))
+            print(f"FedExRateEngine: Request data prepared: {json.dumps(request_data, indent=2)}")
+            # Malformed payloads fail here, not after a round trip and a fallback call
+            validate_request(FEDEX_RATE_REQUEST, request_data, "FedEx rate request")
+
             print("FedExRateEngine: Getting token from auth service")
             token = await self._auth.get_token()
             print(f"FedExRateEngine: Got token: {token[:10]}..." if token else "FedExRateEngine: No token received")
-
-            print("FedExRateEngine: Preparing rate request")
-            request_data = self._prepare_rate_request({
-                'origin': {'postal_code': request.origin_zip, 'country_code': 'US'},
-                'destination': {'postal_code': request.destination_zip, 'country_code': 'US'},
-                'packages': [{
-                    'weight': request.weight,
-                    'length': request.dimensions.length if request.dimensions else 12,
-                    'width': request.dimensions.width if request.dimensions else 12,
-                    'height': request.dimensions.height if request.dimensions else 12
-                }]
-            })
-            print(f"FedExRateEngine: Request data prepared: {json.dumps(request_data, indent=2)}")
             print(f"FedExRateEngine: Using account number: {self._account_number}")
 
             rate_url = f"{self._base_url}/rate/v1/rates/quotes"
@@ -103,16 +98,8 @@ class FedExRateEngine(BaseRateEngine):
                 if hasattr(e, 'response') and e.response is not None and e.response.status_code == 400:
                     print("FedExRateEngine: Trying fallback with specific service type (FEDEX_GROUND)")
                     # Create a new request with a specific service type
-                    fallback_request_data = self._prepare_rate_request_with_service({
-                        'origin': {'postal_code': request.origin_zip, 'country_code': 'US'},
-                        'destination': {'postal_code': request.destination_zip, 'country_code': 'US'},
-                        'packages': [{
-                            'weight': request.weight,
-                            'length': request.dimensions.length if request.dimensions else 12,
-                            'width': request.dimensions.width if request.dimensions else 12,
-                            'height': request.dimensions.height if request.dimensions else 12
-                        }]
-                    }, "FEDEX_GROUND")
+                    fallback_request_data = self._prepare_rate_request_with_service(self._shipment_from_request(request), "FEDEX_GROUND")
+                    validate_request(FEDEX_RATE_REQUEST, fallback_request_data, "FedEx rate request")
 
                     try:
                         fallback_response = await self._client.post(
@@ -149,7 +136,8 @@ class FedExRateEngine(BaseRateEngine):
                         service_tier=self._normalizer.normalize_service('fedex', rate['service_code']),
                         cost=float(rate['total_charge']) if rate['total_charge'] else 0.0,
                         estimated_delivery=datetime.fromisoformat(rate['delivery_date']) if rate['delivery_date'] else None,
-                        transit_days=int(rate['transit_days']) if rate['transit_days'] else 1
+                        transit_days=int(rate['transit_days']) if rate['transit_days'] else 1,
+                        service_code=rate['service_code']
                     )
                     for rate in rates
                 ]
@@ -165,7 +153,7 @@ class FedExRateEngine(BaseRateEngine):
         # This is just for testing purposes
         base_rate = 10.0
         try:
-            weight_factor = request.weight * 0.5
+            weight_factor = request.total_weight * 0.5
         except (TypeError, AttributeError):
             # Default if there's an issue with the weight
             weight_factor = 2.5  # Default for a 5 lb package
@@ -191,7 +179,8 @@ class FedExRateEngine(BaseRateEngine):
                 service_tier=ServiceTier.GROUND_EOD,
                 cost=base_rate + weight_factor + distance_factor,
                 estimated_delivery=delivery_date,
-                transit_days=5
+                transit_days=5,
+                service_code='FEDEX_GROUND'
             ),
             RateOption(
                 carrier='fedex',
@@ -199,7 +188,8 @@ class FedExRateEngine(BaseRateEngine):
                 service_tier=ServiceTier.DAY3_EOD,
                 cost=(base_rate + weight_factor + distance_factor) * 1.2,
                 estimated_delivery=delivery_date - timedelta(days=2),
-                transit_days=3
+                transit_days=3,
+                service_code='FEDEX_EXPRESS_SAVER'
             ),
             RateOption(
                 carrier='fedex',
@@ -207,7 +197,8 @@ class FedExRateEngine(BaseRateEngine):
                 service_tier=ServiceTier.DAY2_EOD,
                 cost=(base_rate + weight_factor + distance_factor) * 1.8,
                 estimated_delivery=delivery_date - timedelta(days=3),
-                transit_days=2
+                transit_days=2,
+                service_code='FEDEX_2_DAY'
             ),
             RateOption(
                 carrier='fedex',
@@ -215,7 +206,8 @@ class FedExRateEngine(BaseRateEngine):
                 service_tier=ServiceTier.DAY1_EOD,
                 cost=(base_rate + weight_factor + distance_factor) * 2.5,
                 estimated_delivery=overnight_date,
-                transit_days=1
+                transit_days=1,
+                service_code='STANDARD_OVERNIGHT'
             ),
             RateOption(
                 carrier='fedex',
@@ -223,7 +215,8 @@ class FedExRateEngine(BaseRateEngine):
                 service_tier=ServiceTier.DAY1_NOON,
                 cost=(base_rate + weight_factor + distance_factor) * 3.0,
                 estimated_delivery=overnight_date,
-                transit_days=1
+                transit_days=1,
+                service_code='PRIORITY_OVERNIGHT'
             ),
             RateOption(
                 carrier='fedex',
@@ -231,10 +224,30 @@ class FedExRateEngine(BaseRateEngine):
                 service_tier=ServiceTier.DAY1_AM,
                 cost=(base_rate + weight_factor + distance_factor) * 3.5,
                 estimated_delivery=overnight_date,
-                transit_days=1
+                transit_days=1,
+                service_code='FIRST_OVERNIGHT'
             )
         ]
 
+    def _shipment_from_request(self, request: RateRequest) -> Dict:
+        """
+        Convert a RateRequest to shipment details, with every package of a
+        multi-package request rated together in one call.
+        """
+        return {
+            'origin': {'postal_code': request.origin_zip, 'country_code': 'US'},
+            'destination': {'postal_code': request.destination_zip, 'country_code': 'US'},
+            'packages': [
+                {
+                    'weight': package.weight,
+                    'length': package.dimensions.length if package.dimensions else 12,
+                    'width': package.dimensions.width if package.dimensions else 12,
+                    'height': package.dimensions.height if package.dimensions else 12
+                }
+                for package in request.get_packages()
+            ]
+        }
+
     def _prepare_rate_request(self, shipment: Dict) -> Dict:
         """
         Prepare the rate request payload for FedEx API without specifying a service type.
@@ -285,6 +298,7 @@ class FedExRateEngine(BaseRateEngine):
                 "packagingType": "YOUR_PACKAGING",
                 "rateRequestType": ["LIST"],
                 "preferredCurrency": "USD",
+                "totalPackageCount": len(shipment['packages']),
                 "requestedPackageLineItems": [
                     {
                         "weight": {
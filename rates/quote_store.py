@@ -0,0 +1,154 @@
+# Quote Store
+# Short-lived rate quotes that label creation can ship against
+
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Optional
+
+from models.label_request import LabelRequest
+from models.rate_request import RateRequest
+from models.rate_response import RateOption, RateQuote
+from models.shipping import Dimensions, Package
+
+class QuoteStore:
+    """
+    Holds the rate options we quoted so a label can be created from one.
+
+    issue() gives every option a quote id. A LabelRequest carrying that id
+    only needs the addresses: apply() fills in the carrier, service and the
+    packages that were rated, so the shipment isn't validated or rated
+    again and the label ships at the quoted price. Quotes live for
+    QUOTE_TTL_SECONDS and at most QUOTE_MAX_ENTRIES are kept.
+
+    A quote ships one label. The label creator reserve()s it for the
+    carrier call, then consume()s it once the carrier accepts the shipment
+    or release()s it if the call fails.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_entries: Optional[int] = None):
+        self._ttl = ttl_seconds if ttl_seconds is not None else float(os.getenv('QUOTE_TTL_SECONDS', '900'))
+        self._max_entries = max_entries or int(os.getenv('QUOTE_MAX_ENTRIES', '50000'))
+        self._quotes: "OrderedDict[str, RateQuote]" = OrderedDict()
+        # Quote id -> True once shipped, False while its label is being created
+        self._claims: "OrderedDict[str, bool]" = OrderedDict()
+
+    def issue(self, request: RateRequest, options: List[RateOption]) -> List[RateOption]:
+        """
+        Quote rate options for a shipment.
+
+        Returns:
+            Copies of the options carrying their quote ids (cached options
+            are shared between requests, so they aren't modified)
+        """
+        expires_at = datetime.fromtimestamp(time.time() + self._ttl)
+        quoted = []
+        for option in options:
+            quote_id = uuid.uuid4().hex
+            update = {"quote_id": quote_id}
+            option = option.model_copy(update=update) if hasattr(option, 'model_copy') else option.copy(update=update)
+            self._quotes[quote_id] = RateQuote(quote_id=quote_id, request=request, option=option, expires_at=expires_at)
+            quoted.append(option)
+
+        while len(self._quotes) > self._max_entries:
+            self._quotes.popitem(last=False)
+        return quoted
+
+    def get(self, quote_id: str) -> Optional[RateQuote]:
+        """A quote, if it exists and hasn't expired"""
+        quote = self._quotes.get(quote_id)
+        if quote and quote.expires_at <= datetime.now():
+            del self._quotes[quote_id]
+            return None
+        return quote
+
+    def apply(self, request: LabelRequest) -> LabelRequest:
+        """
+        Complete a label request from its quote.
+
+        Requests without a quote id are returned unchanged.
+
+        The returned request carries the quote (LabelRequest.quote), so it
+        isn't looked up again later.
+
+        Raises:
+            ValueError: If the quote is unknown, expired or already used, or
+                the request contradicts it (other carrier, service or ZIP codes)
+        """
+        if not request.quote_id:
+            return request
+
+        if self._claims.get(request.quote_id):
+            raise ValueError("Quote already used; get rates again")
+        quote = self.get(request.quote_id)
+        if not quote:
+            raise ValueError("Quote not found or expired; get rates again")
+        option, rated = quote.option, quote.request
+
+        if not option.service_code:
+            raise ValueError("Quoted option can't be shipped: no carrier service code")
+        if request.carrier and request.carrier != option.carrier:
+            raise ValueError(f"Quote is for {option.carrier}, not {request.carrier}")
+        if request.service_type and request.service_type != option.service_code:
+            raise ValueError(f"Quote is for {option.service_code}, not {request.service_type}")
+        if request.shipper.zip_code[:5] != rated.origin_zip[:5] or request.recipient.zip_code[:5] != rated.destination_zip[:5]:
+            raise ValueError("Shipper and recipient ZIP codes don't match the quote")
+        if (request.package or request.packages) and \
+                sorted(package.weight for package in request.get_packages()) != sorted(package.weight for package in rated.get_packages()):
+            raise ValueError("Packages don't match the quote")
+
+        update = {
+            "carrier": option.carrier,
+            "service_type": option.service_code,
+            "package": None,
+            "packages": [
+                Package(
+                    weight=package.weight,
+                    dimensions=Dimensions(
+                        length=package.dimensions.length,
+                        width=package.dimensions.width,
+                        height=package.dimensions.height
+                    ) if package.dimensions else None
+                )
+                for package in rated.get_packages()
+            ]
+        }
+        # Already validated when the shipment was rated
+        applied = request.model_copy(update=update) if hasattr(request, 'model_copy') else request.copy(update=update)
+        applied._quote = quote
+        return applied
+
+    def reserve(self, quote_id: str) -> None:
+        """
+        Hold a quote while its label is created.
+
+        Raises:
+            ValueError: If the quote was already used or is being used
+        """
+        claimed = self._claims.get(quote_id)
+        if claimed is not None:
+            raise ValueError("Quote already used; get rates again" if claimed else "A label is already being created for this quote")
+        self._claims[quote_id] = False
+        while len(self._claims) > self._max_entries:
+            self._claims.popitem(last=False)
+
+    def consume(self, quote_id: str) -> None:
+        """Mark a reserved quote used; it can't ship another label"""
+        self._claims[quote_id] = True
+        self._quotes.pop(quote_id, None)
+
+    def release(self, quote_id: str) -> None:
+        """Free a reserved quote after its label failed"""
+        if self._claims.get(quote_id) is False:
+            del self._claims[quote_id]
+
+_quote_store: Optional[QuoteStore] = None
+
+def get_quote_store() -> QuoteStore:
+    """Get the process-wide quote store"""
+    global _quote_store
+    if _quote_store is None:
+        _quote_store = QuoteStore()
+    return _quote_store
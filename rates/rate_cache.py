@@ -0,0 +1,99 @@
+# Rate Cache
+# Short-lived cache of carrier quotes, keyed by the whole shipment
+
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from models.rate_request import RateRequest
+from models.rate_response import RateOption
+from utils.single_flight import SingleFlight
+
+class RateCache:
+    """
+    Caches each carrier's rate options for a shipment.
+
+    The key covers origin, destination and every package, so a multi-package
+    shipment is cached (and invalidated) as a unit. Concurrent requests for
+    the same shipment share a single carrier call. Entries live for
+    RATE_CACHE_TTL_SECONDS and at most RATE_CACHE_MAX_ENTRIES are kept.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_entries: Optional[int] = None):
+        self._ttl = ttl_seconds if ttl_seconds is not None else float(os.getenv('RATE_CACHE_TTL_SECONDS', '300'))
+        self._max_entries = max_entries or int(os.getenv('RATE_CACHE_MAX_ENTRIES', '10000'))
+        self._entries: "OrderedDict[str, Tuple[float, List[RateOption]]]" = OrderedDict()
+        self._calls = SingleFlight()
+
+    @staticmethod
+    def key(carrier: str, request: RateRequest) -> str:
+        """Canonical cache key; package order doesn't change the rate"""
+        packages = sorted(
+            (
+                package.weight,
+                package.dimensions.length if package.dimensions else None,
+                package.dimensions.width if package.dimensions else None,
+                package.dimensions.height if package.dimensions else None
+            )
+            for package in request.get_packages()
+        )
+        return json.dumps([carrier, request.origin_zip, request.destination_zip, packages])
+
+    def get(self, carrier: str, request: RateRequest) -> Optional[List[RateOption]]:
+        """Cached options for a shipment, if still fresh"""
+        key = self.key(carrier, request)
+        entry = self._entries.get(key)
+        if not entry:
+            return None
+        expires_at, options = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return list(options)
+
+    def set(self, carrier: str, request: RateRequest, options: List[RateOption]) -> None:
+        """Cache options for a shipment"""
+        if self._ttl <= 0:
+            return
+        key = self.key(carrier, request)
+        self._entries[key] = (time.time() + self._ttl, list(options))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_fetch(
+        self,
+        carrier: str,
+        request: RateRequest,
+        fetch: Callable[[RateRequest], Awaitable[List[RateOption]]]
+    ) -> List[RateOption]:
+        """
+        Get cached options or fetch them from the carrier once.
+
+        Args:
+            carrier: Carrier name
+            request: Shipment to rate
+            fetch: Carrier engine's get_rates
+
+        Returns:
+            List of rate options
+        """
+        cached = self.get(carrier, request)
+        if cached is not None:
+            return cached
+
+        options = await self._calls.run(self.key(carrier, request), lambda: self._fetch(carrier, request, fetch))
+        return list(options)
+
+    async def _fetch(
+        self,
+        carrier: str,
+        request: RateRequest,
+        fetch: Callable[[RateRequest], Awaitable[List[RateOption]]]
+    ) -> List[RateOption]:
+        options = await fetch(request)
+        self.set(carrier, request, options)
+        return options
@@ -4,22 +4,40 @@ from models.rate_response import RateResponse
 from rates.fedex_rates import FedExRateEngine
 from rates.ups_rates import UPSRateEngine
 from rates.rate_comparer import RateComparer
+from rates.rate_cache import RateCache
+from rates.quote_store import get_quote_store
 from utils.exceptions import ValidationError
 import asyncio
 import os
 
+# How each carrier is named in error messages
+CARRIER_NAMES = {'fedex': 'FedEx', 'ups': 'UPS'}
+
+# Carriers we can create labels with; only their options get quote ids
+# (labels/ups_ship.py is still a stub)
+SHIPPABLE_CARRIERS = {'fedex'}
+
 class RateService:
     def __init__(self):
         self._fedex_engine = FedExRateEngine()
         self._ups_engine = UPSRateEngine()
         self._comparer = RateComparer()
-        # Flag to control whether UPS is enabled
+        self._cache = RateCache()
+        self._quotes = get_quote_store()
+        # UPS rates are opt-in until UPS labels can be created
         self._ups_enabled = os.getenv('ENABLE_UPS', 'false').lower() == 'true'
+        self._engines = {'fedex': self._fedex_engine}
+        if self._ups_enabled:
+            self._engines['ups'] = self._ups_engine
 
     async def get_rates(self, request: RateRequest) -> RateResponse:
         """
         Get shipping rates from all available carriers and return the best options.
 
+        Every enabled carrier is rated concurrently through the rate cache
+        (and the shared HTTP client); one carrier failing doesn't fail the
+        others.
+
         Args:
             request: RateRequest containing shipping details
 
@@ -29,48 +47,24 @@ class RateService:
         Raises:
             ValidationError: If no valid rates are found
         """
-        print("RateService: Getting rates from enabled carriers")
-        # Get rates from enabled carriers
-        tasks = [self._fedex_engine.get_rates(request)]
-
-        # Only add UPS if it's enabled
-        if self._ups_enabled:
-            print("RateService: UPS is enabled, adding to tasks")
-            tasks.append(self._ups_engine.get_rates(request))
-        else:
-            print("RateService: UPS is disabled, skipping")
-
-        print(f"RateService: Executing {len(tasks)} tasks")
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        print(f"RateService: Got {len(results)} results")
+        print(f"RateService: Getting rates from {', '.join(self._engines)}")
+        results = await asyncio.gather(
+            *(self._cache.get_or_fetch(carrier, request, engine.get_rates) for carrier, engine in self._engines.items()),
+            return_exceptions=True
+        )
 
         all_options = []
         errors = []
-
-        # Process FedEx results (always first)
-        print(f"RateService: Processing FedEx results: {type(results[0])}")
-        if isinstance(results[0], Exception):
-            error_msg = f"FedEx error: {str(results[0])}"
-            print(f"RateService: {error_msg}")
-            errors.append(error_msg)
-        elif isinstance(results[0], list):
-            print(f"RateService: FedEx returned {len(results[0])} options")
-            all_options.extend(results[0])
-        else:
-            print(f"RateService: Unexpected FedEx result type: {type(results[0])}")
-
-        # Process UPS results if enabled
-        if self._ups_enabled and len(results) > 1:
-            print(f"RateService: Processing UPS results: {type(results[1])}")
-            if isinstance(results[1], Exception):
-                error_msg = f"UPS error: {str(results[1])}"
+        for carrier, result in zip(self._engines, results):
+            if isinstance(result, Exception):
+                error_msg = f"{CARRIER_NAMES[carrier]} error: {str(result)}"
                 print(f"RateService: {error_msg}")
                 errors.append(error_msg)
-            elif isinstance(results[1], list):
-                print(f"RateService: UPS returned {len(results[1])} options")
-                all_options.extend(results[1])
+            elif isinstance(result, list):
+                print(f"RateService: {carrier} returned {len(result)} options")
+                all_options.extend(result)
             else:
-                print(f"RateService: Unexpected UPS result type: {type(results[1])}")
+                print(f"RateService: Unexpected {carrier} result type: {type(result)}")
 
         print(f"RateService: Total options found: {len(all_options)}")
         if not all_options:
@@ -78,6 +72,11 @@ class RateService:
             print(f"RateService: {error_msg}")
             raise ValidationError(error_msg)
 
+        # Shippable options can be shipped by quote id at the quoted price
+        shippable = [option for option in all_options if option.carrier in SHIPPABLE_CARRIERS]
+        all_options = self._quotes.issue(request, shippable) + \
+            [option for option in all_options if option.carrier not in SHIPPABLE_CARRIERS]
+
         # Compare and return best options
         print("RateService: Comparing rates to find best options")
         result = self._comparer.compare_rates(all_options)
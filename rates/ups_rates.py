@@ -1,15 +1,40 @@
 # Ups Rates
-# TODO: Implement this module
+# UPS Rating API (Shop with time in transit), see API_Reference/UPS/Rating.yaml
 
-from typing import List
+from typing import List, Optional
 from datetime import datetime, timedelta
 from models.rate_request import RateRequest
 from models.rate_response import RateOption
 from rates.base_rate_engine import BaseRateEngine
 from utils.service_normalizer import ServiceTier, ServiceNormalizer
+from utils.exceptions import RateError
 from auth.ups_auth import UPSAuth
+from utils.http_client import get_http_client
 import httpx
 import os
+import uuid
+
+# UPS leaves Service.Description empty in most Shop responses
+UPS_SERVICE_NAMES = {
+    "14": "UPS Next Day Air Early",
+    "01": "UPS Next Day Air",
+    "13": "UPS Next Day Air Saver",
+    "59": "UPS 2nd Day Air A.M.",
+    "02": "UPS 2nd Day Air",
+    "12": "UPS 3 Day Select",
+    "03": "UPS Ground"
+}
+
+# Transit days assumed when UPS returns no time in transit for a service
+DEFAULT_TRANSIT_DAYS = {
+    ServiceTier.DAY1_AM: 1,
+    ServiceTier.DAY1_NOON: 1,
+    ServiceTier.DAY1_EOD: 1,
+    ServiceTier.DAY2_AM: 2,
+    ServiceTier.DAY2_EOD: 2,
+    ServiceTier.DAY3_EOD: 3,
+    ServiceTier.GROUND_EOD: 5
+}
 
 class UPSRateEngine(BaseRateEngine):
     def __init__(self):
@@ -17,10 +42,12 @@ class UPSRateEngine(BaseRateEngine):
         # Store credentials for mock mode check
         self._client_id = os.getenv('UPS_CLIENT_ID')
         self._client_secret = os.getenv('UPS_CLIENT_SECRET')
+        self._account_number = os.getenv('UPS_ACCOUNT_NUMBER')
         self._auth = UPSAuth()
         self._normalizer = ServiceNormalizer()
         self._base_url = os.getenv('UPS_API_URL', 'https://onlinetools.ups.com')
-        self._client = httpx.AsyncClient()
+        self._version = os.getenv('UPS_RATING_VERSION', 'v2409')
+        self._client = get_http_client()
 
     async def validate_credentials(self) -> bool:
         try:
@@ -30,25 +57,42 @@ class UPSRateEngine(BaseRateEngine):
             return False
 
     async def get_rates(self, request: RateRequest) -> List[RateOption]:
-        """Get shipping rates from UPS."""
-        try:
-            # Check if we're in mock mode (no API credentials)
-            # Use environment variables directly to avoid attribute errors
-            if not os.getenv('UPS_CLIENT_ID') or not os.getenv('UPS_CLIENT_SECRET'):
-                # Return mock data for testing
-                return self._get_mock_rates(request)
-        except Exception as e:
-            # If there's any issue with the check, use mock data
-            print(f"Error checking UPS credentials: {str(e)}. Using mock data.")
+        """
+        Get shipping rates from UPS.
+
+        One Shop request rates every UPS service for the shipment, with
+        time in transit. Without UPS credentials mock rates are returned.
+
+        Raises:
+            RateError: If UPS rejects the request or can't be reached
+        """
+        if not os.getenv('UPS_CLIENT_ID') or not os.getenv('UPS_CLIENT_SECRET'):
             return self._get_mock_rates(request)
 
         try:
-            # Since UPS is disabled, just return an empty list
-            # This will be skipped anyway due to the ENABLE_UPS flag
-            return []
-        except Exception as e:
-            from utils.exceptions import RateError
+            token = await self._auth.get_token()
+            response = await self._client.post(
+                f"{self._base_url}/api/rating/{self._version}/Shoptimeintransit",
+                json=self._prepare_rate_request(request),
+                headers={
+                    "Authorization": f"Bearer {token}",
+                    "Content-Type": "application/json",
+                    "transId": uuid.uuid4().hex,
+                    "transactionSrc": "ShipVox"
+                },
+                timeout=30.0
+            )
+            response.raise_for_status()
+            options = self._parse_rate_response(response.json())
+        except httpx.HTTPStatusError as e:
+            raise RateError(f"Failed to get UPS rates: {self._error_message(e.response)}")
+        except httpx.HTTPError as e:
             raise RateError(f"Failed to get UPS rates: {str(e)}")
+        except ValueError as e:
+            raise RateError(f"Error parsing UPS response: {str(e)}")
+
+        print(f"UPSRateEngine: Got {len(options)} rate options")
+        return options
 
     def _get_mock_rates(self, request: RateRequest) -> List[RateOption]:
         """Return mock rates for testing"""
@@ -56,7 +100,7 @@ class UPSRateEngine(BaseRateEngine):
         # This is just for testing purposes
         base_rate = 12.0  # UPS is slightly more expensive in our mock
         try:
-            weight_factor = request.weight * 0.6
+            weight_factor = request.total_weight * 0.6
         except (TypeError, AttributeError):
             # Default if there's an issue with the weight
             weight_factor = 3.0  # Default for a 5 lb package
@@ -79,94 +123,190 @@ class UPSRateEngine(BaseRateEngine):
             RateOption(
                 carrier='ups',
                 service_name='UPS Ground',
-                service_tier=ServiceTier.GROUND,
+                service_tier=ServiceTier.GROUND_EOD,
                 cost=base_rate + weight_factor + distance_factor,
                 estimated_delivery=delivery_date,
-                transit_days=3
+                transit_days=3,
+                service_code='03'
             ),
             RateOption(
                 carrier='ups',
                 service_name='UPS 3 Day Select',
-                service_tier=ServiceTier.SAVER,
+                service_tier=ServiceTier.DAY3_EOD,
                 cost=(base_rate + weight_factor + distance_factor) * 1.3,
                 estimated_delivery=delivery_date - timedelta(days=1),
-                transit_days=2
+                transit_days=2,
+                service_code='12'
             ),
             RateOption(
                 carrier='ups',
                 service_name='UPS Next Day Air',
-                service_tier=ServiceTier.OVERNIGHT,
+                service_tier=ServiceTier.DAY1_NOON,
                 cost=(base_rate + weight_factor + distance_factor) * 2.7,
                 estimated_delivery=overnight_date,
-                transit_days=1
+                transit_days=1,
+                service_code='01'
             )
         ]
 
     def _prepare_rate_request(self, request: RateRequest) -> dict:
-        """Prepare UPS-specific rate request payload"""
-        return {
-            "Request": {
-                "RequestOption": "Shop",
-                "TransactionReference": {
-                    "CustomerContext": "Rate Request"
+        """Prepare the UPS Shop (time in transit) request payload"""
+        shipper = {
+            "Address": {
+                "PostalCode": request.origin_zip,
+                "CountryCode": "US"
+            }
+        }
+        if self._account_number:
+            # Returns the account's negotiated rates as well as published ones
+            shipper["ShipperNumber"] = self._account_number
+
+        packages = []
+        for package in request.get_packages():
+            ups_package = {
+                "PackagingType": {
+                    "Code": "02"  # Customer Supplied Package
+                },
+                "PackageWeight": {
+                    "UnitOfMeasurement": {
+                        "Code": "LBS"
+                    },
+                    "Weight": str(package.weight)
+                }
+            }
+            if package.dimensions:
+                ups_package["Dimensions"] = {
+                    "UnitOfMeasurement": {
+                        "Code": "IN"
+                    },
+                    "Length": str(package.dimensions.length),
+                    "Width": str(package.dimensions.width),
+                    "Height": str(package.dimensions.height)
+                }
+            packages.append(ups_package)
+
+        shipment = {
+            "Shipper": shipper,
+            "ShipTo": {
+                "Address": {
+                    "PostalCode": request.destination_zip,
+                    "CountryCode": "US"
                 }
             },
-            "Shipment": {
-                "Shipper": {
-                    "Address": {
-                        "PostalCode": request.origin_zip,
-                        "CountryCode": "US"
-                    }
-                },
-                "ShipTo": {
-                    "Address": {
-                        "PostalCode": request.destination_zip,
-                        "CountryCode": "US"
-                    }
+            "ShipFrom": {
+                "Address": {
+                    "PostalCode": request.origin_zip,
+                    "CountryCode": "US"
+                }
+            },
+            "NumOfPieces": str(len(packages)),
+            # Required for time in transit
+            "ShipmentTotalWeight": {
+                "UnitOfMeasurement": {
+                    "Code": "LBS"
                 },
-                "ShipFrom": {
-                    "Address": {
-                        "PostalCode": request.origin_zip,
-                        "CountryCode": "US"
+                "Weight": str(request.total_weight)
+            },
+            "DeliveryTimeInformation": {
+                "PackageBillType": "03",  # Non-Document
+                "Pickup": {
+                    "Date": datetime.now().strftime("%Y%m%d")
+                }
+            },
+            "Package": packages
+        }
+        if self._account_number:
+            shipment["ShipmentRatingOptions"] = {"NegotiatedRatesIndicator": "Y"}
+
+        return {
+            "RateRequest": {
+                "Request": {
+                    "RequestOption": "Shoptimeintransit",
+                    "TransactionReference": {
+                        "CustomerContext": "Rate Request"
                     }
                 },
-                "Package": {
-                    "PackagingType": {
-                        "Code": "02"  # Customer Supplied Package
-                    },
-                    "PackageWeight": {
-                        "UnitOfMeasurement": {
-                            "Code": "LBS"
-                        },
-                        "Weight": str(request.weight)
-                    }
-                }
+                "Shipment": shipment
             }
         }
 
     def _parse_rate_response(self, response: dict) -> List[RateOption]:
-        """Parse UPS rate response into RateOption objects"""
-        options = []
+        """
+        Parse UPS rate response into RateOption objects.
 
-        for service in response.get('RateResponse', {}).get('RatedShipment', []):
-            service_code = service.get('Service', {}).get('Code')
-            if not service_code:
-                continue
+        Services we don't ship with (international, freight) and entries
+        without a usable charge are skipped rather than failing the whole
+        response.
+        """
+        rated_shipments = response.get('RateResponse', {}).get('RatedShipment', [])
+        # Older API versions return a single service as an object
+        if isinstance(rated_shipments, dict):
+            rated_shipments = [rated_shipments]
 
-            # Calculate estimated delivery
-            transit_days = int(service.get('GuaranteedDaysToDelivery', 1))
-            estimated_delivery = datetime.now() + timedelta(days=transit_days)
+        options = []
+        for service in rated_shipments:
+            service_code = (service.get('Service') or {}).get('Code')
+            service_tier = self._normalizer.find_service('ups', service_code)
+            if not service_tier:
+                print(f"UPSRateEngine: Skipping unsupported service {service_code}")
+                continue
 
-            # Get service tier
-            service_tier = self._normalizer.normalize_service('ups', service_code)
+            # Negotiated account rates take precedence over published ones
+            cost = _money((service.get('NegotiatedRateCharges') or {}).get('TotalCharge')) or \
+                _money(service.get('TotalCharges'))
+            if cost is None or cost <= 0:
+                print(f"UPSRateEngine: Skipping service {service_code} without a charge")
+                continue
 
+            transit_days, estimated_delivery = self._delivery_estimate(service, service_tier)
             options.append(RateOption(
                 carrier='ups',
-                service_name=service.get('Service', {}).get('Description', ''),
+                service_name=(service.get('Service') or {}).get('Description') or UPS_SERVICE_NAMES[service_code],
                 service_tier=service_tier,
-                cost=float(service.get('TotalCharges', {}).get('MonetaryValue', 0)),
+                cost=cost,
                 estimated_delivery=estimated_delivery,
-                transit_days=transit_days
+                transit_days=transit_days,
+                service_code=service_code
             ))
 
         return options
+
+    def _delivery_estimate(self, service: dict, service_tier: ServiceTier):
+        """Transit days and delivery date from time in transit, the guarantee, or the tier"""
+        estimated_arrival = (((service.get('TimeInTransit') or {}).get('ServiceSummary') or {}).get('EstimatedArrival') or {})
+        guaranteed = service.get('GuaranteedDelivery') or {}
+        transit_days = _positive_int(estimated_arrival.get('BusinessDaysInTransit')) or \
+            _positive_int(guaranteed.get('BusinessDaysInTransit')) or \
+            DEFAULT_TRANSIT_DAYS[service_tier]
+
+        arrival = estimated_arrival.get('Arrival') or {}
+        estimated_delivery = _parse_date(arrival.get('Date'), arrival.get('Time'))
+        return transit_days, estimated_delivery or datetime.now() + timedelta(days=transit_days)
+
+    def _error_message(self, response: httpx.Response) -> str:
+        """UPS's own error message for a failed call, if it sent one"""
+        try:
+            errors = response.json()['response']['errors']
+            return "; ".join(f"{error.get('code')}: {error.get('message')}" for error in errors)
+        except Exception:
+            return f"HTTP {response.status_code}"
+
+def _money(charge: Optional[dict]) -> Optional[float]:
+    try:
+        return float(charge['MonetaryValue'])
+    except (TypeError, KeyError, ValueError):
+        return None
+
+def _positive_int(value) -> Optional[int]:
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value >= 1 else None
+
+def _parse_date(date: Optional[str], time: Optional[str]) -> Optional[datetime]:
+    """UPS YYYYMMDD date and optional HHMMSS time"""
+    try:
+        return datetime.strptime(f"{date}{(time or '000000')[:6].ljust(6, '0')}", "%Y%m%d%H%M%S")
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,210 @@
+# End of Day
+# FedEx Ground close and consolidated manifest from the shipment store
+
+import asyncio
+import csv
+import io
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from labels.label_storage import extension_for_doc_type, get_label_storage
+from models.close import CloseResult, EndOfDayReport
+from models.shipment import ShipmentRecord
+from pickup.fedex_pickup import GROUND_SERVICES
+from shipments.fedex_close import FedExCloseEngine
+from shipments.shipment_store import get_shipment_store
+
+MANIFEST_COLUMNS = (
+    "account_number", "tracking_number", "ship_date", "service_type", "recipient_name",
+    "recipient_city", "recipient_state", "recipient_zip", "package_count", "total_weight"
+)
+
+def _replayed(close: CloseResult) -> CloseResult:
+    if hasattr(close, 'model_copy'):
+        return close.model_copy(update={"replayed": True})
+    return close.copy(update={"replayed": True})
+
+class EndOfDayCloser:
+    """
+    Closes the day's open FedEx Ground shipments, one carrier call per account.
+
+    Open shipments (not closed, shipped on or before the close date) are
+    read from the shipment store and grouped by account; each account is
+    closed with a single FedEx Ground close call, concurrently. The close is
+    recorded before its shipments are marked closed, so rerunning after a
+    completed close, or after a failure between the two steps, returns the
+    recorded result without calling FedEx again. Shipments created after a
+    close are picked up by the next run.
+
+    Every run writes one consolidated CSV manifest of all shipments closed
+    for the date, across accounts. Its content is deterministic, so reruns
+    produce the same (content-addressed) file.
+    """
+
+    def __init__(self, store=None, engine=None, storage=None):
+        self._store = store or get_shipment_store()
+        self._engine = engine or FedExCloseEngine()
+        self._storage = storage or get_label_storage()
+        self._default_account = os.getenv('FEDEX_ACCOUNT_NUMBER', '740561073')
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def close(self, close_date: Optional[date] = None) -> EndOfDayReport:
+        """
+        Close every account's open Ground shipments for a day.
+
+        Args:
+            close_date: Ship date to close, defaults to today
+
+        Returns:
+            EndOfDayReport with one CloseResult per account, errors by
+            account and the consolidated manifest URL
+        """
+        close_date = close_date or date.today()
+        async with self._lock:
+            open_shipments = await self._store.find(
+                carrier="fedex",
+                service_types=sorted(GROUND_SERVICES),
+                ship_date_to=close_date,
+                open_only=True,
+                limit=None
+            )
+            by_account: Dict[str, List[ShipmentRecord]] = defaultdict(list)
+            for shipment in open_shipments:
+                by_account[shipment.account_number or self._default_account].append(shipment)
+
+            accounts = sorted(by_account)
+            results = await asyncio.gather(
+                *[self._close_account(account, close_date, by_account[account]) for account in accounts],
+                return_exceptions=True
+            )
+
+            report = EndOfDayReport(close_date=close_date)
+            for account, result in zip(accounts, results):
+                if isinstance(result, Exception):
+                    print(f"EndOfDayCloser: Closing account {account} failed: {str(result)}")
+                    report.errors[account] = str(result)
+                else:
+                    report.closes.append(result)
+
+            # Accounts closed by an earlier run with nothing new since
+            for close in await self._store.list_closes("fedex", close_date):
+                if close.account_number not in by_account:
+                    report.closes.append(_replayed(close))
+
+            report.manifest_url = await self._write_manifest(close_date, report.closes)
+            return report
+
+    def start_daily(self, close_time: str) -> None:
+        """Run close() every day at a local HH:MM"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run_daily(close_time))
+
+    async def shutdown(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _close_account(self, account_number: str, close_date: date, shipments: List[ShipmentRecord]) -> CloseResult:
+        tracking_numbers = sorted(shipment.tracking_number for shipment in shipments)
+        existing = await self._store.get_close("fedex", account_number, close_date)
+
+        if existing and set(tracking_numbers) <= set(existing.tracking_numbers):
+            # Closed with FedEx already, only marking the shipments was interrupted
+            await self._store.mark_closed(tracking_numbers, existing.closed_at)
+            return _replayed(existing)
+
+        documents = await self._engine.close_ground(account_number, close_date)
+        closed_at = datetime.now()
+        document_urls = list(existing.document_urls) if existing else []
+        for index, document in enumerate(documents):
+            url = await self._save_document(account_number, close_date, index, document)
+            if url:
+                document_urls.append(url)
+
+        # A later close of the same day adds to the earlier one
+        closed = sorted(set(tracking_numbers) | set(existing.tracking_numbers if existing else []))
+        result = CloseResult(
+            carrier="fedex",
+            account_number=account_number,
+            close_date=close_date,
+            shipment_count=len(closed),
+            tracking_numbers=closed,
+            document_urls=document_urls,
+            closed_at=closed_at
+        )
+        await self._store.save_close(result)
+        await self._store.mark_closed(tracking_numbers, closed_at)
+        return result
+
+    async def _save_document(self, account_number: str, close_date: date, index: int, document: dict) -> Optional[str]:
+        if document.get("url"):
+            return document["url"]
+        encoded = document.get("encodedLabel") or document.get("content")
+        if not encoded:
+            return None
+        stored = await self._storage.save_base64(
+            encoded,
+            extension_for_doc_type(document.get("docType")),
+            tracking_number=f"close-{account_number}-{close_date.isoformat()}-{index}",
+            kind="manifest"
+        )
+        return stored.url
+
+    async def _write_manifest(self, close_date: date, closes: List[CloseResult]) -> Optional[str]:
+        tracking_numbers = sorted({number for close in closes for number in close.tracking_numbers})
+        if not tracking_numbers:
+            return None
+
+        shipments = await self._store.get_many(tracking_numbers)
+        shipments.sort(key=lambda shipment: (shipment.account_number or self._default_account, shipment.tracking_number))
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(MANIFEST_COLUMNS)
+        for shipment in shipments:
+            writer.writerow([
+                shipment.account_number or self._default_account,
+                shipment.tracking_number,
+                shipment.ship_date.isoformat(),
+                shipment.service_type,
+                shipment.recipient_name,
+                shipment.recipient_city,
+                shipment.recipient_state,
+                shipment.recipient_zip,
+                shipment.package_count,
+                f"{shipment.total_weight:.1f}"
+            ])
+
+        stored = await self._storage.save(
+            buffer.getvalue().encode("utf-8"),
+            "csv",
+            tracking_number=f"manifest-{close_date.isoformat()}",
+            kind="manifest"
+        )
+        return stored.url
+
+    async def _run_daily(self, close_time: str) -> None:
+        hour, minute = (int(part) for part in close_time.split(":"))
+        while True:
+            now = datetime.now()
+            next_run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if next_run <= now:
+                next_run += timedelta(days=1)
+            await asyncio.sleep((next_run - now).total_seconds())
+            try:
+                await self.close(next_run.date())
+            except Exception as e:
+                print(f"EndOfDayCloser: Daily close failed: {str(e)}")
+
+_closer: Optional[EndOfDayCloser] = None
+
+def get_end_of_day_closer() -> EndOfDayCloser:
+    """Get the process-wide end-of-day closer"""
+    global _closer
+    if _closer is None:
+        _closer = EndOfDayCloser()
+    return _closer
@@ -0,0 +1,73 @@
+# Fedex Close
+# FedEx Ground end-of-day close through the Ground Day-End Close API (/ship/v1/endofday/)
+
+import os
+import json
+import httpx
+from datetime import date
+from typing import List
+
+from auth.fedex_auth import FedExAuth
+from utils.http_client import get_http_client
+
+class FedExCloseEngine:
+    def __init__(self):
+        self._auth = FedExAuth()
+        self._base_url = os.environ.get('FEDEX_API_URL', 'https://apis-sandbox.fedex.com')
+        self._client = get_http_client()
+
+    async def close_ground(self, account_number: str, close_date: date) -> List[dict]:
+        """
+        Close every FedEx Ground shipment of an account for a day.
+
+        One call covers all of the account's open Ground shipments, however
+        many there are.
+
+        Args:
+            account_number: FedEx account the shipments were billed to
+            close_date: Ship date being closed
+
+        Returns:
+            Close documents returned by FedEx (e.g. the Ground manifest),
+            each with a docType and encodedLabel or url
+
+        Raises:
+            ValueError: If FedEx rejects the close or can't be reached
+        """
+        token = await self._auth.get_token()
+        close_request = {
+            "accountNumber": {
+                "value": account_number
+            },
+            "groundServiceCategory": "GROUND",
+            "closeReqType": "GCCLOSE",
+            "closeDate": close_date.isoformat()
+        }
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+            "X-locale": "en_US"
+        }
+
+        try:
+            response = await self._client.post(
+                f"{self._base_url}/ship/v1/endofday/",
+                headers=headers,
+                json=close_request,
+                timeout=60.0
+            )
+        except httpx.TimeoutException:
+            raise ValueError("FedEx Close API request timed out")
+        except httpx.RequestError as e:
+            raise ValueError(f"FedEx Close API request error: {str(e)}")
+
+        print(f"FedEx Close API Response Status: {response.status_code}")
+        if response.status_code != 200:
+            try:
+                error_message = json.dumps(response.json())
+            except Exception:
+                error_message = response.text or f"HTTP Error: {response.status_code}"
+            raise ValueError(f"FedEx Close API error: {error_message}")
+
+        output = response.json().get("output", {})
+        return output.get("closeDocuments") or output.get("documents") or []
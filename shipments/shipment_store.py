@@ -0,0 +1,482 @@
+# Shipment Store
+# Persistent, indexed record of every label we create
+
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from models.label_request import LabelRequest
+from models.label_response import LabelResponse
+from models.shipment import ShipmentRecord
+from models.close import CloseResult
+from models.pickup import PickupConfirmation
+
+COLUMNS = (
+    "tracking_number", "carrier", "service_type", "ship_date", "created_at", "shipper_zip",
+    "recipient_name", "recipient_company", "recipient_street", "recipient_city", "recipient_state",
+    "recipient_zip", "package_count", "total_weight", "label_json", "account_number", "pickup_json"
+)
+# closed_at is only written by the end-of-day close, so re-recording a shipment keeps it
+READ_COLUMNS = COLUMNS + ("closed_at",)
+
+# Columns covered by the full-text index
+SEARCH_COLUMNS = ("recipient_name", "recipient_company", "recipient_street", "recipient_city")
+
+def fts_query(text: str) -> Optional[str]:
+    """
+    Turn free text into an FTS5 query: every word must match, as a prefix.
+
+    "smith tampa" -> "smith"* "tampa"*; punctuation and FTS operators typed
+    by the user are dropped rather than interpreted.
+    """
+    words = re.findall(r"\w+", text.lower())
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+def shipment_record(
+    request: LabelRequest,
+    label: LabelResponse,
+    created_at: Optional[datetime] = None,
+    account_number: Optional[str] = None
+) -> ShipmentRecord:
+    """Summarize a label request and its response for the store"""
+    created_at = created_at or datetime.now()
+    packages = request.get_packages()
+    return ShipmentRecord(
+        tracking_number=label.tracking_number,
+        carrier=label.carrier,
+        service_type=request.service_type,
+        ship_date=created_at.date(),
+        created_at=created_at,
+        shipper_zip=request.shipper.zip_code,
+        recipient_name=request.recipient.name,
+        recipient_company=request.recipient.company,
+        recipient_street=request.recipient.street,
+        recipient_city=request.recipient.city,
+        recipient_state=request.recipient.state,
+        recipient_zip=request.recipient.zip_code[:5],
+        package_count=len(packages),
+        total_weight=sum(package.weight for package in packages),
+        label=label,
+        account_number=account_number,
+        pickup_address=request.shipper if request.pickup_requested else None
+    )
+
+class ShipmentStore:
+    """
+    SQLite store of created shipments.
+
+    Runs in WAL mode (SHIPMENT_DB_JOURNAL_MODE) so reads never wait on
+    writes, with indexes on tracking number, ship date, carrier and
+    recipient ZIP. All database work happens in worker threads.
+
+    Writes are group-committed: records queued by add() or record() within
+    SHIPMENT_STORE_FLUSH_SECONDS of each other (up to
+    SHIPMENT_STORE_BATCH_SIZE) are inserted in one transaction. Recording a
+    tracking number again replaces the earlier record.
+
+    An FTS5 index over recipient name, company, street and city is kept in
+    step with the table by triggers, so new labels are searchable as soon as
+    their batch commits.
+    """
+
+    def __init__(self, path: Optional[str] = None, batch_size: Optional[int] = None, flush_seconds: Optional[float] = None):
+        self._path = Path(path or os.getenv('SHIPMENT_DB_PATH', 'data/shipments.sqlite3'))
+        self._journal_mode = os.getenv('SHIPMENT_DB_JOURNAL_MODE', 'WAL')
+        self._batch_size = batch_size or int(os.getenv('SHIPMENT_STORE_BATCH_SIZE', '500'))
+        self._flush_seconds = flush_seconds if flush_seconds is not None else float(os.getenv('SHIPMENT_STORE_FLUSH_SECONDS', '0.05'))
+        self._pending: List[Tuple[ShipmentRecord, asyncio.Future]] = []
+        self._batch_ready: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._write_lock = threading.Lock()
+        self._writer: Optional[sqlite3.Connection] = None
+        self._readers = threading.local()
+        self._schema_ready = False
+
+    def add(self, request: LabelRequest, label: LabelResponse, account_number: Optional[str] = None) -> asyncio.Future:
+        """Queue a shipment for the next batch; the future resolves once it is committed"""
+        return self.add_record(shipment_record(request, label, account_number=account_number))
+
+    def add_record(self, record: ShipmentRecord) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((record, future))
+
+        if self._batch_ready is None:
+            self._batch_ready = asyncio.Event()
+        if len(self._pending) >= self._batch_size:
+            self._batch_ready.set()
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_soon())
+        return future
+
+    async def record(self, request: LabelRequest, label: LabelResponse) -> ShipmentRecord:
+        """Store a shipment and wait for it to be committed"""
+        record = shipment_record(request, label)
+        await self.add_record(record)
+        return record
+
+    async def record_many(self, records: List[ShipmentRecord]) -> None:
+        """Store many shipments, committed together in batches"""
+        if records:
+            await asyncio.gather(*[self.add_record(record) for record in records])
+
+    async def flush(self) -> None:
+        """Wait until everything queued so far is committed"""
+        if self._flusher is not None:
+            await asyncio.gather(self._flusher, return_exceptions=True)
+
+    async def get(self, tracking_number: str) -> Optional[ShipmentRecord]:
+        rows = await asyncio.to_thread(
+            self._query, f"SELECT {', '.join(READ_COLUMNS)} FROM shipments WHERE tracking_number = ?", (tracking_number,)
+        )
+        return self._to_record(rows[0]) if rows else None
+
+    async def get_many(self, tracking_numbers: List[str]) -> List[ShipmentRecord]:
+        """Shipments for a list of tracking numbers, in no particular order"""
+        records = []
+        for start in range(0, len(tracking_numbers), 500):
+            chunk = tracking_numbers[start:start + 500]
+            rows = await asyncio.to_thread(
+                self._query,
+                f"SELECT {', '.join(READ_COLUMNS)} FROM shipments WHERE tracking_number IN ({', '.join('?' for _ in chunk)})",
+                tuple(chunk)
+            )
+            records.extend(self._to_record(row) for row in rows)
+        return records
+
+    async def find(
+        self,
+        ship_date: Optional[date] = None,
+        carrier: Optional[str] = None,
+        recipient_zip: Optional[str] = None,
+        service_types: Optional[List[str]] = None,
+        ship_date_to: Optional[date] = None,
+        open_only: bool = False,
+        ship_date_from: Optional[date] = None,
+        limit: Optional[int] = 100,
+        offset: int = 0
+    ) -> List[ShipmentRecord]:
+        """
+        Shipments matching every given filter, newest first.
+
+        ship_date_from and ship_date_to select shipments from and up to
+        and including a date; open_only those not closed yet. A limit of None returns every match.
+        """
+        clauses, params = [], []
+        if ship_date:
+            clauses.append("ship_date = ?")
+            params.append(ship_date.isoformat())
+        if ship_date_from:
+            clauses.append("ship_date >= ?")
+            params.append(ship_date_from.isoformat())
+        if ship_date_to:
+            clauses.append("ship_date <= ?")
+            params.append(ship_date_to.isoformat())
+        if open_only:
+            clauses.append("closed_at IS NULL")
+        if carrier:
+            clauses.append("carrier = ?")
+            params.append(carrier)
+        if recipient_zip:
+            clauses.append("recipient_zip = ?")
+            params.append(recipient_zip[:5])
+        if service_types:
+            clauses.append(f"service_type IN ({', '.join('?' for _ in service_types)})")
+            params.extend(service_types)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = await asyncio.to_thread(
+            self._query,
+            f"SELECT {', '.join(READ_COLUMNS)} FROM shipments {where} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+            (*params, limit if limit is not None else -1, offset)
+        )
+        return [self._to_record(row) for row in rows]
+
+    async def search(
+        self,
+        text: str,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        carrier: Optional[str] = None,
+        limit: int = 20
+    ) -> List[ShipmentRecord]:
+        """
+        Full-text search over recipients, best matches first.
+
+        Args:
+            text: Free text, e.g. "smith tampa"; every word must match
+            date_from: Earliest ship date (inclusive)
+            date_to: Latest ship date (inclusive)
+            carrier: Only this carrier's shipments
+            limit: Maximum number of results
+
+        Returns:
+            Matching shipments ranked by relevance, then newest first
+        """
+        query = fts_query(text)
+        if not query:
+            return []
+        clauses, params = ["shipments_fts MATCH ?"], [query]
+        if date_from:
+            clauses.append("s.ship_date >= ?")
+            params.append(date_from.isoformat())
+        if date_to:
+            clauses.append("s.ship_date <= ?")
+            params.append(date_to.isoformat())
+        if carrier:
+            clauses.append("s.carrier = ?")
+            params.append(carrier)
+        rows = await asyncio.to_thread(
+            self._query,
+            f"SELECT {', '.join('s.' + column for column in READ_COLUMNS)} "
+            "FROM shipments_fts JOIN shipments s ON s.rowid = shipments_fts.rowid "
+            f"WHERE {' AND '.join(clauses)} "
+            "ORDER BY shipments_fts.rank, s.created_at DESC LIMIT ?",
+            (*params, limit)
+        )
+        return [self._to_record(row) for row in rows]
+
+    async def mark_closed(self, tracking_numbers: List[str], closed_at: datetime) -> None:
+        """Record that shipments were included in an end-of-day close"""
+        await asyncio.to_thread(self._mark_closed, tracking_numbers, closed_at)
+
+    async def get_close(self, carrier: str, account_number: str, close_date: date) -> Optional[CloseResult]:
+        rows = await asyncio.to_thread(
+            self._query,
+            "SELECT result_json FROM closes WHERE carrier = ? AND account_number = ? AND close_date = ?",
+            (carrier, account_number, close_date.isoformat())
+        )
+        return CloseResult(**json.loads(rows[0][0])) if rows else None
+
+    async def list_closes(self, carrier: str, close_date: date) -> List[CloseResult]:
+        """Every account's recorded close for a day"""
+        rows = await asyncio.to_thread(
+            self._query,
+            "SELECT result_json FROM closes WHERE carrier = ? AND close_date = ? ORDER BY account_number",
+            (carrier, close_date.isoformat())
+        )
+        return [CloseResult(**json.loads(row[0])) for row in rows]
+
+    async def save_close(self, close: CloseResult) -> None:
+        await asyncio.to_thread(self._save_close, close)
+
+    async def list_pickups(self, pickup_date: date) -> List[Tuple[Tuple[str, str, str], PickupConfirmation]]:
+        """Pickups booked for a day, keyed by (carrier, pickup group, location)"""
+        rows = await asyncio.to_thread(
+            self._query,
+            "SELECT carrier, pickup_group, location, confirmation_json FROM pickups WHERE pickup_date = ?",
+            (pickup_date.isoformat(),)
+        )
+        return [((carrier, group, location), PickupConfirmation(**json.loads(confirmation))) for carrier, group, location, confirmation in rows]
+
+    async def save_pickup(self, key: Tuple[str, str, str], confirmation: PickupConfirmation) -> None:
+        await asyncio.to_thread(self._save_pickup, key, confirmation)
+
+    async def _flush_soon(self) -> None:
+        while self._pending:
+            # Give concurrent writers a moment to join the batch
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), self._flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+
+            batch, self._pending = self._pending[:self._batch_size], self._pending[self._batch_size:]
+            if len(self._pending) >= self._batch_size:
+                self._batch_ready.set()
+            try:
+                await asyncio.to_thread(self._insert, [record for record, _ in batch])
+            except Exception as e:
+                print(f"ShipmentStore: Failed to store {len(batch)} shipment(s): {str(e)}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+
+    def _insert(self, records: List[ShipmentRecord]) -> None:
+        rows = [self._to_row(record) for record in records]
+        with self._write_lock:
+            db = self._connect_writer()
+            with db:
+                # Upsert rather than REPLACE so the FTS update trigger fires
+                db.executemany(
+                    f"INSERT INTO shipments ({', '.join(COLUMNS)}) VALUES ({', '.join('?' for _ in COLUMNS)}) "
+                    f"ON CONFLICT(tracking_number) DO UPDATE SET "
+                    f"{', '.join(f'{column} = excluded.{column}' for column in COLUMNS[1:])}",
+                    rows
+                )
+
+    def _mark_closed(self, tracking_numbers: List[str], closed_at: datetime) -> None:
+        with self._write_lock:
+            db = self._connect_writer()
+            with db:
+                db.executemany(
+                    "UPDATE shipments SET closed_at = ? WHERE tracking_number = ?",
+                    [(closed_at.isoformat(), tracking_number) for tracking_number in tracking_numbers]
+                )
+
+    def _save_close(self, close: CloseResult) -> None:
+        result_json = close.model_dump_json() if hasattr(close, 'model_dump_json') else close.json()
+        with self._write_lock:
+            db = self._connect_writer()
+            with db:
+                db.execute(
+                    "INSERT OR REPLACE INTO closes (carrier, account_number, close_date, result_json) VALUES (?, ?, ?, ?)",
+                    (close.carrier, close.account_number, close.close_date.isoformat(), result_json)
+                )
+
+    def _save_pickup(self, key: Tuple[str, str, str], confirmation: PickupConfirmation) -> None:
+        confirmation_json = confirmation.model_dump_json() if hasattr(confirmation, 'model_dump_json') else confirmation.json()
+        with self._write_lock:
+            db = self._connect_writer()
+            with db:
+                db.execute(
+                    "INSERT OR REPLACE INTO pickups (carrier, pickup_group, location, pickup_date, confirmation_json) VALUES (?, ?, ?, ?, ?)",
+                    (*key, confirmation.pickup_date.isoformat(), confirmation_json)
+                )
+
+    def _query(self, sql: str, params: tuple) -> List[tuple]:
+        return self._connect_reader().execute(sql, params).fetchall()
+
+    def _connect_writer(self) -> sqlite3.Connection:
+        """Open the write connection and create the schema (caller holds _write_lock)"""
+        if self._writer is None:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self._path), check_same_thread=False)
+            db.execute(f"PRAGMA journal_mode={self._journal_mode}")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS shipments (
+                    tracking_number TEXT PRIMARY KEY,
+                    carrier TEXT NOT NULL,
+                    service_type TEXT NOT NULL,
+                    ship_date TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    shipper_zip TEXT NOT NULL,
+                    recipient_name TEXT NOT NULL,
+                    recipient_company TEXT,
+                    recipient_street TEXT NOT NULL,
+                    recipient_city TEXT NOT NULL,
+                    recipient_state TEXT NOT NULL,
+                    recipient_zip TEXT NOT NULL,
+                    package_count INTEGER NOT NULL,
+                    total_weight REAL NOT NULL,
+                    label_json TEXT NOT NULL,
+                    account_number TEXT,
+                    pickup_json TEXT,
+                    closed_at TEXT
+                );
+                CREATE TABLE IF NOT EXISTS closes (
+                    carrier TEXT NOT NULL,
+                    account_number TEXT NOT NULL,
+                    close_date TEXT NOT NULL,
+                    result_json TEXT NOT NULL,
+                    PRIMARY KEY (carrier, account_number, close_date)
+                );
+                CREATE TABLE IF NOT EXISTS pickups (
+                    carrier TEXT NOT NULL,
+                    pickup_group TEXT NOT NULL,
+                    location TEXT NOT NULL,
+                    pickup_date TEXT NOT NULL,
+                    confirmation_json TEXT NOT NULL,
+                    PRIMARY KEY (pickup_date, carrier, pickup_group, location)
+                );
+                CREATE INDEX IF NOT EXISTS idx_shipments_date ON shipments (ship_date);
+                CREATE INDEX IF NOT EXISTS idx_shipments_carrier_date ON shipments (carrier, ship_date);
+                CREATE INDEX IF NOT EXISTS idx_shipments_recipient_zip ON shipments (recipient_zip);
+                CREATE INDEX IF NOT EXISTS idx_shipments_created ON shipments (created_at);
+            """)
+            self._add_missing_columns(db)
+            self._create_search_index(db)
+            self._writer = db
+            self._schema_ready = True
+        return self._writer
+
+    @staticmethod
+    def _add_missing_columns(db: sqlite3.Connection) -> None:
+        """Upgrade databases created before account, close and pickup tracking"""
+        existing = {row[1] for row in db.execute("PRAGMA table_info(shipments)")}
+        with db:
+            for column in ("account_number", "closed_at", "pickup_json"):
+                if column not in existing:
+                    db.execute(f"ALTER TABLE shipments ADD COLUMN {column} TEXT")
+        db.execute("CREATE INDEX IF NOT EXISTS idx_shipments_open ON shipments (carrier, account_number, closed_at, ship_date)")
+
+    @staticmethod
+    def _create_search_index(db: sqlite3.Connection) -> None:
+        """External-content FTS5 table over the searchable columns, maintained by triggers"""
+        exists = db.execute("SELECT 1 FROM sqlite_master WHERE name = 'shipments_fts'").fetchone()
+        columns = ", ".join(SEARCH_COLUMNS)
+        new_values = ", ".join(f"new.{column}" for column in SEARCH_COLUMNS)
+        old_values = ", ".join(f"old.{column}" for column in SEARCH_COLUMNS)
+        db.executescript(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS shipments_fts USING fts5(
+                {columns}, content='shipments', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+            );
+            CREATE TRIGGER IF NOT EXISTS shipments_fts_insert AFTER INSERT ON shipments BEGIN
+                INSERT INTO shipments_fts (rowid, {columns}) VALUES (new.rowid, {new_values});
+            END;
+            CREATE TRIGGER IF NOT EXISTS shipments_fts_delete AFTER DELETE ON shipments BEGIN
+                INSERT INTO shipments_fts (shipments_fts, rowid, {columns}) VALUES ('delete', old.rowid, {old_values});
+            END;
+            CREATE TRIGGER IF NOT EXISTS shipments_fts_update AFTER UPDATE ON shipments BEGIN
+                INSERT INTO shipments_fts (shipments_fts, rowid, {columns}) VALUES ('delete', old.rowid, {old_values});
+                INSERT INTO shipments_fts (rowid, {columns}) VALUES (new.rowid, {new_values});
+            END;
+        """)
+        if not exists:
+            # Index shipments stored before search existed
+            with db:
+                db.execute("INSERT INTO shipments_fts (shipments_fts) VALUES ('rebuild')")
+
+    def _connect_reader(self) -> sqlite3.Connection:
+        """Per-thread read connection; under WAL readers don't block the writer"""
+        if not self._schema_ready:
+            with self._write_lock:
+                self._connect_writer()
+        db = getattr(self._readers, "db", None)
+        if db is None:
+            db = sqlite3.connect(str(self._path), check_same_thread=False)
+            self._readers.db = db
+        return db
+
+    @staticmethod
+    def _to_row(record: ShipmentRecord) -> tuple:
+        label_json = record.label.model_dump_json() if hasattr(record.label, 'model_dump_json') else record.label.json()
+        pickup_json = None
+        if record.pickup_address:
+            address = record.pickup_address
+            pickup_json = address.model_dump_json() if hasattr(address, 'model_dump_json') else address.json()
+        return (
+            record.tracking_number, record.carrier, record.service_type, record.ship_date.isoformat(),
+            record.created_at.isoformat(), record.shipper_zip, record.recipient_name, record.recipient_company,
+            record.recipient_street, record.recipient_city, record.recipient_state, record.recipient_zip,
+            record.package_count, record.total_weight, label_json, record.account_number, pickup_json
+        )
+
+    @staticmethod
+    def _to_record(row: tuple) -> ShipmentRecord:
+        values = dict(zip(READ_COLUMNS, row))
+        values["label"] = json.loads(values.pop("label_json"))
+        pickup_json = values.pop("pickup_json")
+        values["pickup_address"] = json.loads(pickup_json) if pickup_json else None
+        return ShipmentRecord(**values)
+
+_shipment_store: Optional[ShipmentStore] = None
+
+def get_shipment_store() -> ShipmentStore:
+    """Get the process-wide shipment store"""
+    global _shipment_store
+    if _shipment_store is None:
+        _shipment_store = ShipmentStore()
+    return _shipment_store
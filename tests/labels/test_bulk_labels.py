@@ -0,0 +1,115 @@
+import asyncio
+import pytest
+from labels.bulk_labels import BulkLabelProcessor
+from models.bulk_label import BulkLabelRequest
+from models.label_request import LabelRequest
+from models.label_response import LabelResponse
+
+def _request(weight=5.0):
+    address = {
+        "name": "Shipper Name",
+        "street": "123 Shipper Street",
+        "city": "Memphis",
+        "state": "TN",
+        "zip_code": "38117"
+    }
+    return LabelRequest(
+        carrier="fedex",
+        shipper=address,
+        recipient={**address, "zip_code": "30339"},
+        package={"weight": weight},
+        service_type="FEDEX_GROUND"
+    )
+
+class FakeEngine:
+    account_number = "740561073"
+
+class FakeCreator:
+    """Label creator that tracks how many labels are in flight"""
+    def __init__(self):
+        self.engines = {"fedex": FakeEngine()}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create_label(self, request):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            # Heavier packages take longer so completion order differs from input order
+            await asyncio.sleep(request.package.weight / 1000)
+            if request.package.weight == 13:
+                raise ValueError("FedEx API error: invalid package")
+            return LabelResponse(
+                tracking_number=f"TRK{int(request.package.weight)}",
+                label_url="/static/labels/test.pdf",
+                carrier="fedex",
+                estimated_delivery=None
+            )
+        finally:
+            self.in_flight -= 1
+
+@pytest.mark.asyncio
+async def test_bulk_respects_account_concurrency():
+    """Test labels for one account never exceed the concurrency limit"""
+    creator = FakeCreator()
+    processor = BulkLabelProcessor(creator, max_concurrency=3)
+
+    results = [result async for result in processor.stream([_request(w) for w in range(1, 21)])]
+
+    assert len(results) == 20
+    assert creator.max_in_flight == 3
+    assert sorted(result.index for result in results) == list(range(20))
+
+@pytest.mark.asyncio
+async def test_bulk_reports_per_item_errors():
+    """Test one failed label doesn't fail the batch"""
+    processor = BulkLabelProcessor(FakeCreator(), max_concurrency=4)
+
+    results = {result.index: result async for result in processor.stream([_request(w) for w in (20, 13, 1)])}
+
+    assert results[1].error == "FedEx API error: invalid package"
+    assert results[1].label is None
+    assert results[0].label.tracking_number == "TRK20"
+    assert results[2].label.tracking_number == "TRK1"
+
+@pytest.mark.asyncio
+async def test_bulk_streams_in_completion_order():
+    """Test faster labels are yielded first"""
+    processor = BulkLabelProcessor(FakeCreator(), max_concurrency=4)
+
+    order = [result.index async for result in processor.stream([_request(w) for w in (30, 1)])]
+
+    assert order == [1, 0]
+
+def test_bulk_request_validation():
+    """Test empty batches are rejected up front"""
+    with pytest.raises(ValueError):
+        BulkLabelRequest(labels=[])
+
+@pytest.mark.asyncio
+async def test_submitted_labels_finish_after_disconnect():
+    """Test a disconnect drops queued labels but lets submitted ones finish"""
+    class RecordingCreator(FakeCreator):
+        def __init__(self):
+            super().__init__()
+            self.started = []
+            self.finished = []
+
+        async def create_label(self, request):
+            self.started.append(request.package.weight)
+            label = await super().create_label(request)
+            self.finished.append(request.package.weight)
+            return label
+
+    creator = RecordingCreator()
+    processor = BulkLabelProcessor(creator, max_concurrency=2)
+    stream = processor.stream([_request(w) for w in (1, 40, 50, 60, 70)])
+
+    first = await stream.__anext__()
+    await stream.aclose()
+    await processor.flush()
+
+    assert first.index == 0
+    # 40 and 50 were at the carrier when the client left; 60 and 70 never went
+    assert sorted(creator.finished) == [1, 40, 50]
+    assert 60 not in creator.started and 70 not in creator.started
@@ -0,0 +1,83 @@
+import base64
+import pytest
+from pathlib import Path
+from labels.fedex_ship import FedExShipEngine
+from labels.label_storage import LabelStorage
+from models.label_request import LabelRequest
+
+ADDRESS = {
+    "name": "Shipper Name",
+    "street": "123 Shipper Street",
+    "city": "Memphis",
+    "state": "TN",
+    "zip_code": "38117"
+}
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = FedExShipEngine()
+    engine._storage = LabelStorage(root=str(tmp_path / "labels"), index_path=str(tmp_path / "index.sqlite3"))
+    return engine
+
+def _request(**kwargs):
+    return LabelRequest(
+        carrier="fedex",
+        shipper=ADDRESS,
+        recipient={**ADDRESS, "zip_code": "30339"},
+        service_type="FEDEX_GROUND",
+        **kwargs
+    )
+
+def test_single_package_request(engine):
+    """Test a single package still produces one line item"""
+    ship_request = engine._prepare_ship_request(_request(package={"weight": 5.0}))
+    shipment = ship_request["requestedShipment"]
+
+    assert shipment["totalPackageCount"] == 1
+    assert shipment["requestedPackageLineItems"] == [{
+        "sequenceNumber": 1,
+        "weight": {"value": 5.0, "units": "LB"},
+        "groupPackageCount": 1
+    }]
+
+def test_multi_piece_request(engine):
+    """Test several packages go out as one multi-piece shipment"""
+    ship_request = engine._prepare_ship_request(_request(packages=[
+        {"weight": 5.0, "dimensions": {"length": 10, "width": 8, "height": 6}},
+        {"weight": 7.0},
+        {"weight": 3.0}
+    ]))
+    shipment = ship_request["requestedShipment"]
+
+    assert shipment["totalPackageCount"] == 3
+    assert shipment["totalWeight"] == 15.0
+    assert [item["sequenceNumber"] for item in shipment["requestedPackageLineItems"]] == [1, 2, 3]
+    assert shipment["requestedPackageLineItems"][0]["dimensions"]["units"] == "IN"
+    assert "dimensions" not in shipment["requestedPackageLineItems"][1]
+
+def test_package_required():
+    """Test a request needs at least one package"""
+    with pytest.raises(ValueError):
+        _request()
+
+@pytest.mark.asyncio
+async def test_extract_all_piece_labels(engine):
+    """Test every piece's encoded label is saved"""
+    response_data = {"output": {"transactionShipments": [{
+        "masterTrackingNumber": "794870153269",
+        "pieceResponses": [
+            {"trackingNumber": "794870153269", "packageDocuments": [
+                {"docType": "PDF", "encodedLabel": base64.b64encode(b"label one").decode()}
+            ]},
+            {"trackingNumber": "794870153270", "packageDocuments": [
+                {"docType": "PDF", "encodedLabel": base64.b64encode(b"label two").decode()}
+            ]}
+        ]
+    }]}}
+
+    label_data = await engine._extract_label_data(response_data)
+
+    assert [piece["tracking_number"] for piece in label_data["pieces"]] == ["794870153269", "794870153270"]
+    assert label_data["url"] == label_data["pieces"][0]["url"]
+    stored = await engine._storage.lookup("794870153270")
+    assert Path(stored.path).read_bytes() == b"label two"
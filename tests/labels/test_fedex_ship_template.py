@@ -0,0 +1,48 @@
+from labels.fedex_ship import FedExShipEngine
+from models.label_request import LabelRequest
+
+ADDRESS = {
+    "name": "Shipper Name",
+    "street": "123 Shipper Street",
+    "city": "Memphis",
+    "state": "TN",
+    "zip_code": "38117"
+}
+
+def _request(**kwargs):
+    return LabelRequest(
+        carrier="fedex",
+        shipper=ADDRESS,
+        recipient={**ADDRESS, "zip_code": "30339"},
+        service_type="FEDEX_GROUND",
+        **kwargs
+    )
+
+def test_ship_request_from_template():
+    """Test the payload carries the shipment's variable fields and its special services"""
+    ship_request = FedExShipEngine()._prepare_ship_request(_request(
+        packages=[{"weight": 5.0, "dimensions": {"length": 12, "width": 10, "height": 8}}, {"weight": 2.5}],
+        special_services={"signature_option": "ADULT", "saturday_delivery": True, "dry_ice": True, "residential_delivery": True}
+    ))
+
+    shipment = ship_request["requestedShipment"]
+    assert ship_request["accountNumber"] == {"value": "740561073"}
+    assert shipment["serviceType"] == "FEDEX_GROUND"
+    assert shipment["recipients"][0]["address"]["residential"] is True
+    assert "residential" not in shipment["shipper"]["address"]
+    assert shipment["recipients"][0]["contact"] == {"personName": "Shipper Name", "companyName": "Shipper Name", "phoneNumber": "5555555555"}
+    assert shipment["totalWeight"] == 7.5
+    assert shipment["requestedPackageLineItems"][0]["dimensions"] == {"length": 12.0, "width": 10.0, "height": 8.0, "units": "IN"}
+    assert "dimensions" not in shipment["requestedPackageLineItems"][1]
+    assert shipment["specialServicesRequested"] == {"specialServiceTypes": ["SATURDAY_DELIVERY", "DRY_ICE"], "signatureOptionType": "ADULT"}
+
+def test_template_shared_between_labels():
+    """Test labels for the same service share the static parts but not the shipment"""
+    engine = FedExShipEngine()
+    first = engine._prepare_ship_request(_request(package={"weight": 1.0}, special_services={"residential_delivery": True}))
+    second = engine._prepare_ship_request(_request(package={"weight": 2.0}, special_services={}))
+
+    assert first["requestedShipment"]["labelSpecification"] is second["requestedShipment"]["labelSpecification"]
+    assert "residential" not in second["requestedShipment"]["recipients"][0]["address"]
+    assert "specialServicesRequested" not in second["requestedShipment"]
+    assert second["requestedShipment"]["requestedPackageLineItems"][0]["weight"] == {"value": 2.0, "units": "LB"}
@@ -0,0 +1,146 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.routes import labels as label_routes
+from labels.idempotency import IdempotencyStore
+from models.label_request import LabelRequest
+from models.label_response import LabelResponse, SubmittedLabel
+from utils.exceptions import IdempotencyError
+
+def _label(tracking_number="794870153269"):
+    return LabelResponse(
+        tracking_number=tracking_number,
+        label_url=f"/static/labels/{tracking_number}.pdf",
+        carrier="fedex",
+        estimated_delivery=None
+    )
+
+@pytest.mark.asyncio
+async def test_repeat_returns_stored_response():
+    """Test a retried key doesn't create a second label"""
+    store = IdempotencyStore()
+    calls = []
+
+    async def create():
+        calls.append(1)
+        return _label()
+
+    first, replayed_first = await store.run("key-1", "fp", create)
+    second, replayed_second = await store.run("key-1", "fp", create)
+
+    assert len(calls) == 1
+    assert not replayed_first
+    assert replayed_second
+    assert second.tracking_number == first.tracking_number
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicate_waits_for_in_flight_call():
+    """Test a duplicate arriving mid-flight waits instead of calling the carrier"""
+    store = IdempotencyStore()
+    release = asyncio.Event()
+    calls = []
+
+    async def create():
+        calls.append(1)
+        await release.wait()
+        return _label()
+
+    tasks = [asyncio.create_task(store.run("key-1", "fp", create)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks)
+
+    assert len(calls) == 1
+    assert sorted(replayed for _, replayed in results) == [False, True, True]
+
+@pytest.mark.asyncio
+async def test_disconnected_first_request_still_completes():
+    """Test a duplicate gets the label when the first client disconnects mid-call"""
+    store = IdempotencyStore()
+    release = asyncio.Event()
+    calls = []
+
+    async def create():
+        calls.append(1)
+        await release.wait()
+        return _label()
+
+    first = asyncio.create_task(store.run("key-1", "fp", create))
+    await asyncio.sleep(0)
+    duplicate = asyncio.create_task(store.run("key-1", "fp", create))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+    label, replayed = await asyncio.wait_for(duplicate, timeout=1)
+
+    assert len(calls) == 1
+    assert replayed and label.tracking_number == _label().tracking_number
+    assert (await store.run("key-1", "fp", create))[1]
+
+@pytest.mark.asyncio
+async def test_failed_call_can_be_retried():
+    """Test failures are not stored"""
+    store = IdempotencyStore()
+
+    async def fail():
+        raise ValueError("FedEx API request timed out")
+
+    with pytest.raises(ValueError):
+        await store.run("key-1", "fp", fail)
+
+    async def succeed():
+        return _label()
+
+    label, replayed = await store.run("key-1", "fp", succeed)
+    assert not replayed
+
+@pytest.mark.asyncio
+async def test_retry_after_post_billing_failure_finishes_same_shipment():
+    """Test a failure after the carrier call doesn't let the retry bill a second shipment"""
+    address = {"name": "Jane Doe", "street": "1 Main St", "city": "Atlanta", "state": "GA", "zip_code": "30339"}
+    request = LabelRequest(
+        carrier="fedex", shipper=address, recipient=address, package={"weight": 5.0}, service_type="FEDEX_GROUND"
+    )
+    submitted = SubmittedLabel(carrier="fedex", tracking_number="794870153269")
+    submit = AsyncMock(return_value=submitted)
+    finish = AsyncMock(side_effect=[RuntimeError("Label 794870153269 was created but could not be recorded"), _label()])
+
+    with patch.object(label_routes, "idempotency_store", IdempotencyStore()), \
+         patch.object(label_routes.label_creator, "submit_label", submit), \
+         patch.object(label_routes.label_creator, "finish_label", finish):
+        create = lambda: label_routes._create_once("key-1", request)
+        with pytest.raises(RuntimeError):
+            await label_routes.idempotency_store.run("key-1", "fp", create)
+        with pytest.raises(IdempotencyError):
+            await label_routes.idempotency_store.run("key-1", "fp-other", create)
+        label, replayed = await label_routes.idempotency_store.run("key-1", "fp", create)
+
+    assert submit.await_count == 1
+    assert finish.await_args_list[1].args[1] == submitted
+    assert label.tracking_number == "794870153269"
+    assert not replayed
+
+@pytest.mark.asyncio
+async def test_key_reused_for_different_request():
+    """Test a key can't be reused with a different body"""
+    store = IdempotencyStore()
+
+    async def create():
+        return _label()
+
+    await store.run("key-1", "fp-a", create)
+    with pytest.raises(IdempotencyError):
+        await store.run("key-1", "fp-b", create)
+
+@pytest.mark.asyncio
+async def test_keys_expire():
+    """Test expired keys create a new label"""
+    store = IdempotencyStore(ttl_seconds=0.01)
+
+    async def create():
+        return _label()
+
+    await store.run("key-1", "fp", create)
+    await asyncio.sleep(0.02)
+    _, replayed = await store.run("key-1", "fp", create)
+    assert not replayed
@@ -0,0 +1,70 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from labels.label_creator import LabelCreator
+from labels.label_prefetch import LabelPrefetcher
+from labels.label_storage import LabelStorage
+from labels.qr_cache import QRCodeCache
+from labels.qr_generator import render_qr_code
+from models.label_request import LabelRequest
+from models.label_response import LabelResponse, SubmittedLabel
+from shipments.shipment_store import ShipmentStore
+
+ADDRESS = {"name": "Shipper", "street": "123 Shipper Street", "city": "Memphis", "state": "TN", "zip_code": "38117"}
+
+class FakeEngine:
+    async def build_label_response(self, request, submitted):
+        return LabelResponse(
+            tracking_number=submitted.tracking_number,
+            label_url="https://example.com/label.pdf",
+            carrier="fedex",
+            estimated_delivery=None,
+            native_qr_code_base64="native"
+        )
+
+@pytest.mark.asyncio
+async def test_failed_shipment_record_surfaces():
+    """Test a label whose store write fails is reported rather than silently left out of the close"""
+    creator = LabelCreator()
+    creator.engines["fedex"] = FakeEngine()
+    request = LabelRequest(carrier="fedex", shipper=ADDRESS, recipient=ADDRESS, package={"weight": 1.0}, service_type="FEDEX_GROUND")
+    failed = asyncio.get_running_loop().create_future()
+    failed.set_exception(OSError("disk I/O error"))
+    store = MagicMock()
+    store.add.return_value = failed
+
+    with patch("labels.label_creator.get_shipment_store", return_value=store), \
+         patch("labels.label_creator.get_label_prefetcher") as prefetcher:
+        prefetcher.return_value.register.side_effect = lambda label: label
+        with pytest.raises(RuntimeError, match="794870153269 was created but could not be recorded: disk I/O error"):
+            await creator.finish_label(request, SubmittedLabel(carrier="fedex", tracking_number="794870153269"))
+
+@pytest.mark.asyncio
+async def test_fallback_qr_encodes_carrier_url(tmp_path):
+    """Test the QR code of a URL_ONLY label encodes the carrier URL, not our relative document URL"""
+    carrier_url = "https://wwwtest.fedex.com/document/v1/cache/retrieve/SH,794870153269"
+
+    class UrlOnlyEngine(FakeEngine):
+        async def build_label_response(self, request, submitted):
+            label = await super().build_label_response(request, submitted)
+            label.label_url = carrier_url
+            label.native_qr_code_base64 = None
+            return label
+
+    storage = LabelStorage(root=str(tmp_path / "labels"), index_path=str(tmp_path / "index.sqlite3"))
+    creator = LabelCreator()
+    creator.engines["fedex"] = UrlOnlyEngine()
+    creator._qr_cache = QRCodeCache(storage=storage, store=ShipmentStore(path=str(tmp_path / "qr.sqlite3")))
+    request = LabelRequest(carrier="fedex", shipper=ADDRESS, recipient=ADDRESS, package={"weight": 1.0}, service_type="FEDEX_GROUND")
+    prefetcher = LabelPrefetcher(storage=storage)
+
+    with patch("labels.label_creator.get_label_prefetcher", return_value=prefetcher), \
+         patch("labels.label_creator.get_shipment_store", return_value=ShipmentStore(path=str(tmp_path / "shipments.sqlite3"))), \
+         patch("httpx.AsyncClient.get", new_callable=AsyncMock, return_value=MagicMock(status_code=200, content=b"%PDF-1.4", headers={"content-type": "application/pdf"})):
+        label = await creator.finish_label(request, SubmittedLabel(carrier="fedex", tracking_number="794870153269"))
+        await prefetcher.flush()
+
+    assert label.label_url == "/static/labels/documents/794870153269"
+    image = await creator._qr_cache.get("794870153269")
+    # Rendering is deterministic, so the PNG shows exactly what was encoded
+    assert image.content == render_qr_code(carrier_url)
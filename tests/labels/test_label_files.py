@@ -0,0 +1,56 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from labels.label_file_cache import LabelFileCache
+from labels.label_storage import LabelStorage
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    storage = LabelStorage(root=str(tmp_path / "labels"), index_path=str(tmp_path / "index.sqlite3"))
+    monkeypatch.setattr("app.routes.label_files.get_label_storage", lambda: storage)
+    monkeypatch.setattr("app.routes.label_files.get_label_file_cache", lambda: LabelFileCache())
+    return storage
+
+@pytest.mark.asyncio
+async def test_content_addressed_label_conditional_and_range(storage):
+    """Test strong ETag, immutable caching, 304 and Range on stored labels"""
+    stored = await storage.save(b"%PDF-1.4 label body", "pdf", tracking_number="TRK1")
+    client = TestClient(app)
+
+    response = client.get(stored.url)
+    assert response.status_code == 200
+    assert response.content == b"%PDF-1.4 label body"
+    assert response.headers["etag"] == f'"{stored.sha256}"'
+    assert "immutable" in response.headers["cache-control"]
+
+    assert client.get(stored.url, headers={"If-None-Match": f'"{stored.sha256}"'}).status_code == 304
+
+    partial = client.get(stored.url, headers={"Range": "bytes=0-7"})
+    assert partial.status_code == 206
+    assert partial.content == b"%PDF-1.4"
+
+def test_legacy_label_revalidates(storage):
+    """Test files named by tracking number get a validator and must revalidate"""
+    storage.root.mkdir(parents=True, exist_ok=True)
+    (storage.root / "794870153269.pdf").write_bytes(b"%PDF-1.4 legacy")
+    client = TestClient(app)
+
+    response = client.get("/static/labels/794870153269.pdf")
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "public, no-cache"
+    assert client.get("/static/labels/794870153269.pdf", headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+    assert client.get("/static/labels/missing.pdf").status_code == 404
+    assert client.get("/static/labels/../main.py").status_code == 404
+
+@pytest.mark.asyncio
+async def test_hot_cache_is_bounded(tmp_path):
+    """Test small files are kept in memory up to the byte budget and large ones are not"""
+    cache = LabelFileCache(max_bytes=10, max_file_bytes=6)
+    for name, content in [("a", b"aaaaa"), ("b", b"bbbbb"), ("c", b"ccccc"), ("big", b"x" * 7)]:
+        (tmp_path / name).write_bytes(content)
+
+    for name in ["a", "b", "c"]:
+        assert await cache.get(str(tmp_path / name)) == (tmp_path / name).read_bytes()
+    assert await cache.get(str(tmp_path / "big")) is None
+
+    assert list(cache._files) == [str(tmp_path / "b"), str(tmp_path / "c")]
@@ -0,0 +1,115 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from labels.label_jobs import LabelJobManager
+from models.label_job import LabelJobRequest
+from models.label_response import LabelResponse, SubmittedLabel
+
+LABEL = {
+    "carrier": "fedex",
+    "shipper": {"name": "Shipper", "street": "123 Shipper Street", "city": "Memphis", "state": "TN", "zip_code": "38117"},
+    "recipient": {"name": "Recipient", "street": "456 Recipient Street", "city": "Atlanta", "state": "GA", "zip_code": "30339"},
+    "package": {"weight": 5.0},
+    "service_type": "FEDEX_GROUND"
+}
+
+class FakeCreator:
+    def __init__(self, finish_delay=0.0, fail=False):
+        self.finish_delay = finish_delay
+        self.fail = fail
+
+    async def submit_label(self, request):
+        return SubmittedLabel(carrier="fedex", tracking_number="794870153269", carrier_response={})
+
+    async def finish_label(self, request, submitted):
+        await asyncio.sleep(self.finish_delay)
+        if self.fail:
+            raise ValueError("Error processing label data: Label data not found in response")
+        return LabelResponse(
+            tracking_number=submitted.tracking_number,
+            label_url="/static/labels/test.pdf",
+            carrier="fedex",
+            estimated_delivery=None,
+            native_qr_code_base64="native"
+        )
+
+@pytest.mark.asyncio
+async def test_submit_returns_before_post_processing():
+    """Test the job comes back after the carrier call with post-processing still pending"""
+    manager = LabelJobManager(FakeCreator(finish_delay=0.05), workers=2)
+
+    job = await manager.submit(LabelJobRequest(label=LABEL))
+    assert job.status == "processing"
+    assert job.tracking_number == "794870153269"
+    assert job.label is None
+
+    await manager.join()
+    finished = manager.get(job.job_id)
+    assert finished.status == "completed"
+    assert finished.label.label_url == "/static/labels/test.pdf"
+    assert finished.completed_at is not None
+    await manager.shutdown()
+
+@pytest.mark.asyncio
+async def test_failed_post_processing_is_reported():
+    """Test a failing step marks the job failed"""
+    manager = LabelJobManager(FakeCreator(fail=True), workers=1)
+
+    job = await manager.submit(LabelJobRequest(label=LABEL))
+    await manager.join()
+
+    assert manager.get(job.job_id).status == "failed"
+    assert "Label data not found" in manager.get(job.job_id).error
+    await manager.shutdown()
+
+@pytest.mark.asyncio
+async def test_extra_steps_email_and_callback():
+    """Test registered steps, email and callback run in the background"""
+    manager = LabelJobManager(FakeCreator(), workers=1)
+    step = AsyncMock()
+    manager.add_step(step)
+    callback_response = MagicMock(status_code=200)
+
+    with patch("labels.label_jobs.send_label_email", new_callable=AsyncMock) as mock_email, \
+         patch("httpx.AsyncClient.post", new_callable=AsyncMock, return_value=callback_response) as mock_post:
+        job = await manager.submit(LabelJobRequest(
+            label=LABEL,
+            callback_url="https://example.com/hooks/labels",
+            notify_email="ops@example.com"
+        ))
+        await manager.join()
+
+    step.assert_awaited_once()
+    mock_email.assert_awaited_once_with("ops@example.com", "794870153269", "/static/labels/test.pdf", None)
+    assert mock_post.call_args.args[0] == "https://example.com/hooks/labels"
+    assert mock_post.call_args.kwargs["json"]["status"] == "completed"
+    assert mock_post.call_args.kwargs["json"]["job_id"] == job.job_id
+    await manager.shutdown()
+
+@pytest.mark.asyncio
+async def test_shutdown_drains_queue_and_saves_unfinished_jobs(tmp_path, monkeypatch):
+    """Test shutdown finishes queued jobs, saves one it can't and recover() completes it"""
+    monkeypatch.setenv("LABEL_JOB_RECOVERY_PATH", str(tmp_path / "recovery.jsonl"))
+    manager = LabelJobManager(FakeCreator(finish_delay=0.01), workers=1)
+    queued = [await manager.submit(LabelJobRequest(label=LABEL)) for _ in range(3)]
+
+    await manager.shutdown()
+    assert all(manager.get(job.job_id).status == "completed" for job in queued)
+    with pytest.raises(ValueError, match="shutting down"):
+        await manager.submit(LabelJobRequest(label=LABEL))
+
+    slow = LabelJobManager(FakeCreator(finish_delay=10), workers=1)
+    stuck = await slow.submit(LabelJobRequest(label=LABEL))
+    waiting = await slow.submit(LabelJobRequest(label=LABEL))
+    await asyncio.sleep(0)
+    await slow.shutdown(timeout=0.05)
+    assert slow.get(stuck.job_id).status == "failed"
+    assert slow.get(waiting.job_id).status == "failed"
+
+    restarted = LabelJobManager(FakeCreator(), workers=1)
+    assert await restarted.recover() == 2
+    await restarted.join()
+    assert restarted.get(stuck.job_id).status == "completed"
+    assert restarted.get(waiting.job_id).label.tracking_number == "794870153269"
+    assert not (tmp_path / "recovery.jsonl").exists()
+    await restarted.shutdown()
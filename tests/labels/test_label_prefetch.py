@@ -0,0 +1,78 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from labels.label_prefetch import LabelPrefetcher
+from labels.label_storage import LabelStorage
+from models.label_response import LabelPiece, LabelResponse
+
+def _prefetcher(tmp_path):
+    storage = LabelStorage(root=str(tmp_path / "labels"), index_path=str(tmp_path / "index.sqlite3"))
+    prefetcher = LabelPrefetcher(storage=storage)
+    prefetcher._backoff = 0.001
+    return prefetcher
+
+def _response(status_code=200, content=b"%PDF-1.4 label"):
+    return MagicMock(status_code=status_code, content=content, headers={"content-type": "application/pdf"})
+
+def _label():
+    url = "https://wwwtest.fedex.com/document/v1/cache/retrieve/SH,TRK1"
+    return LabelResponse(
+        tracking_number="TRK1",
+        label_url=url,
+        carrier="fedex",
+        estimated_delivery=None,
+        pieces=[LabelPiece(tracking_number="TRK1", label_url=url)]
+    )
+
+@pytest.mark.asyncio
+async def test_register_rewrites_urls_and_downloads_once(tmp_path):
+    """Test carrier URLs become local ones and concurrent reads share one download"""
+    prefetcher = _prefetcher(tmp_path)
+
+    with patch("httpx.AsyncClient.get", new_callable=AsyncMock, return_value=_response()) as mock_get:
+        label = prefetcher.register(_label())
+        first, second = await asyncio.gather(prefetcher.get("TRK1"), prefetcher.get("TRK1"))
+        await prefetcher.flush()
+        again = await prefetcher.get("TRK1")
+
+    assert label.label_url == "/static/labels/documents/TRK1"
+    assert label.pieces[0].label_url == "/static/labels/documents/TRK1"
+    assert mock_get.await_count == 1
+    assert first == second
+    assert again.sha256 == first.sha256
+    assert open(again.path, "rb").read() == b"%PDF-1.4 label"
+
+@pytest.mark.asyncio
+async def test_failed_download_retried_on_read(tmp_path):
+    """Test server errors are retried, and a failed prefetch is fetched again on demand"""
+    prefetcher = _prefetcher(tmp_path)
+    prefetcher._retries = 1
+    responses = [_response(503), _response(503), _response(503), _response()]
+
+    with patch("httpx.AsyncClient.get", new_callable=AsyncMock, side_effect=responses) as mock_get:
+        prefetcher.register(_label())
+        with pytest.raises(ValueError):
+            await prefetcher.get("TRK1")
+        await prefetcher.flush()
+        stored = await prefetcher.get("TRK1")
+
+    assert mock_get.await_count == 4
+    assert stored.content_type == "application/pdf"
+    assert await prefetcher.get("UNKNOWN") is None
+
+@pytest.mark.asyncio
+async def test_download_resumed_after_restart(tmp_path):
+    """Test a label whose download failed is fetched from its saved carrier URL by a new process"""
+    prefetcher = _prefetcher(tmp_path)
+    prefetcher._retries = 0
+
+    with patch("httpx.AsyncClient.get", new_callable=AsyncMock, return_value=_response(503)):
+        prefetcher.register(_label())
+        await prefetcher.flush()
+
+    restarted = _prefetcher(tmp_path)
+    with patch("httpx.AsyncClient.get", new_callable=AsyncMock, return_value=_response()) as mock_get:
+        stored = await restarted.get("TRK1")
+
+    assert mock_get.call_args.args[0] == _label().label_url
+    assert open(stored.path, "rb").read() == b"%PDF-1.4 label"
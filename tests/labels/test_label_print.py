@@ -0,0 +1,99 @@
+import io
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import DecodedStreamObject, NameObject
+from labels.label_prefetch import LabelPrefetcher
+from labels.label_print import iter_merged_pdf, iter_zpl_stream, resolve_print_documents
+from labels.label_storage import LabelStorage
+from models.label_response import LabelPiece, LabelResponse
+from shipments.shipment_store import ShipmentStore, shipment_record
+from models.label_request import LabelRequest
+
+def _pdf(*contents, width=288, height=432):
+    writer = PdfWriter()
+    for content in contents:
+        page = writer.add_blank_page(width=width, height=height)
+        stream = DecodedStreamObject()
+        stream.set_data(content)
+        page[NameObject("/Contents")] = writer._add_object(stream)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+def _request():
+    address = {"name": "Shipper Name", "street": "123 Shipper Street", "city": "Memphis", "state": "TN", "zip_code": "38117"}
+    return LabelRequest(carrier="fedex", shipper=address, recipient=address, packages=[{"weight": 2.0}, {"weight": 1.0}], service_type="FEDEX_GROUND")
+
+def test_merged_pdf_keeps_every_page(tmp_path):
+    """Test pages of several PDFs come out in order with their content"""
+    first, second = tmp_path / "a.pdf", tmp_path / "b.pdf"
+    first.write_bytes(_pdf(b"0 0 m 10 10 l S"))
+    second.write_bytes(_pdf(b"1 1 m 20 20 l S", b"2 2 m 30 30 l S", width=612, height=792))
+
+    merged = PdfReader(io.BytesIO(b"".join(iter_merged_pdf([str(first), str(second)]))))
+
+    assert len(merged.pages) == 3
+    assert [page.get_contents().get_data() for page in merged.pages] == [
+        b"0 0 m 10 10 l S", b"1 1 m 20 20 l S", b"2 2 m 30 30 l S"
+    ]
+    assert [float(page.mediabox.width) for page in merged.pages] == [288, 612, 612]
+
+def test_merged_pdf_reencodes_compressed_streams(tmp_path):
+    """Test compressed content streams survive the merge"""
+    compressed = PdfWriter(clone_from=PdfReader(io.BytesIO(_pdf(b"5 5 m 50 50 l S"))))
+    for page in compressed.pages:
+        page.compress_content_streams()
+    buffer = io.BytesIO()
+    compressed.write(buffer)
+    (tmp_path / "c.pdf").write_bytes(buffer.getvalue())
+
+    merged = PdfReader(io.BytesIO(b"".join(iter_merged_pdf([str(tmp_path / "c.pdf")]))))
+
+    assert compressed.pages[0]["/Contents"].get_object().get("/Filter") == "/FlateDecode"
+    contents = merged.pages[0]["/Contents"].get_object()
+    assert contents.get("/Filter") == "/FlateDecode"
+    assert contents.get_data() == b"5 5 m 50 50 l S"
+
+def test_zpl_stream_concatenates_labels(tmp_path):
+    """Test ZPL labels are joined in order, one label per line"""
+    first, second = tmp_path / "a.zpl", tmp_path / "b.zpl"
+    first.write_bytes(b"^XA^FDone^FS^XZ")
+    second.write_bytes(b"^XA^FDtwo^FS^XZ\n")
+
+    assert b"".join(iter_zpl_stream([str(first), str(second)], chunk_size=4)) == b"^XA^FDone^FS^XZ\n^XA^FDtwo^FS^XZ\n"
+
+@pytest.mark.asyncio
+async def test_resolve_expands_pieces_and_reports_missing(tmp_path):
+    """Test multi-piece shipments print every piece label"""
+    storage = LabelStorage(root=str(tmp_path / "labels"), index_path=str(tmp_path / "index.sqlite3"))
+    store = ShipmentStore(path=str(tmp_path / "shipments.sqlite3"))
+    await storage.save(b"^XA^FDpiece1^FS^XZ", "zpl", tracking_number="P1")
+    await storage.save(b"^XA^FDpiece2^FS^XZ", "zpl", tracking_number="P2")
+    await storage.save(b"^XA^FDsingle^FS^XZ", "zpl", tracking_number="S1")
+    label = LabelResponse(
+        tracking_number="P1", label_url="", carrier="fedex", estimated_delivery=None,
+        pieces=[LabelPiece(tracking_number="P1", label_url=""), LabelPiece(tracking_number="P2", label_url="")]
+    )
+    await store.record_many([shipment_record(_request(), label)])
+
+    documents, missing = await resolve_print_documents(["P1", "S1", "NOPE"], prefetcher=LabelPrefetcher(storage=storage), store=store)
+
+    assert [open(document.path, "rb").read() for document in documents] == [
+        b"^XA^FDpiece1^FS^XZ", b"^XA^FDpiece2^FS^XZ", b"^XA^FDsingle^FS^XZ"
+    ]
+    assert missing == ["NOPE"]
+
+@pytest.mark.asyncio
+async def test_resolve_downloads_carrier_hosted_labels(tmp_path):
+    """Test a URL_ONLY label whose prefetch failed is downloaded for the wave"""
+    storage = LabelStorage(root=str(tmp_path / "labels"), index_path=str(tmp_path / "index.sqlite3"))
+    store = ShipmentStore(path=str(tmp_path / "shipments.sqlite3"))
+    await storage.save_source("R1", "https://wwwtest.fedex.com/document/v1/cache/retrieve/SH,R1")
+    response = MagicMock(status_code=200, content=b"^XA^FDremote^FS^XZ", headers={"content-type": "application/zpl"})
+
+    with patch("httpx.AsyncClient.get", new_callable=AsyncMock, return_value=response):
+        documents, missing = await resolve_print_documents(["R1"], prefetcher=LabelPrefetcher(storage=storage), store=store)
+
+    assert missing == []
+    assert open(documents[0].path, "rb").read() == b"^XA^FDremote^FS^XZ"
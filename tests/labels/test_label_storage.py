@@ -0,0 +1,103 @@
+import base64
+import os
+import time
+import pytest
+from pathlib import Path
+from labels.label_storage import LabelStorage, extension_for_doc_type, iter_base64_chunks
+
+@pytest.fixture
+def storage(tmp_path):
+    return LabelStorage(
+        root=str(tmp_path / "labels"),
+        url_prefix="/static/labels",
+        index_path=str(tmp_path / "index.sqlite3"),
+        retention_days=30
+    )
+
+@pytest.mark.asyncio
+async def test_save_is_content_addressed_and_sharded(storage, tmp_path):
+    """Test files are named by hash under two shard levels"""
+    stored = await storage.save(b"%PDF-1.4 label", "pdf", "794870153269")
+
+    path = Path(stored.path)
+    assert path.read_bytes() == b"%PDF-1.4 label"
+    assert path.name == f"{stored.sha256}.pdf"
+    assert path.parent == tmp_path / "labels" / stored.sha256[:2] / stored.sha256[2:4]
+    assert stored.url == f"/static/labels/{stored.sha256[:2]}/{stored.sha256[2:4]}/{stored.sha256}.pdf"
+    assert stored.content_type == "application/pdf"
+
+@pytest.mark.asyncio
+async def test_identical_content_stored_once(storage):
+    """Test duplicate documents share one file"""
+    first = await storage.save(b"same", "pdf", "111")
+    second = await storage.save(b"same", "pdf", "222")
+
+    assert first.path == second.path
+    assert len(list(Path(first.path).parent.iterdir())) == 1
+
+@pytest.mark.asyncio
+async def test_lookup_by_tracking_number(storage):
+    """Test the index maps tracking numbers and kinds to files"""
+    label = await storage.save(b"label", "pdf", "794870153269")
+    qr = await storage.save(b"qr", "png", "794870153269", kind="qr")
+
+    assert (await storage.lookup("794870153269")).sha256 == label.sha256
+    assert (await storage.lookup("794870153269", kind="qr")).sha256 == qr.sha256
+    assert await storage.lookup("000000000000") is None
+
+@pytest.mark.asyncio
+async def test_gc_removes_expired_files(storage):
+    """Test retention deletes files older than the retention window"""
+    stored = await storage.save(b"old label", "pdf", "794870153269")
+
+    assert await storage.gc() == 0
+    assert Path(stored.path).exists()
+
+    removed = await storage.gc(now=time.time() + 31 * 86400)
+    assert removed == 1
+    assert not Path(stored.path).exists()
+    assert await storage.lookup("794870153269") is None
+
+@pytest.mark.asyncio
+async def test_reused_file_not_expired_and_rewritten_after_gc(storage):
+    """Test saving an existing document keeps it from gc, and a collected one is written again"""
+    first = await storage.save(b"same", "pdf", "111")
+    db = storage._connect()
+    with db:
+        db.execute("UPDATE label_files SET created_at = 0")
+        db.execute("UPDATE label_refs SET created_at = 0")
+
+    await storage.save(b"same", "pdf")
+    assert await storage.gc() == 0
+    assert Path(first.path).exists()
+
+    assert await storage.gc(now=time.time() + 31 * 86400) == 1
+    again = await storage.save(b"same", "pdf", "222")
+    assert Path((await storage.lookup("222")).path).read_bytes() == b"same"
+    assert again.path == first.path
+
+@pytest.mark.asyncio
+async def test_save_base64_streams_to_same_file(storage):
+    """Test chunked base64 decoding stores the same content as a plain save"""
+    data = os.urandom(300 * 1024)
+    streamed = await storage.save_base64(base64.b64encode(data).decode("ascii"), "pdf", "794870153269")
+    plain = await storage.save(data, "pdf")
+
+    assert streamed.sha256 == plain.sha256
+    assert streamed.size == len(data)
+    assert Path(streamed.path).read_bytes() == data
+
+def test_iter_base64_chunks():
+    """Test incremental decoding, including line-wrapped input"""
+    data = os.urandom(1000)
+    encoded = base64.b64encode(data).decode("ascii")
+    assert b"".join(iter_base64_chunks(encoded, chunk_size=64)) == data
+
+    wrapped = "\n".join(encoded[i:i + 76] for i in range(0, len(encoded), 76))
+    assert b"".join(iter_base64_chunks(wrapped, chunk_size=64)) == data
+
+def test_extension_for_doc_type():
+    """Test carrier docType mapping"""
+    assert extension_for_doc_type("PDF") == "pdf"
+    assert extension_for_doc_type("ZPLII") == "zpl"
+    assert extension_for_doc_type(None) == "pdf"
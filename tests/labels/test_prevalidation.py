@@ -0,0 +1,84 @@
+import httpx
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from labels.fedex_ship import FedExShipEngine
+from labels.prevalidation import LabelPrevalidator
+from models.label_request import LabelRequest
+
+ADDRESS = {
+    "name": "Shipper Name",
+    "street": "123 Shipper Street",
+    "city": "Memphis",
+    "state": "TN",
+    "zip_code": "38117"
+}
+
+def _request(**kwargs):
+    return LabelRequest(
+        carrier="fedex",
+        shipper=ADDRESS,
+        recipient={**ADDRESS, "zip_code": "30339"},
+        service_type="FEDEX_GROUND",
+        package={"weight": 5.0},
+        **kwargs
+    )
+
+@pytest.fixture
+def engine():
+    engine = FedExShipEngine()
+    with patch.object(engine._auth, "get_token", new_callable=AsyncMock, return_value="token"):
+        yield engine
+
+@pytest.mark.asyncio
+async def test_validated_payload_reused_for_same_request(engine):
+    """Test the payload checked with FedEx is handed to the label call"""
+    prevalidator = LabelPrevalidator({"fedex": engine})
+    response = MagicMock(status_code=200)
+    response.json.return_value = {"output": {"alerts": [{"code": "ADDRESS.RESIDENTIAL", "message": "Address is residential"}]}}
+
+    with patch("httpx.AsyncClient.post", new_callable=AsyncMock, return_value=response) as mock_post:
+        status = prevalidator.start(_request())
+        assert status.status == "pending"
+        ship_request = await prevalidator.take(status.token, _request(prevalidation_token=status.token))
+
+    assert mock_post.call_args.args[0].endswith("/ship/v1/shipments/packages/validate")
+    assert "totalPackageCount" not in mock_post.call_args.kwargs["json"]["requestedShipment"]
+    assert ship_request["requestedShipment"]["serviceType"] == "FEDEX_GROUND"
+    assert prevalidator.get(status.token).alerts == ["Address is residential"]
+
+    # A different request can't use the token
+    other = _request(prevalidation_token=status.token, pickup_requested=True)
+    assert await prevalidator.take(status.token, other) is None
+
+@pytest.mark.asyncio
+async def test_rejected_request_fails_fast(engine):
+    """Test a request FedEx already rejected fails without another carrier call"""
+    prevalidator = LabelPrevalidator({"fedex": engine})
+    response = MagicMock(status_code=400, text="")
+    response.json.return_value = {"errors": [{"code": "SERVICE.UNAVAILABLE"}]}
+
+    with patch("httpx.AsyncClient.post", new_callable=AsyncMock, return_value=response) as mock_post:
+        status = prevalidator.start(_request())
+        with pytest.raises(ValueError, match="SERVICE.UNAVAILABLE"):
+            await prevalidator.take(status.token, _request())
+
+    assert mock_post.await_count == 1
+    assert prevalidator.get(status.token).status == "invalid"
+    assert await prevalidator.take("unknown", _request()) is None
+
+@pytest.mark.asyncio
+async def test_unreachable_carrier_falls_back_to_normal_path(engine):
+    """Test a timeout or auth failure during validation doesn't fail the label call"""
+    prevalidator = LabelPrevalidator({"fedex": engine})
+
+    with patch("httpx.AsyncClient.post", new_callable=AsyncMock, side_effect=httpx.ReadTimeout("timed out")):
+        status = prevalidator.start(_request())
+        assert await prevalidator.take(status.token, _request()) is None
+    assert prevalidator.get(status.token).status == "unavailable"
+
+    response = MagicMock(status_code=401, text="")
+    response.json.return_value = {"errors": [{"code": "NOT.AUTHORIZED.ERROR"}]}
+    with patch("httpx.AsyncClient.post", new_callable=AsyncMock, return_value=response):
+        status = prevalidator.start(_request())
+        assert await prevalidator.take(status.token, _request()) is None
+    assert prevalidator.get(status.token).status == "unavailable"
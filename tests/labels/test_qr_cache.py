@@ -0,0 +1,122 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from labels.label_storage import LabelStorage
+from labels.qr_cache import QRCodeCache, get_qr_cache
+from models.label_request import LabelRequest
+from models.label_response import LabelResponse
+from shipments.shipment_store import ShipmentStore
+
+@pytest.fixture
+def storage(tmp_path):
+    return LabelStorage(root=str(tmp_path / "labels"), index_path=str(tmp_path / "index.sqlite3"))
+
+@pytest.fixture
+def store(tmp_path):
+    return ShipmentStore(path=str(tmp_path / "shipments.sqlite3"))
+
+@pytest.fixture
+def qr_cache(storage, store):
+    return QRCodeCache(storage=storage, max_entries=2, store=store)
+
+@pytest.mark.asyncio
+async def test_renders_registered_code_once(qr_cache):
+    """Test concurrent requests share one render and later hits come from the LRU"""
+    url = qr_cache.register("794870153269", "https://example.com/label.pdf")
+    assert url == "/static/labels/qr/794870153269.png"
+
+    with patch("labels.qr_cache.render_qr_code", return_value=b"png-bytes") as mock_render:
+        images = await asyncio.gather(*[qr_cache.get("794870153269") for _ in range(5)])
+        await qr_cache.get("794870153269")
+
+    mock_render.assert_called_once_with("https://example.com/label.pdf")
+    assert all(image.content == b"png-bytes" for image in images)
+    assert images[0].etag.startswith('"')
+
+@pytest.mark.asyncio
+async def test_waiters_served_when_first_request_cancelled(qr_cache):
+    """Test a disconnecting first requester doesn't leave the others hanging"""
+    qr_cache.register("794870153269", "https://example.com/label.pdf")
+    release = asyncio.Event()
+
+    async def slow_load(tracking_number):
+        await release.wait()
+        return qr_cache._image(b"png-bytes")
+
+    with patch.object(qr_cache, "_load", side_effect=slow_load):
+        owner = asyncio.create_task(qr_cache.get("794870153269"))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(qr_cache.get("794870153269"))
+        await asyncio.sleep(0)
+        owner.cancel()
+        release.set()
+        image = await asyncio.wait_for(waiter, timeout=1)
+
+    assert owner.cancelled()
+    assert image.content == b"png-bytes"
+
+@pytest.mark.asyncio
+async def test_lru_is_bounded(qr_cache):
+    """Test least recently used codes are evicted"""
+    for tracking_number in ["1", "2", "3"]:
+        qr_cache.register(tracking_number, f"label-{tracking_number}")
+
+    with patch("labels.qr_cache.render_qr_code", return_value=b"png") as mock_render:
+        for tracking_number in ["1", "2", "3", "1"]:
+            await qr_cache.get(tracking_number)
+
+    # "1" was evicted by "3" and had to be rendered again
+    assert mock_render.call_count == 4
+
+@pytest.mark.asyncio
+async def test_code_rebuilt_after_restart(storage, store):
+    """Test a QR URL handed out before a restart still renders from the shipment store"""
+    address = {"name": "Shipper Name", "street": "123 Shipper Street", "city": "Memphis", "state": "TN", "zip_code": "38117"}
+    await store.record(
+        LabelRequest(carrier="fedex", shipper=address, recipient=address, service_type="FEDEX_GROUND", package={"weight": 1.0}),
+        LabelResponse(
+            tracking_number="794870153269",
+            label_url="/static/labels/documents/794870153269",
+            carrier="fedex",
+            estimated_delivery=None,
+            fallback_qr_code_url="/static/labels/qr/794870153269.png"
+        )
+    )
+    restarted = QRCodeCache(storage=storage, store=store)
+
+    with patch("labels.qr_cache.render_qr_code", return_value=b"png-bytes") as mock_render, \
+         patch.dict("os.environ", {"LABEL_PUBLIC_BASE_URL": "https://ship.example.com/"}):
+        image = await restarted.get("794870153269")
+    assert image.content == b"png-bytes"
+    mock_render.assert_called_once_with("https://ship.example.com/static/labels/documents/794870153269")
+
+    # The carrier URL saved by the prefetcher takes precedence
+    await storage.save_source("794870153269", "https://wwwtest.fedex.com/document/v1/cache/retrieve/SH,794870153269")
+    with patch("labels.qr_cache.render_qr_code", return_value=b"png-bytes") as mock_render:
+        await QRCodeCache(storage=storage, store=store).get("794870153269")
+    mock_render.assert_called_once_with("https://wwwtest.fedex.com/document/v1/cache/retrieve/SH,794870153269")
+
+@pytest.mark.asyncio
+async def test_unknown_tracking_number(qr_cache):
+    """Test unknown tracking numbers return None"""
+    assert await qr_cache.get("000000000000") is None
+
+def test_qr_endpoint_etag(client):
+    """Test the QR endpoint renders lazily and honours If-None-Match"""
+    get_qr_cache().register("TEST-QR-1", "/static/labels/test.pdf")
+
+    response = client.get("/static/labels/qr/TEST-QR-1.png")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
+    assert response.content.startswith(b"\x89PNG")
+    etag = response.headers["etag"]
+
+    cached = client.get("/static/labels/qr/TEST-QR-1.png", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+
+    # Weak tags in a list, as proxies and browsers may send them
+    listed = client.get("/static/labels/qr/TEST-QR-1.png", headers={"If-None-Match": f'"other", W/{etag}'})
+    assert listed.status_code == 304
+
+    assert client.get("/static/labels/qr/UNKNOWN-1.png").status_code == 404
@@ -0,0 +1,110 @@
+import asyncio
+import pytest
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+from models.pickup import PickupWindow
+from pickup.fedex_pickup import FedExPickupEngine
+from pickup.pickup_availability import PickupAvailabilityService
+
+TODAY = date.today()
+
+class FakeAvailabilityEngine:
+    def __init__(self):
+        self.calls = 0
+
+    async def get_availability(self, postal_code, pickup_date):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return [PickupWindow(service="FDXG", available=True, pickup_date=pickup_date, cutoff_time="16:00:00")]
+
+class NoAvailabilityEngine:
+    """Carrier engine without an availability lookup"""
+
+@pytest.mark.asyncio
+async def test_lookups_cached_per_postal_code_and_date():
+    """Test repeated and concurrent questions share one carrier call"""
+    engine = FakeAvailabilityEngine()
+    service = PickupAvailabilityService({"fedex": engine})
+
+    await asyncio.gather(*[service.get_availability("fedex", "38017", TODAY) for _ in range(5)])
+    await service.get_availability("fedex", "38017-1234", TODAY)
+    await service.get_availability("fedex", "38017", TODAY + timedelta(days=1))
+    await service.get_availability("fedex", "90210", TODAY)
+
+    assert engine.calls == 3
+
+@pytest.mark.asyncio
+async def test_same_day_entries_expire_sooner():
+    """Test today's answers use the shorter TTL"""
+    engine = FakeAvailabilityEngine()
+    service = PickupAvailabilityService({"fedex": engine}, same_day_ttl=0.01, future_ttl=60)
+
+    tomorrow = TODAY + timedelta(days=1)
+    await service.get_availability("fedex", "38017", TODAY)
+    await service.get_availability("fedex", "38017", tomorrow)
+    await asyncio.sleep(0.02)
+    await service.get_availability("fedex", "38017", TODAY)
+    await service.get_availability("fedex", "38017", tomorrow)
+
+    assert engine.calls == 3
+
+@pytest.mark.asyncio
+async def test_cutoff_checked_on_every_read():
+    """Test a cached answer stops offering pickup once the cutoff passes"""
+    engine = FakeAvailabilityEngine()
+    service = PickupAvailabilityService({"fedex": engine})
+    morning = datetime.combine(TODAY, datetime.min.time()).replace(hour=10)
+
+    before = await service.get_availability("fedex", "38017", now=morning)
+    after = await service.get_availability("fedex", "38017", now=morning.replace(hour=17))
+
+    assert before.can_book_now
+    assert not after.can_book_now
+    assert engine.calls == 1
+
+@pytest.mark.asyncio
+async def test_cutoff_compared_in_pickup_location_time():
+    """Test a UTC clock is converted to the pickup ZIP's time before the cutoff check"""
+    service = PickupAvailabilityService({"fedex": FakeAvailabilityEngine()})
+    # 22:30 UTC is 17:30 or 16:30 in Memphis, past the 16:00 cutoff, but 15:30 in Phoenix
+    utc_evening = datetime.combine(TODAY, datetime.min.time()).replace(hour=22, minute=30, tzinfo=timezone.utc)
+
+    memphis = await service.get_availability("fedex", "38017", TODAY, now=utc_evening)
+    phoenix = await service.get_availability("fedex", "85001", TODAY, now=utc_evening)
+
+    assert not memphis.can_book_now
+    assert phoenix.can_book_now
+
+@pytest.mark.asyncio
+async def test_carrier_without_lookup_reported_unsupported():
+    """Test UPS-style engines without an availability API"""
+    service = PickupAvailabilityService({"ups": NoAvailabilityEngine()})
+
+    availability = await service.get_availability("ups", "38017", TODAY)
+
+    assert not availability.supported
+    assert not availability.can_book_now
+
+@pytest.mark.asyncio
+async def test_fedex_availability_parsing():
+    """Test FedEx availability options become pickup windows"""
+    engine = FedExPickupEngine()
+    response = MagicMock(status_code=200)
+    response.json.return_value = {"output": {"options": [{
+        "carrier": "FDXE",
+        "available": True,
+        "pickupDate": TODAY.isoformat(),
+        "cutOffTime": "18:30:00",
+        "defaultReadyTime": "14:00:00",
+        "defaultLatestTimeOptions": ["19:00:00"],
+        "residentialAvailable": True
+    }]}}
+
+    with patch.object(engine._auth, "get_token", new_callable=AsyncMock, return_value="test_token"), \
+         patch("httpx.AsyncClient.post", new_callable=AsyncMock, return_value=response) as mock_post:
+        windows = await engine.get_availability("38017", TODAY)
+
+    assert mock_post.call_args.kwargs["json"]["pickupRequestType"] == ["SAME_DAY"]
+    assert windows[0].service == "FDXE"
+    assert windows[0].cutoff_time == "18:30:00"
+    assert windows[0].latest_time == "19:00:00"
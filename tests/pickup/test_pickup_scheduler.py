@@ -0,0 +1,195 @@
+import asyncio
+import pytest
+from datetime import date, datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+from models.label_request import LabelRequest
+from models.label_response import LabelResponse
+from models.pickup import PickupConfirmation, PickupRequest
+from pickup.fedex_pickup import FedExPickupEngine
+from pickup.pickup_scheduler import PickupScheduler
+from pickup.ups_pickup import UPSPickupEngine
+from shipments.shipment_store import ShipmentStore, shipment_record
+
+DAY = date(2026, 10, 19)
+
+def _request(street="10 FedEx Pkwy", service_type="FEDEX_GROUND", carrier="fedex", weight=5.0):
+    shipper = {
+        "name": "Dock Manager",
+        "street": street,
+        "city": "Collierville",
+        "state": "TN",
+        "zip_code": "38017"
+    }
+    return LabelRequest(
+        carrier=carrier,
+        shipper=shipper,
+        recipient={**shipper, "street": "1 Main St", "zip_code": "30339"},
+        package={"weight": weight},
+        service_type=service_type,
+        pickup_requested=True
+    )
+
+def _label(tracking_number, carrier="fedex"):
+    return LabelResponse(
+        tracking_number=tracking_number,
+        label_url=f"/static/labels/{tracking_number}.pdf",
+        carrier=carrier,
+        estimated_delivery=None
+    )
+
+class FakePickupEngine:
+    """Pickup engine that records every booking"""
+    def __init__(self, group=lambda service_type: ""):
+        self.requests = []
+        self.pickup_group = group
+        self.fail = False
+
+    async def schedule_pickup(self, request):
+        self.requests.append(request)
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise ValueError("FedEx Pickup API error: service unavailable")
+        return PickupConfirmation(
+            carrier=request.carrier,
+            confirmation_number=f"CONF{len(self.requests)}",
+            pickup_date=request.pickup_date,
+            package_count=request.package_count,
+            tracking_numbers=request.tracking_numbers,
+            booked_at=DAY
+        )
+
+@pytest.mark.asyncio
+async def test_one_pickup_per_location(tmp_path):
+    """Test many labels from one dock need a single pickup call"""
+    fedex = FakePickupEngine()
+    scheduler = PickupScheduler({"fedex": fedex}, store=ShipmentStore(path=str(tmp_path / "shipments.sqlite3")))
+    for index in range(5):
+        scheduler.add_shipment(_request(), _label(f"TRK{index}"), DAY)
+    # Same dock written differently
+    scheduler.add_shipment(_request(street="10  fedex pkwy."), _label("TRK5"), DAY)
+    scheduler.add_shipment(_request(street="99 Other Rd"), _label("TRK6"), DAY)
+
+    results = await scheduler.book_pickups(DAY)
+
+    assert len(fedex.requests) == 2
+    assert sorted(request.package_count for request in fedex.requests) == [1, 6]
+    assert all(result.confirmation for result in results)
+
+@pytest.mark.asyncio
+async def test_repeated_and_concurrent_booking_deduplicated(tmp_path):
+    """Test booking twice, or twice at once, only calls the carrier once"""
+    fedex = FakePickupEngine()
+    scheduler = PickupScheduler({"fedex": fedex}, store=ShipmentStore(path=str(tmp_path / "shipments.sqlite3")))
+    scheduler.add_shipment(_request(), _label("TRK1"), DAY)
+    scheduler.add_shipment(_request(), _label("TRK1"), DAY)
+
+    first, second = await asyncio.gather(scheduler.book_pickups(DAY), scheduler.book_pickups(DAY))
+    third = await scheduler.book_pickups(DAY)
+
+    assert len(fedex.requests) == 1
+    assert fedex.requests[0].package_count == 1
+    assert first[0].confirmation.confirmation_number == third[0].confirmation.confirmation_number
+
+@pytest.mark.asyncio
+async def test_failed_booking_retried(tmp_path):
+    """Test a failed booking is reported and retried on the next call"""
+    fedex = FakePickupEngine()
+    fedex.fail = True
+    scheduler = PickupScheduler({"fedex": fedex}, store=ShipmentStore(path=str(tmp_path / "shipments.sqlite3")))
+    scheduler.add_shipment(_request(), _label("TRK1"), DAY)
+
+    results = await scheduler.book_pickups(DAY)
+    assert "service unavailable" in results[0].error
+
+    fedex.fail = False
+    results = await scheduler.book_pickups(DAY)
+    assert results[0].confirmation is not None
+    assert len(fedex.requests) == 2
+
+@pytest.mark.asyncio
+async def test_fedex_express_and_ground_booked_separately(tmp_path):
+    """Test FedEx groups by operating company at the same dock"""
+    fedex = FakePickupEngine(group=FedExPickupEngine.operating_company)
+    scheduler = PickupScheduler({"fedex": fedex}, store=ShipmentStore(path=str(tmp_path / "shipments.sqlite3")))
+    scheduler.add_shipment(_request(service_type="FEDEX_GROUND"), _label("TRK1"), DAY)
+    scheduler.add_shipment(_request(service_type="PRIORITY_OVERNIGHT"), _label("TRK2"), DAY)
+
+    await scheduler.book_pickups(DAY)
+
+    assert len(fedex.requests) == 2
+
+@pytest.mark.asyncio
+async def test_restart_rebuilds_pending_and_keeps_bookings(tmp_path):
+    """Test a restarted scheduler books the day's stored shipments and doesn't rebook a location"""
+    store = ShipmentStore(path=str(tmp_path / "shipments.sqlite3"))
+    created_at = datetime(2026, 10, 19, 10, 0)
+    await store.record_many([
+        shipment_record(_request(), _label("TRK1"), created_at=created_at),
+        shipment_record(_request(), _label("TRK2"), created_at=created_at),
+        shipment_record(_request(street="99 Other Rd"), _label("TRK3"), created_at=created_at)
+    ])
+    dropoff = _request()
+    dropoff.pickup_requested = False
+    await store.record_many([shipment_record(dropoff, _label("TRK4"), created_at=created_at)])
+
+    fedex = FakePickupEngine()
+    first = PickupScheduler({"fedex": fedex}, store=store)
+    await first.book_pickups(DAY)
+    assert sorted(request.package_count for request in fedex.requests) == [1, 2]
+    assert "TRK4" not in [tn for request in fedex.requests for tn in request.tracking_numbers]
+
+    # Restarted process: nothing in memory
+    restarted = PickupScheduler({"fedex": fedex}, store=store)
+    bookings = await restarted.get_bookings(DAY)
+    results = await restarted.book_pickups(DAY)
+
+    assert len(fedex.requests) == 2
+    assert len(bookings) == 2
+    assert sorted((result.carrier, result.location, sorted(result.confirmation.tracking_numbers)) for result in results) == [
+        ("fedex", "10 FEDEX PKWY|38017|US", ["TRK1", "TRK2"]),
+        ("fedex", "99 OTHER RD|38017|US", ["TRK3"])
+    ]
+
+@pytest.mark.asyncio
+async def test_fedex_pickup_request_payload():
+    """Test the FedEx Create Pickup call and confirmation parsing"""
+    engine = FedExPickupEngine()
+    response = MagicMock(status_code=200)
+    response.json.return_value = {"output": {"pickupConfirmationCode": "3001", "location": "COSA"}}
+    request = PickupRequest(
+        carrier="fedex",
+        address=_request().shipper,
+        pickup_date=DAY,
+        package_count=3,
+        total_weight=12.5,
+        tracking_numbers=["TRK1", "TRK2"],
+        service_counts={"FEDEX_GROUND": 3}
+    )
+
+    with patch.object(engine._auth, "get_token", new_callable=AsyncMock, return_value="test_token"), \
+         patch("httpx.AsyncClient.post", new_callable=AsyncMock, return_value=response) as mock_post:
+        confirmation = await engine.schedule_pickup(request)
+
+    payload = mock_post.call_args.kwargs["json"]
+    assert mock_post.call_args.args[0].endswith("/pickup/v1/pickups")
+    assert payload["carrierCode"] == "FDXG"
+    assert payload["packageCount"] == 3
+    assert payload["originDetail"]["readyDateTimestamp"] == "2026-10-19T09:00:00"
+    assert confirmation.confirmation_number == "3001"
+    assert confirmation.location == "COSA"
+
+def test_ups_pickup_request_payload():
+    """Test UPS pickup pieces are counted per service"""
+    request = PickupRequest(
+        carrier="ups",
+        address=_request().shipper,
+        pickup_date=DAY,
+        package_count=4,
+        total_weight=20,
+        service_counts={"03": 3, "01": 1}
+    )
+
+    payload = UPSPickupEngine()._prepare_pickup_request(request)["PickupCreationRequest"]
+
+    assert payload["PickupDateInfo"] == {"CloseTime": "1700", "ReadyTime": "0900", "PickupDate": "20261019"}
+    assert [(piece["ServiceCode"], piece["Quantity"]) for piece in payload["PickupPiece"]] == [("003", "3"), ("001", "1")]
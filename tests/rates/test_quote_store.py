@@ -0,0 +1,86 @@
+import pytest
+from datetime import datetime
+from models.label_request import LabelRequest
+from models.rate_request import RateRequest
+from models.rate_response import RateOption
+from rates.quote_store import QuoteStore
+from utils.service_normalizer import ServiceTier
+
+def _rate_request():
+    return RateRequest(
+        origin_zip="38117",
+        destination_zip="30339",
+        packages=[{"weight": 5.0, "dimensions": {"length": 10, "width": 8, "height": 6}}, {"weight": 2.0}]
+    )
+
+def _option(service_code="FEDEX_GROUND"):
+    return RateOption(
+        carrier="fedex",
+        service_name="FedEx Ground",
+        service_tier=ServiceTier.GROUND_EOD,
+        cost=12.5,
+        estimated_delivery=datetime.now(),
+        transit_days=5,
+        service_code=service_code
+    )
+
+def _label_request(quote_id, **fields):
+    shipper = {"name": "Shipper", "street": "1 Main St", "city": "Memphis", "state": "TN", "zip_code": "38117"}
+    recipient = {"name": "Jane Doe", "street": "2 Oak St", "city": "Atlanta", "state": "GA", "zip_code": "30339"}
+    return LabelRequest(quote_id=quote_id, shipper=shipper, recipient=recipient, **fields)
+
+def test_quoted_label_request_takes_rated_shipment():
+    """Test a quote id supplies carrier, service and packages"""
+    store = QuoteStore()
+    cached = _option()
+    option = store.issue(_rate_request(), [cached])[0]
+
+    request = store.apply(_label_request(option.quote_id))
+
+    assert cached.quote_id is None
+    assert request.carrier == "fedex"
+    assert request.service_type == "FEDEX_GROUND"
+    assert [(package.weight, package.dimensions.length if package.dimensions else None) for package in request.get_packages()] == [(5.0, 10), (2.0, None)]
+
+def test_quote_must_match_request():
+    """Test unknown, expired and contradicted quotes are rejected"""
+    store = QuoteStore()
+    quote_id = store.issue(_rate_request(), [_option()])[0].quote_id
+
+    with pytest.raises(ValueError, match="not found"):
+        store.apply(_label_request("missing"))
+    with pytest.raises(ValueError, match="FEDEX_GROUND"):
+        store.apply(_label_request(quote_id, service_type="FEDEX_2_DAY", carrier="fedex"))
+    with pytest.raises(ValueError, match="Packages"):
+        store.apply(_label_request(quote_id, packages=[{"weight": 9.0}]))
+
+    expired = QuoteStore(ttl_seconds=0)
+    quote_id = expired.issue(_rate_request(), [_option()])[0].quote_id
+    with pytest.raises(ValueError, match="expired"):
+        expired.apply(_label_request(quote_id))
+
+def test_label_request_needs_quote_or_service():
+    """Test carrier and service may only be left out when quoting"""
+    with pytest.raises(ValueError):
+        _label_request(None, packages=[{"weight": 1.0}])
+
+def test_quote_ships_one_label():
+    """Test a quote is held during the carrier call, released on failure and used up on success"""
+    store = QuoteStore()
+    quote_id = store.issue(_rate_request(), [_option()])[0].quote_id
+    request = store.apply(_label_request(quote_id))
+    assert request.quote.option.cost == 12.5
+
+    store.reserve(quote_id)
+    with pytest.raises(ValueError, match="already being created"):
+        store.reserve(quote_id)
+    store.release(quote_id)
+
+    store.reserve(quote_id)
+    store.consume(quote_id)
+    with pytest.raises(ValueError, match="already used"):
+        store.apply(_label_request(quote_id))
+    with pytest.raises(ValueError, match="already used"):
+        store.reserve(quote_id)
+    # Still carried by the request it was applied to
+    assert request.quote.quote_id == quote_id
@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+from models.rate_request import RateRequest
+from models.rate_response import RateOption
+from rates.fedex_rates import FedExRateEngine
+from rates.rate_cache import RateCache
+from utils.service_normalizer import ServiceTier
+
+def _request(packages):
+    return RateRequest(origin_zip="90210", destination_zip="10001", packages=packages)
+
+def _option(cost=10.0):
+    return RateOption(
+        carrier="fedex",
+        service_name="FedEx Ground",
+        service_tier=ServiceTier.GROUND_EOD,
+        cost=cost,
+        estimated_delivery=datetime.now(),
+        transit_days=5
+    )
+
+def test_rate_request_requires_weight_or_packages():
+    """Test a rate request needs something to rate"""
+    with pytest.raises(ValueError):
+        RateRequest(origin_zip="90210", destination_zip="10001")
+
+    single = RateRequest(origin_zip="90210", destination_zip="10001", weight=5.0)
+    assert [package.weight for package in single.get_packages()] == [5.0]
+
+def test_shipment_cached_as_a_unit():
+    """Test the key covers every package but not their order"""
+    cache = RateCache()
+    boxes = [{"weight": 5.0}, {"weight": 7.0, "dimensions": {"length": 10, "width": 8, "height": 6}}]
+    cache.set("fedex", _request(boxes), [_option()])
+
+    assert cache.get("fedex", _request(list(reversed(boxes)))) is not None
+    assert cache.get("fedex", _request(boxes[:1])) is None
+    assert cache.get("ups", _request(boxes)) is None
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_fetch():
+    """Test identical quotes in flight only call the carrier once"""
+    cache = RateCache()
+    fetch = AsyncMock(return_value=[_option()])
+
+    results = await asyncio.gather(*[
+        cache.get_or_fetch("fedex", _request([{"weight": 5.0}]), fetch) for _ in range(5)
+    ])
+    await cache.get_or_fetch("fedex", _request([{"weight": 5.0}]), fetch)
+
+    assert fetch.await_count == 1
+    assert all(len(options) == 1 for options in results)
+
+@pytest.mark.asyncio
+async def test_entries_expire():
+    """Test stale quotes are fetched again"""
+    cache = RateCache(ttl_seconds=0.01)
+    fetch = AsyncMock(return_value=[_option()])
+
+    await cache.get_or_fetch("fedex", _request([{"weight": 5.0}]), fetch)
+    await asyncio.sleep(0.02)
+    await cache.get_or_fetch("fedex", _request([{"weight": 5.0}]), fetch)
+
+    assert fetch.await_count == 2
+
+@pytest.mark.asyncio
+async def test_fedex_rates_multiple_packages_in_one_call():
+    """Test a 6-box order is one FedEx request with six line items"""
+    engine = FedExRateEngine()
+    engine._account_number = "740561073"
+    response = MagicMock()
+    response.status_code = 200
+    response.json.return_value = {"output": {"rateReplyDetails": [{
+        "serviceType": "FEDEX_GROUND",
+        "serviceName": "FedEx Ground",
+        "ratedShipmentDetails": [{"totalNetCharge": 42.5, "currency": "USD"}]
+    }]}}
+
+    with patch.object(engine._auth, "get_token", new_callable=AsyncMock, return_value="test_token"), \
+         patch("httpx.AsyncClient.post", new_callable=AsyncMock, return_value=response) as mock_post:
+        options = await engine.get_rates(_request([{"weight": w} for w in range(1, 7)]))
+
+    mock_post.assert_awaited_once()
+    shipment = mock_post.call_args.kwargs["json"]["requestedShipment"]
+    assert shipment["totalPackageCount"] == 6
+    assert [item["weight"]["value"] for item in shipment["requestedPackageLineItems"]] == [1, 2, 3, 4, 5, 6]
+    assert options[0].cost == 42.5
@@ -0,0 +1,107 @@
+import httpx
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+from models.rate_request import RateRequest
+from rates.rate_service import RateService
+from rates.ups_rates import UPSRateEngine
+from utils.exceptions import RateError
+from utils.service_normalizer import ServiceTier
+
+UPS_ENV = {"UPS_CLIENT_ID": "client", "UPS_CLIENT_SECRET": "secret", "UPS_API_URL": "https://wwwcie.ups.com"}
+
+def _request():
+    return RateRequest(origin_zip="90210", destination_zip="10001", packages=[
+        {"weight": 5.0, "dimensions": {"length": 12, "width": 10, "height": 8}},
+        {"weight": 3.0}
+    ])
+
+def _response(status_code, body):
+    response = MagicMock()
+    response.status_code = status_code
+    response.json.return_value = body
+    if status_code >= 400:
+        response.raise_for_status.side_effect = httpx.HTTPStatusError("error", request=MagicMock(), response=response)
+    return response
+
+SHOP_RESPONSE = {"RateResponse": {"RatedShipment": [
+    {
+        "Service": {"Code": "03", "Description": ""},
+        "TotalCharges": {"CurrencyCode": "USD", "MonetaryValue": "18.20"},
+        "NegotiatedRateCharges": {"TotalCharge": {"CurrencyCode": "USD", "MonetaryValue": "15.75"}},
+        "TimeInTransit": {"PickupDate": "20261019", "ServiceSummary": {
+            "Service": {"Description": "UPS Ground"},
+            "EstimatedArrival": {"BusinessDaysInTransit": "4", "Arrival": {"Date": "20261023", "Time": "230000"}}
+        }}
+    },
+    {
+        "Service": {"Code": "01"},
+        "TotalCharges": {"CurrencyCode": "USD", "MonetaryValue": "92.10"},
+        "GuaranteedDelivery": {"BusinessDaysInTransit": "1"}
+    },
+    # International service we don't ship with
+    {"Service": {"Code": "65"}, "TotalCharges": {"MonetaryValue": "120.00"}},
+    # No charge returned
+    {"Service": {"Code": "12"}, "TotalCharges": {"CurrencyCode": "USD"}}
+]}}
+
+@pytest.mark.asyncio
+async def test_shop_request_parsed():
+    """Test one Shop call rates the shipment and odd entries are skipped, not fatal"""
+    with patch.dict("os.environ", UPS_ENV):
+        engine = UPSRateEngine()
+        with patch.object(engine._auth, "get_token", new_callable=AsyncMock, return_value="token"), \
+             patch("httpx.AsyncClient.post", new_callable=AsyncMock, return_value=_response(200, SHOP_RESPONSE)) as mock_post:
+            options = await engine.get_rates(_request())
+
+    mock_post.assert_awaited_once()
+    assert mock_post.call_args.args[0] == "https://wwwcie.ups.com/api/rating/v2409/Shoptimeintransit"
+    shipment = mock_post.call_args.kwargs["json"]["RateRequest"]["Shipment"]
+    assert len(shipment["Package"]) == 2
+    assert shipment["Package"][0]["Dimensions"]["Length"] == "12.0"
+    assert shipment["ShipmentTotalWeight"]["Weight"] == "8.0"
+
+    ground, next_day = options
+    assert ground.service_code == "03" and ground.service_name == "UPS Ground"
+    assert ground.service_tier == ServiceTier.GROUND_EOD
+    assert ground.cost == 15.75
+    assert ground.transit_days == 4
+    assert ground.estimated_delivery == datetime(2026, 10, 23, 23, 0)
+    assert next_day.service_name == "UPS Next Day Air"
+    assert next_day.cost == 92.10 and next_day.transit_days == 1
+
+def test_single_rated_shipment_object():
+    """Test older API versions returning one RatedShipment as an object"""
+    engine = UPSRateEngine()
+    options = engine._parse_rate_response({"RateResponse": {"RatedShipment": SHOP_RESPONSE["RateResponse"]["RatedShipment"][1]}})
+
+    assert [option.service_code for option in options] == ["01"]
+
+@pytest.mark.asyncio
+async def test_ups_error_reported():
+    """Test UPS's error message is surfaced as a RateError"""
+    error = {"response": {"errors": [{"code": "111210", "message": "The requested service is unavailable between the selected locations."}]}}
+    with patch.dict("os.environ", UPS_ENV):
+        engine = UPSRateEngine()
+        with patch.object(engine._auth, "get_token", new_callable=AsyncMock, return_value="token"), \
+             patch("httpx.AsyncClient.post", new_callable=AsyncMock, return_value=_response(400, error)):
+            with pytest.raises(RateError, match="111210"):
+                await engine.get_rates(_request())
+
+@pytest.mark.asyncio
+async def test_rate_service_shops_ups_alongside_fedex():
+    """Test UPS is shopped once enabled, and a FedEx failure doesn't lose its rates"""
+    with patch.dict("os.environ", UPS_ENV):
+        assert "ups" not in RateService()._engines
+    with patch.dict("os.environ", {**UPS_ENV, "ENABLE_UPS": "true"}):
+        service = RateService()
+    ups_options = UPSRateEngine()._parse_rate_response(SHOP_RESPONSE)
+
+    with patch.object(service._fedex_engine, "get_rates", new_callable=AsyncMock, side_effect=RateError("FedEx is down")), \
+         patch.object(service._ups_engine, "get_rates", new_callable=AsyncMock, return_value=ups_options):
+        result = await service.get_rates(_request())
+
+    assert {option.carrier for option in result.all_options} == {"ups"}
+    assert result.cheapest_option.cost == 15.75
+    # UPS labels can't be created yet, so UPS options aren't quoted
+    assert all(option.quote_id is None for option in result.all_options)
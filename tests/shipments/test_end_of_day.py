@@ -0,0 +1,111 @@
+import base64
+import csv
+import io
+import pytest
+from datetime import date, datetime
+from labels.label_storage import LabelStorage
+from models.label_request import LabelRequest
+from models.label_response import LabelResponse
+from shipments.end_of_day import EndOfDayCloser
+from shipments.shipment_store import ShipmentStore, shipment_record
+
+CLOSE_DATE = date(2026, 10, 19)
+
+class FakeCloseEngine:
+    def __init__(self, fail_accounts=()):
+        self.calls = []
+        self._fail_accounts = set(fail_accounts)
+
+    async def close_ground(self, account_number, close_date):
+        self.calls.append(account_number)
+        if account_number in self._fail_accounts:
+            raise ValueError("FedEx Close API error: account not enabled")
+        return [{"docType": "PDF", "encodedLabel": base64.b64encode(f"manifest {account_number}".encode()).decode()}]
+
+def _record(tracking_number, account_number, service_type="FEDEX_GROUND", carrier="fedex"):
+    address = {
+        "name": "Shipper Name",
+        "street": "123 Shipper Street",
+        "city": "Memphis",
+        "state": "TN",
+        "zip_code": "38117"
+    }
+    request = LabelRequest(
+        carrier=carrier,
+        shipper=address,
+        recipient={**address, "name": "Jane Doe", "zip_code": "30339"},
+        packages=[{"weight": 2.0}],
+        service_type=service_type
+    )
+    label = LabelResponse(tracking_number=tracking_number, label_url="", carrier=carrier, estimated_delivery=None)
+    return shipment_record(request, label, created_at=datetime(2026, 10, 19, 9), account_number=account_number)
+
+def _closer(tmp_path, engine):
+    store = ShipmentStore(path=str(tmp_path / "shipments.sqlite3"))
+    storage = LabelStorage(root=str(tmp_path / "labels"), index_path=str(tmp_path / "index.sqlite3"))
+    return EndOfDayCloser(store=store, engine=engine, storage=storage), store, storage
+
+def _manifest_rows(tmp_path, url):
+    path = tmp_path / "labels" / url[len("/static/labels/"):]
+    return list(csv.DictReader(io.StringIO(path.read_text())))
+
+@pytest.mark.asyncio
+async def test_one_close_call_per_account(tmp_path):
+    """Test open Ground shipments are closed with one call per account and one manifest"""
+    engine = FakeCloseEngine()
+    closer, store, _ = _closer(tmp_path, engine)
+    await store.record_many([
+        _record("A1", "111"),
+        _record("A2", "111"),
+        _record("B1", "222", service_type="GROUND_HOME_DELIVERY"),
+        _record("EXPRESS", "111", service_type="FEDEX_2_DAY"),
+        _record("UPS1", "111", carrier="ups"),
+    ])
+
+    report = await closer.close(CLOSE_DATE)
+
+    assert sorted(engine.calls) == ["111", "222"]
+    assert {close.account_number: close.tracking_numbers for close in report.closes} == {"111": ["A1", "A2"], "222": ["B1"]}
+    assert all(close.document_urls for close in report.closes)
+    assert [row["tracking_number"] for row in _manifest_rows(tmp_path, report.manifest_url)] == ["A1", "A2", "B1"]
+    assert (await store.get("A1")).closed_at is not None
+    assert (await store.get("EXPRESS")).closed_at is None
+
+@pytest.mark.asyncio
+async def test_rerun_is_idempotent(tmp_path):
+    """Test a second run replays the recorded closes without calling FedEx"""
+    engine = FakeCloseEngine()
+    closer, store, _ = _closer(tmp_path, engine)
+    await store.record_many([_record("A1", "111"), _record("B1", "222")])
+
+    first = await closer.close(CLOSE_DATE)
+    second = await closer.close(CLOSE_DATE)
+
+    assert len(engine.calls) == 2
+    assert all(close.replayed for close in second.closes)
+    assert second.manifest_url == first.manifest_url
+
+    # A late label is closed on its own and joins the same manifest
+    await store.record_many([_record("A3", "111")])
+    third = await closer.close(CLOSE_DATE)
+    assert engine.calls[2:] == ["111"]
+    assert [row["tracking_number"] for row in _manifest_rows(tmp_path, third.manifest_url)] == ["A1", "A3", "B1"]
+
+@pytest.mark.asyncio
+async def test_failed_account_reported_and_retried(tmp_path):
+    """Test one account's failure doesn't block the others and is retried next run"""
+    engine = FakeCloseEngine(fail_accounts={"222"})
+    closer, store, _ = _closer(tmp_path, engine)
+    await store.record_many([_record("A1", "111"), _record("B1", "222")])
+
+    report = await closer.close(CLOSE_DATE)
+
+    assert "account not enabled" in report.errors["222"]
+    assert [close.account_number for close in report.closes] == ["111"]
+    assert (await store.get("B1")).closed_at is None
+
+    engine._fail_accounts.clear()
+    retry = await closer.close(CLOSE_DATE)
+    assert retry.errors == {}
+    assert engine.calls.count("111") == 1
+    assert engine.calls.count("222") == 2
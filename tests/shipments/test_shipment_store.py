@@ -0,0 +1,118 @@
+import asyncio
+import sqlite3
+import pytest
+from datetime import date, datetime
+from models.label_request import LabelRequest
+from models.label_response import LabelResponse
+from shipments.shipment_store import ShipmentStore, shipment_record
+
+def _request(recipient_zip="30339", service_type="FEDEX_GROUND"):
+    address = {
+        "name": "Shipper Name",
+        "street": "123 Shipper Street",
+        "city": "Memphis",
+        "state": "TN",
+        "zip_code": "38117"
+    }
+    return LabelRequest(
+        carrier="fedex",
+        shipper=address,
+        recipient={**address, "name": "Jane Doe", "zip_code": recipient_zip},
+        packages=[{"weight": 2.0}, {"weight": 3.5}],
+        service_type=service_type
+    )
+
+def _label(tracking_number, carrier="fedex"):
+    return LabelResponse(
+        tracking_number=tracking_number,
+        label_url=f"/static/labels/{tracking_number}.pdf",
+        carrier=carrier,
+        estimated_delivery=None
+    )
+
+@pytest.mark.asyncio
+async def test_record_and_get(tmp_path):
+    """Test a stored shipment comes back with its label and summary"""
+    store = ShipmentStore(path=str(tmp_path / "shipments.sqlite3"))
+
+    await store.record(_request(), _label("TRK1"))
+    shipment = await store.get("TRK1")
+
+    assert shipment.package_count == 2
+    assert shipment.total_weight == 5.5
+    assert shipment.recipient_zip == "30339"
+    assert shipment.label.label_url == "/static/labels/TRK1.pdf"
+    assert await store.get("missing") is None
+
+@pytest.mark.asyncio
+async def test_concurrent_writes_share_a_transaction(tmp_path):
+    """Test queued shipments are committed in batches"""
+    store = ShipmentStore(path=str(tmp_path / "shipments.sqlite3"), batch_size=10)
+    inserts = []
+    original = store._insert
+    store._insert = lambda records: (inserts.append(len(records)), original(records))
+
+    await asyncio.gather(*[store.add(_request(), _label(f"TRK{i}")) for i in range(25)])
+
+    assert inserts == [10, 10, 5]
+    assert len(await store.find(limit=100)) == 25
+
+@pytest.mark.asyncio
+async def test_find_uses_filters(tmp_path):
+    """Test date, carrier and recipient ZIP filters"""
+    store = ShipmentStore(path=str(tmp_path / "shipments.sqlite3"))
+    yesterday = shipment_record(_request(), _label("OLD"), created_at=datetime(2026, 10, 18, 9))
+    await store.record_many([
+        yesterday,
+        shipment_record(_request(recipient_zip="10001"), _label("NYC"), created_at=datetime(2026, 10, 19, 9)),
+        shipment_record(_request(), _label("ATL"), created_at=datetime(2026, 10, 19, 10)),
+        shipment_record(_request(), _label("UPS1", carrier="ups"), created_at=datetime(2026, 10, 19, 11)),
+    ])
+
+    today = await store.find(ship_date=date(2026, 10, 19), carrier="fedex")
+    assert [shipment.tracking_number for shipment in today] == ["ATL", "NYC"]
+    assert [shipment.tracking_number for shipment in await store.find(recipient_zip="10001")] == ["NYC"]
+
+def test_database_uses_wal_and_indexes(tmp_path):
+    path = tmp_path / "shipments.sqlite3"
+    store = ShipmentStore(path=str(path))
+    store._insert([])
+
+    db = sqlite3.connect(str(path))
+    assert db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    indexes = {row[1] for row in db.execute("PRAGMA index_list(shipments)")}
+    assert {"idx_shipments_date", "idx_shipments_carrier_date", "idx_shipments_recipient_zip"} <= indexes
+
+def _recipient_request(name, city, company=None):
+    request = _request()
+    request.recipient.name = name
+    request.recipient.city = city
+    request.recipient.company = company
+    return request
+
+@pytest.mark.asyncio
+async def test_search_recipient_with_date_filter(tmp_path):
+    """Test "the box we sent to Smith in Tampa last week" """
+    store = ShipmentStore(path=str(tmp_path / "shipments.sqlite3"))
+    await store.record_many([
+        shipment_record(_recipient_request("John Smith", "Tampa"), _label("HIT"), created_at=datetime(2026, 10, 14, 9)),
+        shipment_record(_recipient_request("John Smith", "Tampa"), _label("TOO_OLD"), created_at=datetime(2026, 9, 1, 9)),
+        shipment_record(_recipient_request("Jane Smithers", "Orlando"), _label("OTHER_CITY"), created_at=datetime(2026, 10, 14, 9)),
+        shipment_record(_recipient_request("Ann Lee", "Tampa", company="Smith & Co."), _label("COMPANY"), created_at=datetime(2026, 10, 15, 9)),
+    ])
+
+    results = await store.search("smith, tampa!", date_from=date(2026, 10, 12), date_to=date(2026, 10, 18))
+
+    assert sorted(shipment.tracking_number for shipment in results) == ["COMPANY", "HIT"]
+    assert await store.search("  ") == []
+    assert [shipment.tracking_number for shipment in await store.search("smithers")] == ["OTHER_CITY"]
+
+@pytest.mark.asyncio
+async def test_search_index_follows_updates(tmp_path):
+    """Test re-recording a shipment replaces its indexed text"""
+    store = ShipmentStore(path=str(tmp_path / "shipments.sqlite3"))
+    await store.record(_recipient_request("John Smith", "Tampa"), _label("TRK1"))
+    await store.record(_recipient_request("John Brown", "Tampa"), _label("TRK1"))
+
+    assert await store.search("smith") == []
+    assert [shipment.tracking_number for shipment in await store.search("brown tampa")] == ["TRK1"]
@@ -0,0 +1,173 @@
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+from models.label_request import LabelRequest
+from models.label_response import LabelResponse
+from models.tracking import TrackingStatus
+from shipments.shipment_store import ShipmentStore, shipment_record
+from tracking.fedex_tracking import FedExTrackingEngine
+from tracking.tracking_poller import TrackingPoller
+
+class FakeTrackingEngine:
+    """Tracking engine whose statuses the test sets directly"""
+    batch_size = 30
+
+    def __init__(self):
+        self.calls = []
+        self.codes = {}
+
+    async def track(self, tracking_numbers):
+        self.calls.append(list(tracking_numbers))
+        return {
+            number: TrackingStatus(
+                tracking_number=number,
+                carrier="fedex",
+                status_code=self.codes.get(number, "IT"),
+                delivered=self.codes.get(number) == "DL",
+                checked_at=datetime.now()
+            )
+            for number in tracking_numbers
+        }
+
+@pytest.mark.asyncio
+async def test_polls_in_full_batches():
+    """Test 65 packages need three tracking calls"""
+    engine = FakeTrackingEngine()
+    poller = TrackingPoller({"fedex": engine})
+    for index in range(65):
+        poller.track("fedex", f"TRK{index}", now=0)
+
+    events = await poller.poll_due(now=0)
+
+    assert [len(call) for call in engine.calls] == [30, 30, 5]
+    assert len(events) == 65
+    assert poller.get_status("TRK0").status_code == "IT"
+
+@pytest.mark.asyncio
+async def test_only_changes_are_reported():
+    """Test unchanged statuses produce no events"""
+    engine = FakeTrackingEngine()
+    poller = TrackingPoller({"fedex": engine})
+    listener = AsyncMock()
+    poller.add_listener(listener)
+    poller.track("fedex", "TRK1", now=0)
+    poller.track("fedex", "TRK2", now=0)
+
+    await poller.poll_due(now=0)
+    engine.codes["TRK2"] = "OD"
+    events = await poller.poll_due(now=10 ** 6)
+
+    assert [event.tracking_number for event in events] == ["TRK2"]
+    assert events[0].previous_status_code == "IT"
+    assert listener.await_count == 2
+    assert listener.call_args.args[0] == events
+
+@pytest.mark.asyncio
+async def test_schedule_adapts_to_status():
+    """Test in-transit packages are polled more often than delivered ones"""
+    engine = FakeTrackingEngine()
+    poller = TrackingPoller({"fedex": engine})
+    engine.codes["TRK2"] = "DL"
+    poller.track("fedex", "TRK1", now=0)
+    poller.track("fedex", "TRK2", now=0)
+    await poller.poll_due(now=0)
+
+    engine.calls.clear()
+    await poller.poll_due(now=3600)
+
+    assert engine.calls == [["TRK1"]]
+
+@pytest.mark.asyncio
+async def test_unchanged_packages_back_off():
+    """Test polls without a change stretch the interval"""
+    engine = FakeTrackingEngine()
+    poller = TrackingPoller({"fedex": engine})
+    poller.track("fedex", "TRK1", now=0)
+    await poller.poll_due(now=0)
+    await poller.poll_due(now=1800)
+
+    engine.calls.clear()
+    await poller.poll_due(now=1800 + 1800)
+    assert engine.calls == []
+    await poller.poll_due(now=1800 + 3600)
+    assert engine.calls == [["TRK1"]]
+
+def test_unsupported_carrier_not_tracked():
+    poller = TrackingPoller({"fedex": FakeTrackingEngine()})
+    assert not poller.track("ups", "1Z999")
+    assert not poller.is_tracked("1Z999")
+
+@pytest.mark.asyncio
+async def test_fedex_track_response_parsing():
+    """Test FedEx Track results become statuses and errors are skipped"""
+    engine = FedExTrackingEngine()
+    response = MagicMock(status_code=200)
+    response.json.return_value = {"output": {"completeTrackResults": [
+        {
+            "trackingNumber": "794870153269",
+            "trackResults": [{
+                "latestStatusDetail": {
+                    "code": "DL",
+                    "derivedCode": "DL",
+                    "statusByLocale": "Delivered",
+                    "description": "Delivered",
+                    "scanLocation": {"city": "ATLANTA", "stateOrProvinceCode": "GA"}
+                },
+                "dateAndTimes": [{"type": "ACTUAL_DELIVERY", "dateTime": "2026-10-19T10:12:00-04:00"}]
+            }]
+        },
+        {
+            "trackingNumber": "000000000000",
+            "trackResults": [{"error": {"code": "TRACKING.TRACKINGNUMBER.NOTFOUND"}}]
+        }
+    ]}}
+
+    with patch.object(engine._auth, "get_token", new_callable=AsyncMock, return_value="test_token"), \
+         patch("httpx.AsyncClient.post", new_callable=AsyncMock, return_value=response) as mock_post:
+        statuses = await engine.track(["794870153269", "000000000000"])
+
+    assert len(mock_post.call_args.kwargs["json"]["trackingInfo"]) == 2
+    assert list(statuses) == ["794870153269"]
+    status = statuses["794870153269"]
+    assert status.delivered
+    assert status.location == "ATLANTA, GA"
+    assert status.event_time.day == 19
+
+@pytest.mark.asyncio
+async def test_stale_and_unknown_packages_dropped():
+    """Test packages never delivered or never found stop being polled"""
+    class NotFoundEngine(FakeTrackingEngine):
+        async def track(self, tracking_numbers):
+            statuses = await super().track(tracking_numbers)
+            return {number: status for number, status in statuses.items() if number != "MISSING"}
+
+    with patch.dict("os.environ", {"TRACKING_MAX_AGE_DAYS": "1", "TRACKING_MAX_NOT_FOUND_POLLS": "2"}):
+        poller = TrackingPoller({"fedex": NotFoundEngine()})
+    poller.track("fedex", "STALE", now=0)
+    poller.track("fedex", "MISSING", now=0)
+    poller.track("fedex", "RECENT", now=80000, shipped_at=80000)
+
+    await poller.poll_due(now=0)
+    assert poller.is_tracked("MISSING")
+    await poller.poll_due(now=20000)
+    await poller.poll_due(now=90000)
+
+    assert not poller.is_tracked("MISSING")
+    assert not poller.is_tracked("STALE")
+    assert poller.is_tracked("RECENT")
+
+@pytest.mark.asyncio
+async def test_reseeded_from_shipment_store(tmp_path):
+    """Test shipments from the last TRACKING_MAX_AGE_DAYS are tracked again after a restart"""
+    address = {"name": "Shipper", "street": "1 Main St", "city": "Memphis", "state": "TN", "zip_code": "38117"}
+    request = LabelRequest(carrier="fedex", shipper=address, recipient=address, package={"weight": 1.0}, service_type="FEDEX_GROUND")
+    store = ShipmentStore(path=str(tmp_path / "shipments.sqlite3"))
+    await store.record_many([
+        shipment_record(request, LabelResponse(tracking_number=tracking_number, label_url="/static/labels/x.pdf", carrier="fedex", estimated_delivery=None), created_at=created_at)
+        for tracking_number, created_at in (("RECENT", datetime.now()), ("OLD", datetime.now() - timedelta(days=60)))
+    ])
+
+    poller = TrackingPoller({"fedex": FakeTrackingEngine()})
+    assert await poller.reseed(store) == 1
+    assert poller.is_tracked("RECENT")
+    assert not poller.is_tracked("OLD")
@@ -0,0 +1,92 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+from models.tracking import TrackingEvent, TrackingStatus
+from tracking.tracking_push import TrackingPushHub
+
+def _event(tracking_number, code="IT"):
+    return TrackingEvent(
+        tracking_number=tracking_number,
+        carrier="fedex",
+        status=TrackingStatus(tracking_number=tracking_number, carrier="fedex", status_code=code, checked_at=datetime.now())
+    )
+
+def _posted_events(mock_post):
+    return [
+        [event["tracking_number"] for event in json.loads(call.kwargs["content"])["events"]]
+        for call in mock_post.call_args_list
+    ]
+
+@pytest.mark.asyncio
+async def test_webhook_receives_only_its_packages():
+    """Test each webhook gets the changes for its tracking numbers in one POST"""
+    hub = TrackingPushHub()
+    hub.register_webhook("https://example.com/a", ["TRK1", "TRK2"])
+    hub.register_webhook("https://example.com/b", ["TRK3"])
+
+    with patch("httpx.AsyncClient.post", new_callable=AsyncMock, return_value=MagicMock(status_code=200)) as mock_post:
+        await hub.publish([_event("TRK1"), _event("TRK2"), _event("TRK4")])
+        await hub.flush()
+
+    assert _posted_events(mock_post) == [["TRK1", "TRK2"]]
+    assert mock_post.call_args.args[0] == "https://example.com/a"
+
+@pytest.mark.asyncio
+async def test_events_batched_while_delivery_in_flight():
+    """Test changes arriving during a slow delivery go out together, latest only"""
+    hub = TrackingPushHub()
+    hub.register_webhook("https://example.com/a", ["TRK1", "TRK2"])
+    release = asyncio.Event()
+
+    async def slow_post(*args, **kwargs):
+        await release.wait()
+        return MagicMock(status_code=200)
+
+    with patch("httpx.AsyncClient.post", side_effect=slow_post) as mock_post:
+        await hub.publish([_event("TRK1")])
+        await asyncio.sleep(0)
+        await hub.publish([_event("TRK2")])
+        await hub.publish([_event("TRK2", "OD")])
+        release.set()
+        await hub.flush()
+
+    assert _posted_events(mock_post) == [["TRK1"], ["TRK2"]]
+    assert json.loads(mock_post.call_args.kwargs["content"])["events"][0]["status"]["status_code"] == "OD"
+
+@pytest.mark.asyncio
+async def test_failed_delivery_retried_and_signed():
+    """Test 5xx responses are retried and bodies carry an HMAC signature"""
+    hub = TrackingPushHub()
+    hub._backoff = 0.001
+    hub.register_webhook("https://example.com/a", ["TRK1"], secret="s3cret")
+    responses = [MagicMock(status_code=503), MagicMock(status_code=200)]
+
+    with patch("httpx.AsyncClient.post", new_callable=AsyncMock, side_effect=responses) as mock_post:
+        await hub.publish([_event("TRK1")])
+        await hub.flush()
+
+    assert mock_post.await_count == 2
+    body = mock_post.call_args.kwargs["content"]
+    expected = hmac.new(b"s3cret", body, hashlib.sha256).hexdigest()
+    assert mock_post.call_args.kwargs["headers"]["X-ShipVox-Signature"] == f"sha256={expected}"
+
+@pytest.mark.asyncio
+async def test_stream_receives_subscribed_changes():
+    """Test WebSocket streams get subscribed packages and drop the oldest when full"""
+    hub = TrackingPushHub()
+    hub._stream_queue_size = 2
+    queue = hub.open_stream(["TRK1"])
+    hub.subscribe_stream(queue, ["TRK2"])
+
+    await hub.publish([_event("TRK1"), _event("TRK3"), _event("TRK2"), _event("TRK1", "OD")])
+
+    assert [(event.tracking_number, event.status.status_code) for event in [queue.get_nowait(), queue.get_nowait()]] == [
+        ("TRK2", "IT"), ("TRK1", "OD")
+    ]
+    hub.close_stream(queue)
+    await hub.publish([_event("TRK1")])
+    assert queue.empty()
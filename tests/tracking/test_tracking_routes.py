@@ -0,0 +1,31 @@
+import pytest
+from starlette.websockets import WebSocketDisconnect
+from unittest.mock import patch
+from tracking.tracking_poller import get_tracking_poller
+
+def test_track_rejected_while_polling_disabled(client):
+    """Test packages aren't accepted for tracking when nothing would poll them"""
+    response = client.post("/api/tracking", json={"carrier": "fedex", "tracking_numbers": ["794870153269"]})
+
+    assert response.status_code == 503
+    assert "TRACKING_POLL_ENABLED" in response.json()["detail"]
+    assert not get_tracking_poller().is_tracked("794870153269")
+
+def test_track_accepted_while_polling(client):
+    """Test packages are tracked once the poller runs"""
+    poller = get_tracking_poller()
+    with patch.object(poller, "is_running", return_value=True):
+        response = client.post("/api/tracking", json={"carrier": "fedex", "tracking_numbers": ["794870153270"]})
+
+    assert response.json() == {"794870153270": True}
+    poller.untrack("794870153270")
+
+def test_push_subscriptions_rejected_while_polling_disabled(client):
+    """Test webhooks and streams that would never receive an event are refused"""
+    response = client.post("/api/tracking/webhooks", json={"url": "https://example.com/hooks", "tracking_numbers": ["794870153269"]})
+    assert response.status_code == 503
+
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect("/api/tracking/stream?tracking_numbers=794870153269") as websocket:
+            websocket.receive_json()
+    assert closed.value.code == 1013
@@ -120,6 +120,10 @@ def test_sh0473():
                 print(f"Native QR Code: {'Available' if data.get('native_qr_code_base64') else 'Not available'}")
                 print(f"Fallback QR Code URL: {data.get('fallback_qr_code_url', 'Not generated yet')}")
                 print(f"Estimated Delivery: {data.get('estimated_delivery')}")
+
+                # Per-piece labels of the multi-piece shipment
+                for i, piece in enumerate(data.get('pieces', [])):
+                    print(f"Package {i+1}: {piece['tracking_number']} - {piece['label_url']}")
                 
                 # Construct full URL for label
                 label_url = f"http://localhost:8000{data['label_url']}"
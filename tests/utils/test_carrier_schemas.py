@@ -0,0 +1,52 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from labels.fedex_ship import FedExShipEngine
+from models.label_request import LabelRequest
+from models.rate_request import RateRequest
+from rates.fedex_rates import FedExRateEngine
+from utils.carrier_schemas import FEDEX_SHIP_REQUEST, validate_request
+from utils.exceptions import ValidationError
+
+ADDRESS = {
+    "name": "Shipper Name",
+    "street": "123 Shipper Street",
+    "city": "Memphis",
+    "state": "TN",
+    "zip_code": "38117"
+}
+
+def _label_request():
+    return LabelRequest(
+        carrier="fedex",
+        shipper=ADDRESS,
+        recipient={**ADDRESS, "zip_code": "30339"},
+        service_type="FEDEX_GROUND",
+        package={"weight": 5.0}
+    )
+
+def test_ship_payload_matches_schema():
+    """Test the ship payload we build passes the FedEx ship schema"""
+    payload = FedExShipEngine()._prepare_ship_request(_label_request())
+    validate_request(FEDEX_SHIP_REQUEST, payload, "FedEx ship request")
+
+def test_invalid_ship_payload_names_field():
+    """Test a malformed ship payload is rejected with the offending field"""
+    payload = FedExShipEngine()._prepare_ship_request(_label_request())
+    payload["requestedShipment"]["requestedPackageLineItems"][0]["weight"]["value"] = "heavy"
+
+    with pytest.raises(ValidationError, match="requestedPackageLineItems"):
+        validate_request(FEDEX_SHIP_REQUEST, payload, "FedEx ship request")
+
+@pytest.mark.asyncio
+async def test_invalid_rate_request_not_sent():
+    """Test a rate payload failing the schema never reaches FedEx"""
+    engine = FedExRateEngine()
+    engine._account_number = None
+
+    with patch.object(engine._auth, "get_token", new_callable=AsyncMock, return_value="token") as get_token, \
+         patch("httpx.AsyncClient.post", new_callable=AsyncMock) as mock_post:
+        with pytest.raises(Exception, match="accountNumber"):
+            await engine.get_rates(RateRequest(origin_zip="90210", destination_zip="10001", packages=[{"weight": 5.0}]))
+
+    get_token.assert_not_awaited()
+    mock_post.assert_not_awaited()
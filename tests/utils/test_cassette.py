@@ -0,0 +1,97 @@
+import json
+import time
+import httpx
+import pytest
+from utils.cassette import CassetteTransport
+from utils.exceptions import CassetteError
+
+def _carrier_handler(calls):
+    """Fake carrier endpoint that counts calls"""
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        if request.url.path == "/oauth/token":
+            return httpx.Response(200, json={"access_token": "secret-token", "expires_in": 3600})
+        return httpx.Response(200, json={"output": {"call": len(calls)}})
+    return handler
+
+@pytest.mark.asyncio
+async def test_record_then_replay(tmp_path):
+    """Test that recorded exchanges replay without touching the network"""
+    cassette = tmp_path / "fedex.json"
+    calls = []
+
+    recorder = CassetteTransport(str(cassette), "record", transport=httpx.MockTransport(_carrier_handler(calls)))
+    async with httpx.AsyncClient(transport=recorder) as client:
+        first = await client.post("https://apis-sandbox.fedex.com/rate/v1/rates/quotes", json={"weight": 5})
+        second = await client.post("https://apis-sandbox.fedex.com/rate/v1/rates/quotes", json={"weight": 5})
+
+    assert len(calls) == 2
+    assert first.json() == {"output": {"call": 1}}
+    assert second.json() == {"output": {"call": 2}}
+
+    replayer = CassetteTransport(str(cassette), "replay")
+    async with httpx.AsyncClient(transport=replayer) as client:
+        replayed = [
+            (await client.post("https://apis-sandbox.fedex.com/rate/v1/rates/quotes", json={"weight": 5})).json()
+            for _ in range(3)
+        ]
+
+    # Responses come back in recorded order, the last one repeats
+    assert replayed == [{"output": {"call": 1}}, {"output": {"call": 2}}, {"output": {"call": 2}}]
+    assert len(calls) == 2
+
+@pytest.mark.asyncio
+async def test_credentials_and_dates_ignored(tmp_path):
+    """Test that secrets and ship dates don't affect matching and tokens are redacted"""
+    cassette = tmp_path / "fedex.json"
+    recorder = CassetteTransport(str(cassette), "record", transport=httpx.MockTransport(_carrier_handler([])))
+    async with httpx.AsyncClient(transport=recorder) as client:
+        await client.post("https://apis-sandbox.fedex.com/oauth/token", data={
+            "grant_type": "client_credentials", "client_id": "real-id", "client_secret": "real-secret"
+        })
+        await client.post("https://apis-sandbox.fedex.com/ship/v1/shipments", json={
+            "requestedShipment": {"shipDatestamp": "2025-05-09", "serviceType": "FEDEX_GROUND"}
+        })
+
+    recorded = cassette.read_text()
+    assert "real-secret" not in recorded
+    assert "secret-token" not in recorded
+
+    replayer = CassetteTransport(str(cassette), "replay")
+    async with httpx.AsyncClient(transport=replayer) as client:
+        token = await client.post("https://apis-sandbox.fedex.com/oauth/token", data={
+            "grant_type": "client_credentials", "client_id": "other-id", "client_secret": "other-secret"
+        })
+        ship = await client.post("https://apis-sandbox.fedex.com/ship/v1/shipments", json={
+            "requestedShipment": {"shipDatestamp": "2026-01-01", "serviceType": "FEDEX_GROUND"}
+        })
+
+    assert token.json()["access_token"] == "REDACTED"
+    assert ship.status_code == 200
+
+@pytest.mark.asyncio
+async def test_replay_miss_raises(tmp_path):
+    """Test that an unrecorded request fails instead of going to the network"""
+    cassette = tmp_path / "fedex.json"
+    cassette.write_text(json.dumps({"version": 1, "interactions": []}))
+
+    async with httpx.AsyncClient(transport=CassetteTransport(str(cassette), "replay")) as client:
+        with pytest.raises(CassetteError):
+            await client.get("https://apis-sandbox.fedex.com/rate/v1/rates/quotes")
+
+@pytest.mark.asyncio
+async def test_replay_latency(tmp_path):
+    """Test that recorded latency is replayed when requested"""
+    cassette = tmp_path / "fedex.json"
+    recorder = CassetteTransport(str(cassette), "record", transport=httpx.MockTransport(_carrier_handler([])))
+    async with httpx.AsyncClient(transport=recorder) as client:
+        await client.get("https://apis-sandbox.fedex.com/ping")
+
+    data = json.loads(cassette.read_text())
+    data["interactions"][0]["elapsed"] = 0.2
+    cassette.write_text(json.dumps(data))
+
+    async with httpx.AsyncClient(transport=CassetteTransport(str(cassette), "replay", replay_latency=True)) as client:
+        started = time.perf_counter()
+        await client.get("https://apis-sandbox.fedex.com/ping")
+        assert time.perf_counter() - started >= 0.2
@@ -0,0 +1,118 @@
+import smtplib
+import socket
+import pytest
+from utils.email_delivery import EmailDeliveryWorker, SMTPConnectionPool, build_label_email
+
+controller_module = pytest.importorskip("aiosmtpd.controller")
+
+class RecordingHandler:
+    """Collects delivered messages and the connection each arrived on"""
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((session.peer, envelope.rcpt_tos))
+        return "250 OK"
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    controller = controller_module.Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    yield handler, controller.port
+    controller.stop()
+
+@pytest.mark.asyncio
+async def test_batch_shares_connection_per_domain(smtp_server):
+    """Test queued messages are delivered over pooled connections"""
+    handler, port = smtp_server
+    worker = EmailDeliveryWorker(SMTPConnectionPool("127.0.0.1", port), batch_wait=0.05)
+
+    for index in range(4):
+        await worker.enqueue(build_label_email(f"user{index}@example.com", f"TRK{index}", "/static/labels/a.pdf"))
+    await worker.enqueue(build_label_email("ops@other.test", "TRK9", "/static/labels/b.pdf"))
+    await worker.flush()
+    await worker.shutdown()
+
+    assert worker.sent_count == 5
+    assert {rcpt for _, (rcpt,) in handler.messages} == {
+        "user0@example.com", "user1@example.com", "user2@example.com", "user3@example.com", "ops@other.test"
+    }
+    # One batch reuses the same pooled connection for both domains
+    assert len({peer for peer, _ in handler.messages}) == 1
+
+class FlakySMTP:
+    """SMTP stand-in that refuses the first connection attempts"""
+    attempts = 0
+    sent = []
+
+    def __init__(self, host, port, timeout=None):
+        FlakySMTP.attempts += 1
+        if FlakySMTP.attempts < 3:
+            raise ConnectionRefusedError("relay unavailable")
+
+    def send_message(self, message):
+        FlakySMTP.sent.append(message["To"])
+
+    def noop(self):
+        return (250, b"OK")
+
+    def quit(self):
+        pass
+
+@pytest.mark.asyncio
+async def test_transient_failures_retried_with_backoff():
+    """Test a refused connection is retried until it succeeds"""
+    pool = SMTPConnectionPool("relay.test", smtp_factory=FlakySMTP)
+    worker = EmailDeliveryWorker(pool, batch_wait=0, backoff=0.01)
+
+    await worker.enqueue(build_label_email("ops@example.com", "TRK1", "/static/labels/a.pdf"))
+    await worker.flush()
+    await worker.shutdown()
+
+    assert FlakySMTP.attempts == 3
+    assert FlakySMTP.sent == ["ops@example.com"]
+    assert worker.sent_count == 1
+
+class RejectingSMTP(FlakySMTP):
+    def __init__(self, host, port, timeout=None):
+        pass
+
+    def send_message(self, message):
+        raise smtplib.SMTPRecipientsRefused({message["To"]: (550, b"No such user")})
+
+@pytest.mark.asyncio
+async def test_permanent_rejection_not_retried():
+    """Test a 5xx recipient rejection is dropped instead of retried"""
+    worker = EmailDeliveryWorker(SMTPConnectionPool("relay.test", smtp_factory=RejectingSMTP), batch_wait=0, backoff=0.01)
+
+    await worker.enqueue(build_label_email("nobody@example.com", "TRK1", "/static/labels/a.pdf"))
+    await worker.flush()
+    await worker.shutdown()
+
+    assert worker.sent_count == 0
+    assert worker.failed_count == 1
+
+class DownSMTP(FlakySMTP):
+    def __init__(self, host, port, timeout=None):
+        raise ConnectionRefusedError("relay unavailable")
+
+@pytest.mark.asyncio
+async def test_shutdown_delivers_queued_messages(capsys):
+    """Test shutdown sends what is queued and reports what it had to drop"""
+    FlakySMTP.attempts, FlakySMTP.sent = 0, []
+    worker = EmailDeliveryWorker(SMTPConnectionPool("relay.test", smtp_factory=FlakySMTP), batch_wait=0, backoff=0.01)
+    await worker.enqueue(build_label_email("ops@example.com", "TRK1", "/static/labels/a.pdf"))
+    await worker.shutdown(timeout=1)
+    assert FlakySMTP.sent == ["ops@example.com"]
+
+    down = EmailDeliveryWorker(SMTPConnectionPool("relay.test", smtp_factory=DownSMTP), batch_wait=0, backoff=10)
+    await down.enqueue(build_label_email("ops@example.com", "TRK2", "/static/labels/a.pdf"))
+    await down.enqueue(build_label_email("ops@example.com", "TRK3", "/static/labels/a.pdf"))
+    await down.shutdown(timeout=0.05)
+    assert "Dropping 2 undelivered message(s)" in capsys.readouterr().out
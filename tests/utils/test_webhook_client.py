@@ -0,0 +1,42 @@
+import httpx
+import pytest
+from unittest.mock import AsyncMock, patch
+from utils.webhook_client import PublicHostTransport, check_webhook_url
+
+def _receiver(calls):
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(200)
+    return handler
+
+@pytest.mark.parametrize("url", [
+    "ftp://example.com/hook",
+    "file:///etc/passwd",
+    "http://127.0.0.1:8000/admin",
+    "http://169.254.169.254/latest/meta-data",
+    "https://10.0.0.5/hook",
+    "http://[::1]/hook",
+    "https:///hook"
+])
+def test_unsafe_urls_rejected(url):
+    """Test non-http(s) URLs and literal internal addresses are refused at registration"""
+    with pytest.raises(ValueError):
+        check_webhook_url(url)
+
+@pytest.mark.asyncio
+async def test_hostnames_resolved_before_delivery():
+    """Test a hostname resolving to an internal address is refused and a public one delivered"""
+    calls = []
+    transport = PublicHostTransport(httpx.MockTransport(_receiver(calls)))
+
+    async with httpx.AsyncClient(transport=transport) as client:
+        with patch("asyncio.base_events.BaseEventLoop.getaddrinfo", new_callable=AsyncMock,
+                   return_value=[(2, 1, 6, "", ("10.1.2.3", 443))]):
+            with pytest.raises(ValueError, match="not a public address"):
+                await client.post("https://hooks.internal.example/labels", json={})
+        with patch("asyncio.base_events.BaseEventLoop.getaddrinfo", new_callable=AsyncMock,
+                   return_value=[(2, 1, 6, "", ("93.184.216.34", 443))]):
+            response = await client.post("https://example.com/labels", json={})
+
+    assert response.status_code == 200
+    assert [str(request.url) for request in calls] == ["https://example.com/labels"]
@@ -0,0 +1,116 @@
+# Fedex Tracking
+# Batched status lookups through the FedEx Track API (/track/v1/trackingnumbers)
+
+import os
+import json
+import httpx
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from models.tracking import TrackingStatus
+from auth.fedex_auth import FedExAuth
+from utils.http_client import get_http_client
+
+# FedEx accepts at most 30 tracking numbers per Track request
+MAX_TRACKING_NUMBERS = 30
+
+class FedExTrackingEngine:
+    def __init__(self):
+        self._auth = FedExAuth()
+        self._base_url = os.environ.get('FEDEX_API_URL', 'https://apis-sandbox.fedex.com')
+        self._client = get_http_client()
+        self.batch_size = min(int(os.getenv('FEDEX_TRACK_BATCH_SIZE', str(MAX_TRACKING_NUMBERS))), MAX_TRACKING_NUMBERS)
+
+    async def track(self, tracking_numbers: List[str]) -> Dict[str, TrackingStatus]:
+        """
+        Latest status of up to batch_size packages in one call.
+
+        Args:
+            tracking_numbers: FedEx tracking numbers
+
+        Returns:
+            Dictionary of tracking number to status; numbers FedEx reports
+            an error for (e.g. not yet in the system) are left out
+
+        Raises:
+            ValueError: If the request fails as a whole
+        """
+        if len(tracking_numbers) > self.batch_size:
+            raise ValueError(f"At most {self.batch_size} tracking numbers per FedEx Track request")
+
+        token = await self._auth.get_token()
+        track_request = {
+            "includeDetailedScans": False,
+            "trackingInfo": [
+                {"trackingNumberInfo": {"trackingNumber": tracking_number}}
+                for tracking_number in tracking_numbers
+            ]
+        }
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+            "X-locale": "en_US"
+        }
+
+        try:
+            response = await self._client.post(
+                f"{self._base_url}/track/v1/trackingnumbers",
+                headers=headers,
+                json=track_request,
+                timeout=30.0
+            )
+        except httpx.TimeoutException:
+            raise ValueError("FedEx Track API request timed out")
+        except httpx.RequestError as e:
+            raise ValueError(f"FedEx Track API request error: {str(e)}")
+
+        if response.status_code != 200:
+            try:
+                error_message = json.dumps(response.json())
+            except Exception:
+                error_message = response.text or f"HTTP Error: {response.status_code}"
+            raise ValueError(f"FedEx Track API error: {error_message}")
+
+        statuses = {}
+        checked_at = datetime.now()
+        for complete in response.json().get("output", {}).get("completeTrackResults", []):
+            for result in complete.get("trackResults", [])[:1]:
+                if result.get("error"):
+                    continue
+                status = self._parse_track_result(complete.get("trackingNumber"), result, checked_at)
+                if status:
+                    statuses[status.tracking_number] = status
+        return statuses
+
+    @staticmethod
+    def _parse_track_result(tracking_number: Optional[str], result: dict, checked_at: datetime) -> Optional[TrackingStatus]:
+        tracking_number = tracking_number or result.get("trackingNumberInfo", {}).get("trackingNumber")
+        if not tracking_number:
+            return None
+
+        latest = result.get("latestStatusDetail", {})
+        scan_location = latest.get("scanLocation", {})
+        location = ", ".join(part for part in (scan_location.get("city"), scan_location.get("stateOrProvinceCode")) if part)
+
+        event_time = None
+        scan_events = result.get("scanEvents") or []
+        if scan_events and scan_events[0].get("date"):
+            event_time = scan_events[0]["date"]
+        else:
+            for date_and_time in result.get("dateAndTimes", []):
+                if date_and_time.get("type") in ("ACTUAL_DELIVERY", "ACTUAL_PICKUP") and date_and_time.get("dateTime"):
+                    event_time = date_and_time["dateTime"]
+                    break
+
+        status_code = latest.get("derivedCode") or latest.get("code")
+        return TrackingStatus(
+            tracking_number=tracking_number,
+            carrier="fedex",
+            status_code=status_code,
+            status=latest.get("statusByLocale"),
+            description=latest.get("description"),
+            location=location or None,
+            event_time=event_time,
+            delivered=status_code == "DL",
+            checked_at=checked_at
+        )
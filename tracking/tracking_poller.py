@@ -0,0 +1,248 @@
+# Tracking Poller
+# Polls carrier tracking APIs in full batches and reports only status changes
+
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from models.tracking import TrackingEvent, TrackingStatus
+from shipments.shipment_store import ShipmentStore, get_shipment_store
+from tracking.fedex_tracking import FedExTrackingEngine
+
+# Receives the status changes found by one poll
+TrackingListener = Callable[[List[TrackingEvent]], Awaitable[None]]
+
+# Status codes that mean the package is close to delivery and worth checking often
+OUT_FOR_DELIVERY_CODES = {"OD"}
+# Status codes from before the carrier has the package
+PRE_TRANSIT_CODES = {"OC", "IN"}
+
+class _Tracked:
+    def __init__(self, carrier: str, tracking_number: str, next_poll: float, shipped_at: float):
+        self.carrier = carrier
+        self.tracking_number = tracking_number
+        self.status: Optional[TrackingStatus] = None
+        self.next_poll = next_poll
+        self.shipped_at = shipped_at
+        self.unchanged_polls = 0
+        # Consecutive polls where the carrier didn't know the package
+        self.not_found_polls = 0
+        self.delivered_at: Optional[float] = None
+
+class TrackingPoller:
+    """
+    Keeps the latest carrier status of every tracked package.
+
+    Due packages are polled in batches of the carrier's maximum size (30 for
+    FedEx), most overdue first, with at most TRACKING_MAX_REQUESTS_PER_POLL
+    carrier calls per poll to stay within API quotas. The next poll of a
+    package depends on its status: out for delivery every
+    TRACKING_OUT_FOR_DELIVERY_INTERVAL_SECONDS, in transit every
+    TRACKING_IN_TRANSIT_INTERVAL_SECONDS, not yet picked up every
+    TRACKING_PRE_TRANSIT_INTERVAL_SECONDS. Each poll without a change
+    doubles the interval (up to 4x). Delivered packages are checked once a
+    day and dropped after TRACKING_DELIVERED_RETENTION_DAYS. Packages that
+    never get delivered are dropped TRACKING_MAX_AGE_DAYS after shipping,
+    and ones the carrier doesn't know after TRACKING_MAX_NOT_FOUND_POLLS
+    polls in a row. reseed() restores the recent shipments from the
+    shipment store after a restart.
+
+    Only changed statuses are reported, as TrackingEvents, to listeners
+    registered with add_listener().
+    """
+
+    def __init__(self, engines: Optional[Dict] = None):
+        self.engines = engines if engines is not None else {
+            "fedex": FedExTrackingEngine(),
+        }
+        self._pre_transit_interval = float(os.getenv('TRACKING_PRE_TRANSIT_INTERVAL_SECONDS', '7200'))
+        self._in_transit_interval = float(os.getenv('TRACKING_IN_TRANSIT_INTERVAL_SECONDS', '1800'))
+        self._out_for_delivery_interval = float(os.getenv('TRACKING_OUT_FOR_DELIVERY_INTERVAL_SECONDS', '900'))
+        self._delivered_interval = float(os.getenv('TRACKING_DELIVERED_INTERVAL_SECONDS', '86400'))
+        self._delivered_retention = float(os.getenv('TRACKING_DELIVERED_RETENTION_DAYS', '3')) * 86400
+        self._max_age = float(os.getenv('TRACKING_MAX_AGE_DAYS', '30')) * 86400
+        self._max_not_found = int(os.getenv('TRACKING_MAX_NOT_FOUND_POLLS', '10'))
+        self._max_requests = int(os.getenv('TRACKING_MAX_REQUESTS_PER_POLL', '20'))
+        self._tick = float(os.getenv('TRACKING_POLL_TICK_SECONDS', '60'))
+        self._tracked: Dict[str, _Tracked] = {}
+        self._listeners: List[TrackingListener] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def supports(self, carrier: str) -> bool:
+        return carrier in self.engines
+
+    def track(self, carrier: str, tracking_number: str, now: Optional[float] = None, shipped_at: Optional[float] = None) -> bool:
+        """
+        Start tracking a package; the first poll is due immediately.
+
+        Args:
+            shipped_at: When the package shipped, as a Unix timestamp;
+                defaults to now
+
+        Returns:
+            False if the carrier has no tracking engine
+        """
+        if not self.supports(carrier):
+            return False
+        if tracking_number not in self._tracked:
+            now = now if now is not None else time.time()
+            self._tracked[tracking_number] = _Tracked(carrier, tracking_number, now, shipped_at if shipped_at is not None else now)
+        return True
+
+    async def reseed(self, store: Optional[ShipmentStore] = None) -> int:
+        """
+        Track the shipments of the last TRACKING_MAX_AGE_DAYS again, e.g. after a restart.
+
+        Returns:
+            Number of packages tracked
+        """
+        store = store or get_shipment_store()
+        since = (datetime.now() - timedelta(seconds=self._max_age)).date()
+        records = await store.find(ship_date_from=since, limit=None)
+        tracked = sum(
+            self.track(record.carrier, record.tracking_number, shipped_at=record.created_at.timestamp())
+            for record in records
+        )
+        print(f"TrackingPoller: Reseeded {tracked} shipments from the shipment store")
+        return tracked
+
+    def untrack(self, tracking_number: str) -> None:
+        self._tracked.pop(tracking_number, None)
+
+    def get_status(self, tracking_number: str) -> Optional[TrackingStatus]:
+        """Latest known status, None if never tracked or not polled yet"""
+        tracked = self._tracked.get(tracking_number)
+        return tracked.status if tracked else None
+
+    def is_tracked(self, tracking_number: str) -> bool:
+        return tracking_number in self._tracked
+
+    def add_listener(self, listener: TrackingListener) -> None:
+        """Register a coroutine called with each poll's changes"""
+        self._listeners.append(listener)
+
+    async def poll_due(self, now: Optional[float] = None) -> List[TrackingEvent]:
+        """
+        Poll every package that is due.
+
+        Args:
+            now: Current time as a Unix timestamp
+
+        Returns:
+            Tracking events for packages whose status changed
+        """
+        now = now if now is not None else time.time()
+        self._expire(now)
+
+        batches = []
+        for carrier, engine in self.engines.items():
+            due = sorted(
+                (tracked for tracked in self._tracked.values() if tracked.carrier == carrier and tracked.next_poll <= now),
+                key=lambda tracked: tracked.next_poll
+            )
+            size = engine.batch_size
+            batches.extend((carrier, due[i:i + size]) for i in range(0, len(due), size))
+
+        results = await asyncio.gather(*[
+            self._poll_batch(carrier, batch, now) for carrier, batch in batches[:self._max_requests]
+        ])
+        events = [event for batch_events in results for event in batch_events]
+
+        if events:
+            for listener in self._listeners:
+                try:
+                    await listener(events)
+                except Exception as e:
+                    print(f"TrackingPoller: Listener failed: {str(e)}")
+        return events
+
+    def start(self) -> None:
+        """Poll in the background every TRACKING_POLL_TICK_SECONDS"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def shutdown(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.poll_due()
+            except Exception as e:
+                print(f"TrackingPoller: Poll failed: {str(e)}")
+            await asyncio.sleep(self._tick)
+
+    async def _poll_batch(self, carrier: str, batch: List[_Tracked], now: float) -> List[TrackingEvent]:
+        try:
+            statuses = await self.engines[carrier].track([tracked.tracking_number for tracked in batch])
+        except Exception as e:
+            print(f"TrackingPoller: {carrier} tracking batch of {len(batch)} failed: {str(e)}")
+            for tracked in batch:
+                tracked.next_poll = now + self._base_interval(tracked.status)
+            return []
+
+        events = []
+        for tracked in batch:
+            status = statuses.get(tracked.tracking_number)
+            previous = tracked.status
+            if status and (previous is None or status.signature() != previous.signature()):
+                events.append(TrackingEvent(
+                    tracking_number=tracked.tracking_number,
+                    carrier=carrier,
+                    previous_status_code=previous.status_code if previous else None,
+                    status=status
+                ))
+                tracked.unchanged_polls = 0
+            else:
+                tracked.unchanged_polls += 1
+                if not status:
+                    tracked.not_found_polls += 1
+
+            if status:
+                tracked.not_found_polls = 0
+                tracked.status = status
+                if status.delivered and tracked.delivered_at is None:
+                    tracked.delivered_at = now
+            tracked.next_poll = now + self._next_interval(tracked)
+        return events
+
+    def _base_interval(self, status: Optional[TrackingStatus]) -> float:
+        if status is None or status.status_code in PRE_TRANSIT_CODES:
+            return self._pre_transit_interval
+        if status.delivered:
+            return self._delivered_interval
+        if status.status_code in OUT_FOR_DELIVERY_CODES:
+            return self._out_for_delivery_interval
+        return self._in_transit_interval
+
+    def _next_interval(self, tracked: _Tracked) -> float:
+        base = self._base_interval(tracked.status)
+        if tracked.status and tracked.status.delivered:
+            return base
+        return base * min(2 ** tracked.unchanged_polls, 4)
+
+    def _expire(self, now: float) -> None:
+        for tracking_number, tracked in list(self._tracked.items()):
+            if tracked.delivered_at is not None:
+                expired = now - tracked.delivered_at > self._delivered_retention
+            else:
+                expired = now - tracked.shipped_at > self._max_age or tracked.not_found_polls >= self._max_not_found
+            if expired:
+                del self._tracked[tracking_number]
+
+_tracking_poller: Optional[TrackingPoller] = None
+
+def get_tracking_poller() -> TrackingPoller:
+    """Get the process-wide tracking poller"""
+    global _tracking_poller
+    if _tracking_poller is None:
+        _tracking_poller = TrackingPoller()
+    return _tracking_poller
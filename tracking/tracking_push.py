@@ -0,0 +1,162 @@
+# Tracking Push
+# Pushes tracking status changes to webhooks and WebSocket subscribers
+
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from models.tracking import TrackingEvent, WebhookSubscription
+from utils.webhook_client import check_webhook_url, get_webhook_client
+
+def _event_payload(event: TrackingEvent) -> dict:
+    return event.model_dump(mode="json") if hasattr(event, 'model_dump') else json.loads(event.json())
+
+class _Webhook:
+    def __init__(self, subscription: WebhookSubscription, secret: Optional[str]):
+        self.subscription = subscription
+        self.secret = secret
+        # Undelivered events, latest per tracking number
+        self.pending: "OrderedDict[str, TrackingEvent]" = OrderedDict()
+        self.task: Optional[asyncio.Task] = None
+
+class TrackingPushHub:
+    """
+    Fans tracking changes out to webhooks and WebSocket streams.
+
+    Register publish() as a TrackingPoller listener; it only ever sees
+    changed statuses, so subscribers only receive deltas.
+
+    Each webhook has its own delivery task. Events that pile up while a
+    delivery is in flight are sent together in the next POST (at most
+    TRACKING_WEBHOOK_BATCH_SIZE per request), keeping only the latest event
+    per tracking number. Failed deliveries (network errors and 5xx) are
+    retried with exponential backoff up to TRACKING_WEBHOOK_RETRIES times.
+    Webhooks are sent with the webhook client, which only reaches public
+    hosts.
+
+    WebSocket subscribers get a bounded queue of events; a subscriber that
+    falls TRACKING_STREAM_QUEUE_SIZE events behind loses the oldest ones.
+    """
+
+    def __init__(self):
+        self._batch_size = int(os.getenv('TRACKING_WEBHOOK_BATCH_SIZE', '100'))
+        self._retries = int(os.getenv('TRACKING_WEBHOOK_RETRIES', '5'))
+        self._backoff = float(os.getenv('TRACKING_WEBHOOK_BACKOFF_SECONDS', '1'))
+        self._stream_queue_size = int(os.getenv('TRACKING_STREAM_QUEUE_SIZE', '1000'))
+        self._webhooks: Dict[str, _Webhook] = {}
+        self._streams: Dict[asyncio.Queue, Set[str]] = {}
+
+    def register_webhook(self, url: str, tracking_numbers: Iterable[str], secret: Optional[str] = None) -> WebhookSubscription:
+        """
+        Raises:
+            ValueError: If the URL isn't a public http(s) URL
+        """
+        check_webhook_url(url)
+        subscription = WebhookSubscription(
+            subscription_id=uuid.uuid4().hex,
+            url=url,
+            tracking_numbers=list(dict.fromkeys(tracking_numbers)),
+            created_at=datetime.now()
+        )
+        self._webhooks[subscription.subscription_id] = _Webhook(subscription, secret)
+        return subscription
+
+    def unregister_webhook(self, subscription_id: str) -> bool:
+        webhook = self._webhooks.pop(subscription_id, None)
+        if webhook and webhook.task:
+            webhook.task.cancel()
+        return webhook is not None
+
+    def get_webhook(self, subscription_id: str) -> Optional[WebhookSubscription]:
+        webhook = self._webhooks.get(subscription_id)
+        return webhook.subscription if webhook else None
+
+    def open_stream(self, tracking_numbers: Iterable[str] = ()) -> asyncio.Queue:
+        """Queue receiving events for the given tracking numbers"""
+        queue = asyncio.Queue(maxsize=self._stream_queue_size)
+        self._streams[queue] = set(tracking_numbers)
+        return queue
+
+    def subscribe_stream(self, queue: asyncio.Queue, tracking_numbers: Iterable[str]) -> None:
+        self._streams.get(queue, set()).update(tracking_numbers)
+
+    def close_stream(self, queue: asyncio.Queue) -> None:
+        self._streams.pop(queue, None)
+
+    async def publish(self, events: List[TrackingEvent]) -> None:
+        """Hand changed statuses to subscribers; never waits on delivery"""
+        for webhook in self._webhooks.values():
+            watched = set(webhook.subscription.tracking_numbers)
+            matching = [event for event in events if event.tracking_number in watched]
+            if not matching:
+                continue
+            for event in matching:
+                webhook.pending.pop(event.tracking_number, None)
+                webhook.pending[event.tracking_number] = event
+            if webhook.task is None or webhook.task.done():
+                webhook.task = asyncio.create_task(self._deliver_webhook(webhook))
+
+        for queue, watched in self._streams.items():
+            for event in events:
+                if event.tracking_number not in watched:
+                    continue
+                if queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(event)
+
+    async def flush(self) -> None:
+        """Wait until every webhook has nothing left to deliver"""
+        tasks = [webhook.task for webhook in self._webhooks.values() if webhook.task]
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def shutdown(self) -> None:
+        for webhook in self._webhooks.values():
+            if webhook.task:
+                webhook.task.cancel()
+        await self.flush()
+
+    async def _deliver_webhook(self, webhook: _Webhook) -> None:
+        while webhook.pending:
+            batch = []
+            while webhook.pending and len(batch) < self._batch_size:
+                batch.append(webhook.pending.popitem(last=False)[1])
+
+            if not await self._post(webhook, batch):
+                print(f"TrackingPushHub: Dropping {len(batch)} event(s) for webhook {webhook.subscription.subscription_id}")
+
+    async def _post(self, webhook: _Webhook, batch: List[TrackingEvent]) -> bool:
+        body = json.dumps({"events": [_event_payload(event) for event in batch]}).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if webhook.secret:
+            signature = hmac.new(webhook.secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+            headers["X-ShipVox-Signature"] = f"sha256={signature}"
+
+        for attempt in range(self._retries):
+            try:
+                response = await get_webhook_client().post(webhook.subscription.url, content=body, headers=headers, timeout=10.0)
+                if response.status_code < 500:
+                    return True
+                print(f"TrackingPushHub: Webhook {webhook.subscription.url} returned {response.status_code}")
+            except ValueError as e:
+                print(f"TrackingPushHub: Webhook {webhook.subscription.url} refused: {str(e)}")
+                return False
+            except Exception as e:
+                print(f"TrackingPushHub: Webhook {webhook.subscription.url} failed: {str(e)}")
+            if attempt < self._retries - 1:
+                await asyncio.sleep(self._backoff * (2 ** attempt))
+        return False
+
+_push_hub: Optional[TrackingPushHub] = None
+
+def get_tracking_push_hub() -> TrackingPushHub:
+    """Get the process-wide push hub"""
+    global _push_hub
+    if _push_hub is None:
+        _push_hub = TrackingPushHub()
+    return _push_hub
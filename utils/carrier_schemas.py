@@ -0,0 +1,78 @@
+# Carrier Schemas
+# Request validators compiled once from the carrier API specs in API_Reference
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+import fastjsonschema
+
+from utils.exceptions import ValidationError
+
+SCHEMA_DIR = Path(os.getenv('CARRIER_SCHEMA_DIR', str(Path(__file__).resolve().parent.parent / 'API_Reference')))
+
+# (spec file, schema under components/schemas) per outbound request
+FEDEX_SHIP_REQUEST = ("Fedex/ship.json", "Full_Schema_Ship")
+# The rate spec's request body is a oneOf over sample payloads that overlap;
+# the full schema is the one that describes every field
+FEDEX_RATE_REQUEST = ("Fedex/rate.json", "Full_Schema_Quote_Rate")
+
+_validators: Dict[Tuple[str, str], Optional[Callable[[dict], dict]]] = {}
+_lock = threading.Lock()
+
+def get_validator(schema: Tuple[str, str]) -> Optional[Callable[[dict], dict]]:
+    """
+    Compiled validator for a carrier request schema.
+
+    Compiling a spec takes a few hundred milliseconds, so each one is
+    compiled once per process (warm them at startup with
+    compile_validators()); validating a payload then takes microseconds.
+
+    Returns:
+        Validator, or None if the spec isn't available
+    """
+    validator = _validators.get(schema, False)
+    if validator is not False:
+        return validator
+
+    with _lock:
+        if schema not in _validators:
+            spec_file, name = schema
+            path = SCHEMA_DIR / spec_file
+            if path.is_file():
+                spec = json.loads(path.read_text())
+                _validators[schema] = fastjsonschema.compile({
+                    "$ref": f"#/components/schemas/{name}",
+                    "components": spec["components"]
+                })
+            else:
+                print(f"CarrierSchemas: {path} not found, {name} requests won't be validated locally")
+                _validators[schema] = None
+    return _validators[schema]
+
+def validate_request(schema: Tuple[str, str], payload: dict, description: str) -> None:
+    """
+    Check an outbound carrier request against its API schema.
+
+    Disabled with CARRIER_SCHEMA_VALIDATION=false.
+
+    Raises:
+        ValidationError: With the offending field's path, e.g.
+            "FedEx ship request is invalid: data.accountNumber.value must be string"
+    """
+    if os.getenv('CARRIER_SCHEMA_VALIDATION', 'true').lower() != 'true':
+        return
+    validator = get_validator(schema)
+    if validator is None:
+        return
+    try:
+        validator(payload)
+    except fastjsonschema.JsonSchemaException as e:
+        raise ValidationError(f"{description} is invalid: {e.message}")
+
+def compile_validators() -> None:
+    """Compile every carrier request validator up front"""
+    for schema in (FEDEX_SHIP_REQUEST, FEDEX_RATE_REQUEST):
+        get_validator(schema)
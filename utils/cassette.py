@@ -0,0 +1,226 @@
+# Cassette
+# Record/replay transport for outbound carrier calls
+
+import asyncio
+import base64
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode
+
+import httpx
+
+from utils.exceptions import CassetteError
+
+# Request fields that change between runs (dates) or carry credentials.
+# They are left out of the match key so a cassette recorded once replays
+# on any day and with any set of credentials.
+IGNORED_REQUEST_FIELDS = {"shipDatestamp", "client_id", "client_secret", "refresh_token"}
+
+# Response fields that are blanked before a cassette is written to disk
+REDACTED_RESPONSE_FIELDS = {"access_token", "refresh_token"}
+
+# Headers that describe the wire encoding rather than the decoded body we store
+DROPPED_RESPONSE_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport that records carrier exchanges to a JSON cassette and
+    replays them deterministically.
+
+    In "record" mode every request is forwarded to the wrapped transport and
+    the exchange (status, headers, body and latency) is appended to the
+    cassette. In "replay" mode no network access happens: requests are matched
+    by method, URL and canonical body, and the recorded responses are returned
+    in the order they were recorded, optionally after sleeping for the
+    recorded latency.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        mode: str = "replay",
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        replay_latency: bool = False
+    ):
+        if mode not in ("record", "replay"):
+            raise CassetteError(f"Unknown cassette mode: {mode}")
+        if mode == "record" and transport is None:
+            raise CassetteError("Record mode requires an underlying transport")
+
+        self._path = Path(path)
+        self._mode = mode
+        self._transport = transport
+        self._replay_latency = replay_latency
+        self._interactions: List[Dict] = []
+        self._positions: Dict[str, int] = {}
+        self._lock = asyncio.Lock()
+
+        if mode == "replay":
+            self._interactions = self._load()
+
+    @property
+    def mode(self) -> str:
+        return self._mode
+
+    @property
+    def interactions(self) -> List[Dict]:
+        return list(self._interactions)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        key = self._request_key(request)
+
+        if self._mode == "replay":
+            return await self._replay(request, key)
+        return await self._record(request, key)
+
+    async def aclose(self) -> None:
+        if self._transport is not None:
+            await self._transport.aclose()
+
+    async def _record(self, request: httpx.Request, key: str) -> httpx.Response:
+        started = time.perf_counter()
+        response = await self._transport.handle_async_request(request)
+        content = await response.aread()
+        elapsed = time.perf_counter() - started
+        await response.aclose()
+
+        headers = [
+            (name, value) for name, value in response.headers.multi_items()
+            if name.lower() not in DROPPED_RESPONSE_HEADERS
+        ]
+        interaction = {
+            "key": key,
+            "request": {
+                "method": request.method,
+                "url": str(request.url),
+                "body": self._canonical_body(request)
+            },
+            "response": {
+                "status_code": response.status_code,
+                "headers": headers,
+                **self._encode_body(content, headers)
+            },
+            "elapsed": round(elapsed, 6)
+        }
+
+        async with self._lock:
+            self._interactions.append(interaction)
+            await asyncio.to_thread(self._save)
+
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=headers,
+            content=content,
+            request=request
+        )
+
+    async def _replay(self, request: httpx.Request, key: str) -> httpx.Response:
+        async with self._lock:
+            matches = [i for i in self._interactions if i["key"] == key]
+            if not matches:
+                raise CassetteError(
+                    f"No recorded exchange for {request.method} {request.url} in {self._path}"
+                )
+            # Replay in recorded order and keep serving the last one once exhausted
+            position = self._positions.get(key, 0)
+            interaction = matches[min(position, len(matches) - 1)]
+            self._positions[key] = position + 1
+
+        if self._replay_latency and interaction.get("elapsed"):
+            await asyncio.sleep(interaction["elapsed"])
+
+        recorded = interaction["response"]
+        if "base64" in recorded:
+            content = base64.b64decode(recorded["base64"])
+        else:
+            content = recorded.get("text", "").encode("utf-8")
+
+        return httpx.Response(
+            status_code=recorded["status_code"],
+            headers=recorded["headers"],
+            content=content,
+            request=request
+        )
+
+    def _load(self) -> List[Dict]:
+        """Load recorded interactions from the cassette file"""
+        if not self._path.exists():
+            raise CassetteError(f"Cassette not found: {self._path}")
+        try:
+            with open(self._path, "r", encoding="utf-8") as f:
+                return json.load(f).get("interactions", [])
+        except (OSError, ValueError) as e:
+            raise CassetteError(f"Error loading cassette {self._path}: {str(e)}")
+
+    def _save(self) -> None:
+        """Write all recorded interactions to the cassette file"""
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._path.with_suffix(self._path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "interactions": self._interactions}, f, indent=2)
+        tmp_path.replace(self._path)
+
+    @classmethod
+    def _request_key(cls, request: httpx.Request) -> str:
+        """Build the match key for a request"""
+        body_hash = hashlib.sha256(cls._canonical_body(request).encode("utf-8")).hexdigest()
+        return f"{request.method} {request.url} {body_hash}"
+
+    @classmethod
+    def _canonical_body(cls, request: httpx.Request) -> str:
+        """Normalize a request body so volatile and secret fields don't affect matching"""
+        content = request.content
+        if not content:
+            return ""
+
+        content_type = request.headers.get("content-type", "")
+        if "json" in content_type:
+            try:
+                data = cls._strip_fields(json.loads(content), IGNORED_REQUEST_FIELDS)
+                return json.dumps(data, sort_keys=True, separators=(",", ":"))
+            except ValueError:
+                pass
+        elif "x-www-form-urlencoded" in content_type:
+            pairs = parse_qsl(content.decode("utf-8"), keep_blank_values=True)
+            return urlencode(sorted(
+                (name, value) for name, value in pairs if name not in IGNORED_REQUEST_FIELDS
+            ))
+
+        return content.decode("utf-8", errors="replace")
+
+    @classmethod
+    def _strip_fields(cls, data, fields: set, replacement=None):
+        """Recursively drop (or replace) the given keys from JSON data"""
+        if isinstance(data, dict):
+            result = {}
+            for key, value in data.items():
+                if key in fields:
+                    if replacement is not None:
+                        result[key] = replacement
+                    continue
+                result[key] = cls._strip_fields(value, fields, replacement)
+            return result
+        if isinstance(data, list):
+            return [cls._strip_fields(item, fields, replacement) for item in data]
+        return data
+
+    @classmethod
+    def _encode_body(cls, content: bytes, headers: List) -> Dict:
+        """Store text bodies readably (with tokens redacted) and anything else as base64"""
+        content_type = next((v for k, v in headers if k.lower() == "content-type"), "")
+        try:
+            text = content.decode("utf-8")
+        except UnicodeDecodeError:
+            return {"base64": base64.b64encode(content).decode("ascii")}
+
+        if "json" in content_type:
+            try:
+                data = cls._strip_fields(json.loads(text), REDACTED_RESPONSE_FIELDS, "REDACTED")
+                text = json.dumps(data)
+            except ValueError:
+                pass
+        return {"text": text}
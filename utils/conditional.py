@@ -0,0 +1,16 @@
+# Conditional Requests
+# If-None-Match handling shared by the label file and QR code endpoints
+
+from fastapi import Request
+
+def not_modified(request: Request, etag: str) -> bool:
+    """
+    Whether the client's cached copy is current, so a 304 can be sent.
+
+    If-None-Match may list several tags and mark them weak (W/); they are
+    compared weakly, as RFC 9110 requires for this header. "*" matches
+    any ETag.
+    """
+    if_none_match = request.headers.get("if-none-match", "")
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag.removeprefix("W/") in tags or if_none_match.strip() == "*"
@@ -1,12 +1,15 @@
-
+import asyncio
+import os
 import smtplib
+import threading
+from collections import defaultdict
 from email.message import EmailMessage
-from typing import Optional
+from typing import Callable, Dict, List, Optional, Tuple
 
-def send_label_email(to_email: str, tracking_number: str, label_url: str, qr_code_url: Optional[str] = None):
+def build_label_email(to_email: str, tracking_number: str, label_url: str, qr_code_url: Optional[str] = None) -> EmailMessage:
     msg = EmailMessage()
     msg["Subject"] = f"Your Shipping Label – Tracking #{tracking_number}"
-    msg["From"] = "no-reply@shipvox.ai"
+    msg["From"] = os.getenv('EMAIL_FROM', "no-reply@shipvox.ai")
     msg["To"] = to_email
 
     body = f"""
@@ -22,6 +25,287 @@ Label URL: {label_url}
     body += "\nThanks for using ShipVox!"
 
     msg.set_content(body)
+    return msg
+
+async def send_label_email(to_email: str, tracking_number: str, label_url: str, qr_code_url: Optional[str] = None) -> None:
+    """Queue a label email; delivery happens on the background email worker"""
+    await get_email_worker().enqueue(build_label_email(to_email, tracking_number, label_url, qr_code_url))
+
+class SMTPConnectionPool:
+    """
+    Reusable SMTP connections to one relay.
+
+    Connections are checked with NOOP before reuse and at most max_idle are
+    kept open. All methods block and are meant to be called from worker
+    threads.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int = 25,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        starttls: bool = False,
+        max_idle: int = 4,
+        smtp_factory: Callable[..., smtplib.SMTP] = smtplib.SMTP
+    ):
+        self._host = host
+        self._port = port
+        self._username = username
+        self._password = password
+        self._starttls = starttls
+        self._max_idle = max_idle
+        self._smtp_factory = smtp_factory
+        self._idle: List[smtplib.SMTP] = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> smtplib.SMTP:
+        """Get a live connection, reusing an idle one if it still answers"""
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                return self._connect()
+            try:
+                if conn.noop()[0] == 250:
+                    return conn
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.discard(conn)
+
+    def release(self, conn: smtplib.SMTP) -> None:
+        """Return a healthy connection to the pool"""
+        with self._lock:
+            if len(self._idle) < self._max_idle:
+                self._idle.append(conn)
+                return
+        self.discard(conn)
+
+    def discard(self, conn: smtplib.SMTP) -> None:
+        """Close a connection that shouldn't be reused"""
+        try:
+            conn.quit()
+        except (smtplib.SMTPException, OSError):
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def close_all(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self.discard(conn)
+
+    def _connect(self) -> smtplib.SMTP:
+        conn = self._smtp_factory(self._host, self._port, timeout=30)
+        if self._starttls:
+            conn.starttls()
+        if self._username:
+            conn.login(self._username, self._password or "")
+        return conn
+
+class EmailDeliveryWorker:
+    """
+    Background email delivery with batching and retries.
+
+    Messages are queued by enqueue() and never sent on the caller's path. The
+    worker collects up to EMAIL_BATCH_SIZE messages (waiting at most
+    EMAIL_BATCH_WAIT_SECONDS), groups them by recipient domain and sends each
+    group over one pooled SMTP connection in a worker thread. Transient
+    failures (connection errors, 4xx replies) are retried with exponential
+    backoff up to EMAIL_MAX_RETRIES times; permanent rejections are dropped.
+    Without SMTP_HOST configured messages are only logged. shutdown() first
+    delivers what is queued, for at most EMAIL_SHUTDOWN_SECONDS.
+    """
+
+    def __init__(
+        self,
+        pool: Optional[SMTPConnectionPool] = None,
+        batch_size: Optional[int] = None,
+        batch_wait: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        backoff: Optional[float] = None
+    ):
+        self._pool = pool if pool is not None else self._pool_from_env()
+        self._batch_size = batch_size or int(os.getenv('EMAIL_BATCH_SIZE', '50'))
+        self._batch_wait = batch_wait if batch_wait is not None else float(os.getenv('EMAIL_BATCH_WAIT_SECONDS', '0.5'))
+        self._max_retries = max_retries if max_retries is not None else int(os.getenv('EMAIL_MAX_RETRIES', '5'))
+        self._backoff = backoff if backoff is not None else float(os.getenv('EMAIL_RETRY_BACKOFF_SECONDS', '2'))
+        self._shutdown_timeout = float(os.getenv('EMAIL_SHUTDOWN_SECONDS', '10'))
+        # Messages queued and neither delivered nor given up on yet
+        self._outstanding = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._retry_tasks = set()
+        self.sent_count = 0
+        self.failed_count = 0
+
+    @staticmethod
+    def _pool_from_env() -> Optional[SMTPConnectionPool]:
+        host = os.getenv('SMTP_HOST')
+        if not host:
+            return None
+        return SMTPConnectionPool(
+            host=host,
+            port=int(os.getenv('SMTP_PORT', '25')),
+            username=os.getenv('SMTP_USERNAME'),
+            password=os.getenv('SMTP_PASSWORD'),
+            starttls=os.getenv('SMTP_STARTTLS', 'false').lower() == 'true',
+            max_idle=int(os.getenv('SMTP_POOL_SIZE', '4'))
+        )
+
+    async def enqueue(self, message: EmailMessage) -> None:
+        """Queue a message for delivery without waiting for it to be sent"""
+        self._start()
+        self._outstanding += 1
+        self._queue.put_nowait((message, 0))
+
+    async def flush(self) -> None:
+        """Wait until every queued message has been delivered or given up on"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def shutdown(self, timeout: Optional[float] = None) -> None:
+        """
+        Deliver queued messages, then stop the worker and close pooled connections.
+
+        Args:
+            timeout: Seconds to wait for delivery, defaults to
+                EMAIL_SHUTDOWN_SECONDS; messages still queued after that are
+                dropped
+        """
+        try:
+            await asyncio.wait_for(self.flush(), timeout if timeout is not None else self._shutdown_timeout)
+        except asyncio.TimeoutError:
+            pass
+        if self._outstanding:
+            print(f"EmailDeliveryWorker: Dropping {self._outstanding} undelivered message(s) at shutdown")
+        self._outstanding = 0
+        for task in [self._task, *self._retry_tasks]:
+            if task:
+                task.cancel()
+        await asyncio.gather(*[t for t in [self._task, *self._retry_tasks] if t], return_exceptions=True)
+        self._task = None
+        self._queue = None
+        self._retry_tasks.clear()
+        if self._pool:
+            await asyncio.to_thread(self._pool.close_all)
+
+    def _start(self) -> None:
+        if self._task is None or self._task.done():
+            self._queue = self._queue or asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            # Gather whatever else arrives shortly so it can share connections
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self._batch_wait
+            while len(batch) < self._batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            by_domain: Dict[str, List[Tuple[EmailMessage, int]]] = defaultdict(list)
+            for item in batch:
+                by_domain[self._domain(item[0])].append(item)
+
+            for domain, items in by_domain.items():
+                await self._send_group(domain, items)
+
+    async def _send_group(self, domain: str, items: List[Tuple[EmailMessage, int]]) -> None:
+        # Messages handed to a retry stay outstanding so flush() waits for them too
+        pending_retry = 0
+        try:
+            if self._pool is None:
+                for message, _ in items:
+                    # Stub only: configure SMTP_HOST (or an email provider relay) for real delivery
+                    print(f"Email would be sent to {message['To']} with subject: '{message['Subject']}'")
+                delivered, retry = len(items), []
+            else:
+                delivered, retry = await asyncio.to_thread(self._deliver, items)
+            self.sent_count += delivered
+
+            retry_now = [(message, attempt + 1) for message, attempt in retry if attempt < self._max_retries]
+            self.failed_count += len(retry) - len(retry_now)
+            if retry_now:
+                delay = self._backoff * (2 ** retry[0][1])
+                print(f"EmailDeliveryWorker: Retrying {len(retry_now)} message(s) to {domain} in {delay}s")
+                task = asyncio.create_task(self._requeue_later(retry_now, delay))
+                self._retry_tasks.add(task)
+                task.add_done_callback(self._retry_tasks.discard)
+                pending_retry = len(retry_now)
+        finally:
+            self._outstanding -= len(items) - pending_retry
+            for _ in range(len(items) - pending_retry):
+                self._queue.task_done()
+
+    def _deliver(self, items: List[Tuple[EmailMessage, int]]) -> Tuple[int, List[Tuple[EmailMessage, int]]]:
+        """
+        Send a domain's messages over one connection (runs in a worker thread).
+
+        Returns:
+            Tuple of (messages delivered, messages to retry)
+        """
+        delivered = 0
+        try:
+            conn = self._pool.acquire()
+        except (smtplib.SMTPException, OSError) as e:
+            print(f"EmailDeliveryWorker: SMTP connection failed: {str(e)}")
+            return 0, items
+
+        for index, (message, attempt) in enumerate(items):
+            try:
+                conn.send_message(message)
+                delivered += 1
+            except smtplib.SMTPRecipientsRefused as e:
+                if self._is_transient(e.recipients):
+                    return delivered, self._release_and_retry(conn, items[index:])
+                print(f"EmailDeliveryWorker: Dropping message to {message['To']}: {e.recipients}")
+                self.failed_count += 1
+            except smtplib.SMTPResponseException as e:
+                if 400 <= e.smtp_code < 500:
+                    return delivered, self._release_and_retry(conn, items[index:])
+                print(f"EmailDeliveryWorker: Dropping message to {message['To']}: {e.smtp_code} {e.smtp_error}")
+                self.failed_count += 1
+            except (smtplib.SMTPException, OSError) as e:
+                print(f"EmailDeliveryWorker: SMTP error: {str(e)}")
+                self._pool.discard(conn)
+                return delivered, items[index:]
+
+        self._pool.release(conn)
+        return delivered, []
+
+    def _release_and_retry(self, conn: smtplib.SMTP, items: List[Tuple[EmailMessage, int]]) -> List[Tuple[EmailMessage, int]]:
+        self._pool.release(conn)
+        return items
+
+    async def _requeue_later(self, items: List[Tuple[EmailMessage, int]], delay: float) -> None:
+        await asyncio.sleep(delay)
+        for item in items:
+            self._queue.put_nowait(item)
+            self._queue.task_done()
+
+    @staticmethod
+    def _is_transient(recipients: Dict) -> bool:
+        return all(400 <= code < 500 for code, _ in recipients.values())
+
+    @staticmethod
+    def _domain(message: EmailMessage) -> str:
+        return str(message["To"] or "").rsplit("@", 1)[-1].strip(" >").lower()
+
+_email_worker: Optional[EmailDeliveryWorker] = None
 
-    # Stub only: In production, configure SMTP or email provider (SendGrid, SES, etc.)
-    print(f"Email would be sent to {to_email} with subject: '{msg['Subject']}'")
+def get_email_worker() -> EmailDeliveryWorker:
+    """Get the process-wide email delivery worker"""
+    global _email_worker
+    if _email_worker is None:
+        _email_worker = EmailDeliveryWorker()
+    return _email_worker
@@ -26,3 +26,19 @@ class ConfigurationError(ShipVoxBaseException):
 class RateError(ShipVoxBaseException):
     """Rate calculation related errors"""
     pass
+
+class CassetteError(ShipVoxBaseException):
+    """Record/replay cassette errors (e.g. no recorded exchange for a request)"""
+    pass
+
+class IdempotencyError(ShipVoxBaseException):
+    """Idempotency key reused with a different request"""
+    pass
+
+class ShipmentRejectedError(ValueError):
+    """
+    Carrier definitively rejected a shipment (4xx or failed schema check),
+    as opposed to a timeout, connection or auth failure. A ValueError so
+    label routes still answer 400.
+    """
+    pass
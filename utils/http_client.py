@@ -0,0 +1,51 @@
+# Http Client
+# Shared, pooled HTTP client for outbound carrier calls
+
+import os
+from typing import Optional
+
+import httpx
+
+from utils.cassette import CassetteTransport
+
+_client: Optional[httpx.AsyncClient] = None
+
+def create_transport() -> httpx.AsyncBaseTransport:
+    """
+    Build the transport used for all carrier traffic.
+
+    Connection pooling is configured from HTTP_MAX_CONNECTIONS and
+    HTTP_MAX_KEEPALIVE. When SHIPVOX_CASSETTE_MODE is "record" or "replay"
+    the pooled transport is wrapped in a CassetteTransport backed by
+    SHIPVOX_CASSETTE_PATH; SHIPVOX_CASSETTE_LATENCY=true replays the
+    recorded latency as well.
+    """
+    limits = httpx.Limits(
+        max_connections=int(os.getenv('HTTP_MAX_CONNECTIONS', '100')),
+        max_keepalive_connections=int(os.getenv('HTTP_MAX_KEEPALIVE', '20'))
+    )
+    transport = httpx.AsyncHTTPTransport(limits=limits)
+
+    mode = os.getenv('SHIPVOX_CASSETTE_MODE', '').lower()
+    if mode in ('record', 'replay'):
+        return CassetteTransport(
+            path=os.getenv('SHIPVOX_CASSETTE_PATH', 'tests/cassettes/carriers.json'),
+            mode=mode,
+            transport=transport,
+            replay_latency=os.getenv('SHIPVOX_CASSETTE_LATENCY', 'false').lower() == 'true'
+        )
+    return transport
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the process-wide pooled client, creating it on first use"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(transport=create_transport(), timeout=30.0)
+    return _client
+
+async def close_http_client() -> None:
+    """Close the shared client and release pooled connections"""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
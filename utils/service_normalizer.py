@@ -40,19 +40,19 @@ class ServiceNormalizer:
             },
             "ups": {
                 # Next Business Day services
-                "01": ServiceTier.DAY1_AM,      # UPS Next Day Air Early
-                "02": ServiceTier.DAY1_NOON,    # UPS Next Day Air
+                "14": ServiceTier.DAY1_AM,      # UPS Next Day Air Early
+                "01": ServiceTier.DAY1_NOON,    # UPS Next Day Air
                 "13": ServiceTier.DAY1_EOD,     # UPS Next Day Air Saver
 
                 # 2-Day services
                 "59": ServiceTier.DAY2_AM,      # UPS 2nd Day Air A.M.
-                "02DA": ServiceTier.DAY2_EOD,   # UPS 2nd Day Air
+                "02": ServiceTier.DAY2_EOD,     # UPS 2nd Day Air
 
                 # 3-Day services
                 "12": ServiceTier.DAY3_EOD,     # UPS 3 Day Select
 
                 # Ground services
-                "GND": ServiceTier.GROUND_EOD   # UPS Ground
+                "03": ServiceTier.GROUND_EOD    # UPS Ground
             }
         }
 
@@ -69,6 +69,10 @@ class ServiceNormalizer:
 
         return carrier_mappings[service_code]
 
+    def find_service(self, carrier: str, service_code: str) -> Optional[ServiceTier]:
+        """Standard tier for a service code, or None if it isn't mapped"""
+        return self._mappings.get(carrier, {}).get(service_code)
+
     def get_carrier_services(self, carrier: str, tier: ServiceTier) -> list:
         """Get all service codes for a carrier that match a specific tier"""
         if carrier not in self._mappings:
@@ -0,0 +1,62 @@
+# Single Flight
+# One call per key at a time; concurrent callers for the same key share its result
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+T = TypeVar('T')
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls by key.
+
+    The first caller for a key starts the call in its own task and later
+    callers wait on that task. Callers wait through asyncio.shield, so a
+    caller that is cancelled (a client disconnecting) only stops waiting:
+    the call itself runs to completion and everyone else still gets its
+    result or its exception. Failures nobody waited for are not logged as
+    unretrieved.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    def get(self, key: Hashable) -> Optional[asyncio.Task]:
+        """The call in flight for a key, if any"""
+        return self._calls.get(key)
+
+    def start(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> "asyncio.Task[T]":
+        """
+        Start a call for a key without waiting for it.
+
+        Args:
+            key: Calls with equal keys are deduplicated
+            call: Started only if no call for the key is in flight
+
+        Returns:
+            Task shared by everyone waiting on the key
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.create_task(self._run(key, call))
+            task.add_done_callback(_retrieve)
+            self._calls[key] = task
+        return task
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        """Result of the call in flight for a key, starting it if there is none"""
+        return await asyncio.shield(self.start(key, call))
+
+    async def _run(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        try:
+            return await call()
+        finally:
+            self._calls.pop(key, None)
+
+def _retrieve(task: asyncio.Task) -> None:
+    # Mark retrieved so a failure with no waiters doesn't log a warning
+    if not task.cancelled():
+        task.exception()
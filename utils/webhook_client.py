@@ -0,0 +1,92 @@
+# Webhook Client
+# HTTP client for customer-supplied URLs (label job callbacks, tracking webhooks)
+
+import asyncio
+import ipaddress
+import os
+from typing import Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+_client: Optional[httpx.AsyncClient] = None
+
+def _allow_private() -> bool:
+    return os.getenv('WEBHOOK_ALLOW_PRIVATE_HOSTS', 'false').lower() == 'true'
+
+def _check_address(host: str, address: str) -> None:
+    ip = ipaddress.ip_address(address.split('%', 1)[0])
+    if not ip.is_global or ip.is_multicast:
+        raise ValueError(f"Webhook host {host} is not a public address")
+
+def check_webhook_url(url: str) -> None:
+    """
+    Reject URLs we won't deliver to: anything but http(s), no host, or a
+    literal private, loopback, link-local, reserved or multicast IP.
+    Hostnames are resolved and checked again on every delivery.
+
+    Raises:
+        ValueError: If the URL isn't allowed
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https'):
+        raise ValueError("Webhook URL must be http or https")
+    if not parts.hostname:
+        raise ValueError("Webhook URL must include a host")
+    if _allow_private():
+        return
+    try:
+        ipaddress.ip_address(parts.hostname)
+    except ValueError:
+        return
+    _check_address(parts.hostname, parts.hostname)
+
+class PublicHostTransport(httpx.AsyncBaseTransport):
+    """
+    Transport that only connects to public hosts.
+
+    Every request's host is resolved before it is sent and refused with a
+    ValueError if any address is not public, so redirects and DNS changes
+    after registration can't reach internal services.
+    """
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self._transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        check_webhook_url(url)
+        if not _allow_private():
+            host = request.url.host
+            port = request.url.port or (443 if request.url.scheme == 'https' else 80)
+            try:
+                addresses = await asyncio.get_running_loop().getaddrinfo(host, port)
+            except OSError as e:
+                raise httpx.ConnectError(f"Can't resolve {host}: {str(e)}", request=request)
+            for *_, sockaddr in addresses:
+                _check_address(host, sockaddr[0])
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+def get_webhook_client() -> httpx.AsyncClient:
+    """
+    Get the process-wide client for customer URLs, creating it on first use.
+
+    Kept apart from the carrier client: it never goes through the
+    cassette transport and refuses non-public hosts.
+    Set WEBHOOK_ALLOW_PRIVATE_HOSTS=true to allow local receivers in
+    development.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(transport=PublicHostTransport(), timeout=10.0)
+    return _client
+
+async def close_webhook_client() -> None:
+    """Close the webhook client and release its connections"""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None